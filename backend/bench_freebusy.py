@@ -0,0 +1,180 @@
+"""Benchmark the free/busy engine on 500 users x 1 year of meetings.
+
+Generates a year of synthetic meetings for --users people, with each person
+attending about --per-day meetings per working day. It then times:
+
+  * building the FreeBusy index from every (user, meeting) interval
+  * conflict checks for a proposed one-hour meeting with --group attendees
+  * common free slots for groups of 2, 10 and 50 over a week and a month of
+    working hours
+  * a year of merged busy blocks for one user
+
+With --mongo it also seeds a scratch database (MONGO_URL, --db) and times
+load_free_busy(), i.e. the two indexed Mongo queries plus the index build that
+every /availability request pays.
+
+Usage (from the backend directory):
+
+    python bench_freebusy.py [--users 500] [--per-day 3] [--queries 2000] [--json out.json]
+    python bench_freebusy.py --mongo --db team_dashboard_bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--per-day", type=float, default=3.0, help="meetings per user per working day")
+parser.add_argument("--group", type=int, default=5, help="attendees in a conflict check")
+parser.add_argument("--queries", type=int, default=2000, help="measured queries per scenario")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--mongo", action="store_true", help="also time load_free_busy() against MONGO_URL")
+parser.add_argument("--db", default="team_dashboard_bench")
+parser.add_argument("--json", help="write results to this file")
+args = parser.parse_args()
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", args.db)
+os.environ.setdefault("JWT_SECRET", "bench")
+
+from server import FreeBusy, Meeting, ensure_indexes, load_free_busy  # noqa: E402
+import server  # noqa: E402
+
+YEAR_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+rng = random.Random(args.seed)
+
+
+def generate_meetings(user_ids):
+    """A year of meetings on working days between 08:00 and 18:00, 15-120 minutes long"""
+    meetings = []
+    attendees_per_meeting = 4
+    per_day = int(len(user_ids) * args.per_day / attendees_per_meeting)
+    for day in range(365):
+        date = YEAR_START + timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        for _ in range(per_day):
+            start = date + timedelta(hours=8, minutes=15 * rng.randrange(36))
+            end = start + timedelta(minutes=rng.choice([15, 30, 30, 45, 60, 60, 90, 120]))
+            people = rng.sample(user_ids, attendees_per_meeting)
+            meetings.append(Meeting(
+                title="Sync",
+                agenda="",
+                start_time=start.isoformat(),
+                end_time=end.isoformat(),
+                organizer=people[0],
+                attendees=people[1:],
+            ).model_dump())
+    return meetings
+
+
+def intervals(meetings):
+    for meeting in meetings:
+        start = datetime.fromisoformat(meeting["start_time"]).timestamp()
+        end = datetime.fromisoformat(meeting["end_time"]).timestamp()
+        item = {"source": "meeting", "id": meeting["id"]}
+        for user_id in (meeting["organizer"], *meeting["attendees"]):
+            yield user_id, start, end, item
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 4)
+    return {"p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "mean_ms": round(statistics.fmean(ordered), 4)}
+
+
+def timed(fn, count):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def random_window(days):
+    start = YEAR_START + timedelta(days=rng.randrange(365 - days))
+    return start.timestamp(), (start + timedelta(days=days)).timestamp()
+
+
+def working_hours(lo, hi):
+    windows = []
+    day = lo
+    while day < hi:
+        windows.append((day + 9 * 3600, day + 17 * 3600))
+        day += 86400
+    return windows
+
+
+def bench_engine(user_ids, meetings):
+    results = {}
+    started = time.perf_counter()
+    free_busy = FreeBusy(intervals(meetings))
+    results["build"] = {"ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def conflict_check():
+        slot_start = YEAR_START.timestamp() + rng.randrange(365 * 96) * 900
+        for user_id in rng.sample(user_ids, args.group):
+            free_busy.conflicts(user_id, slot_start, slot_start + 3600)
+    results[f"conflicts_{args.group}_attendees"] = timed(conflict_check, args.queries)
+
+    for size in (2, 10, 50):
+        for days in (7, 30):
+            def free_slots():
+                group = rng.sample(user_ids, size)
+                lo, hi = random_window(days)
+                for window_start, window_end in working_hours(lo, hi):
+                    free_busy.free_slots(group, window_start, window_end, 1800)
+            results[f"free_slots_{size}_users_{days}d"] = timed(free_slots, max(1, args.queries // 10))
+
+    year = (YEAR_START.timestamp(), (YEAR_START + timedelta(days=365)).timestamp())
+    results["busy_1_user_1y"] = timed(lambda: free_busy.busy(rng.choice(user_ids), *year), args.queries)
+    return results
+
+
+async def bench_mongo(user_ids, meetings):
+    await server.client.drop_database(args.db)
+    for i in range(0, len(meetings), 5000):
+        await server.db.meetings.insert_many([dict(meeting) for meeting in meetings[i:i + 5000]], ordered=False)
+    await ensure_indexes()
+    results = {}
+    for size, days in ((5, 7), (10, 30)):
+        samples = []
+        for _ in range(max(1, args.queries // 20)):
+            lo, hi = random_window(days)
+            window_start = datetime.fromtimestamp(lo, timezone.utc)
+            window_end = datetime.fromtimestamp(hi, timezone.utc)
+            started = time.perf_counter()
+            await load_free_busy(rng.sample(user_ids, size), window_start, window_end)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[f"load_free_busy_{size}_users_{days}d"] = summarize(samples)
+    await server.client.drop_database(args.db)
+    return results
+
+
+async def main():
+    user_ids = [f"user-{i}" for i in range(args.users)]
+    started = time.perf_counter()
+    meetings = generate_meetings(user_ids)
+    print(f"Generated {len(meetings)} meetings for {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    results = bench_engine(user_ids, meetings)
+    if args.mongo:
+        results.update(await bench_mongo(user_ids, meetings))
+
+    for name, result in results.items():
+        print(f"{name:<32} " + "  ".join(f"{key} {value}" for key, value in result.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "meetings": len(meetings), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Benchmark password verification during a login burst.
+
+Compares verifying bcrypt hashes inline on the event loop (the old login
+path) with the executor-backed verify_password() used by the server. For
+each mode it reports login throughput and the latency of an unrelated
+request that is scheduled every few milliseconds while the burst runs.
+
+Usage (from the backend directory):
+
+    python bench_login.py [--logins 64] [--rounds 12] [--workers 4] [--json out.json]
+
+No database is needed; MONGO_URL/DB_NAME default to placeholders because
+importing server only creates a lazy client.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--logins", type=int, default=64, help="concurrent logins in the burst")
+parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+parser.add_argument("--workers", type=int, default=4, help="PASSWORD_HASH_WORKERS for the executor mode")
+parser.add_argument("--tick-ms", type=float, default=5.0, help="interval of the unrelated request")
+parser.add_argument("--json", help="write results to this file")
+args = parser.parse_args()
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+from server import pwd_context, verify_password  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def unrelated_requests(stop: asyncio.Event, lags: list):
+    # Each "request" should take ~0 ms; anything more is time spent waiting for the loop
+    interval = args.tick_ms / 1000
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - scheduled - interval) * 1000)
+
+
+async def run(mode: str, password: str, hashed: str) -> dict:
+    async def inline_login():
+        return pwd_context.verify(password, hashed)
+
+    async def executor_login():
+        valid, _ = await verify_password(password, hashed)
+        return valid
+
+    login = inline_login if mode == "inline" else executor_login
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(unrelated_requests(stop, lags))
+    await asyncio.sleep(args.tick_ms / 1000 * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    assert all(results)
+    return {
+        "mode": mode,
+        "logins": args.logins,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(args.logins / elapsed, 2),
+        "unrelated_requests": len(lags),
+        "unrelated_p50_ms": round(percentile(lags, 50), 2),
+        "unrelated_p99_ms": round(percentile(lags, 99), 2),
+        "unrelated_max_ms": round(max(lags), 2),
+        "unrelated_mean_ms": round(statistics.mean(lags), 2),
+    }
+
+
+async def main():
+    password = "correct horse battery staple"
+    hashed = pwd_context.hash(password)
+    results = [await run("inline", password, hashed), await run("executor", password, hashed)]
+    for result in results:
+        print(
+            f"{result['mode']:>8}: {result['logins_per_s']:>7} logins/s | unrelated request "
+            f"p50 {result['unrelated_p50_ms']} ms, p99 {result['unrelated_p99_ms']} ms, "
+            f"max {result['unrelated_max_ms']} ms ({result['unrelated_requests']} samples)"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rounds": args.rounds, "workers": args.workers, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""Micro-benchmark of list endpoint serialization cost per 1k documents.
+
+"before" reproduces FastAPI's response_model path: validate the documents
+against List[Model], dump them in JSON mode and render them with the
+stdlib encoder. "orjson + validation" keeps the validation but renders
+with ORJSONResponse (the new default response class). "trusted" is the
+path taken by paginate(): the documents go straight to orjson.
+
+Usage (from the backend directory):
+
+    python bench_serialization.py [--docs 1000] [--repeat 50] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--docs", type=int, default=1000)
+parser.add_argument("--repeat", type=int, default=50)
+parser.add_argument("--json", help="write results to this file")
+args = parser.parse_args()
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from server import FinanceTransaction, Task, trusted_response  # noqa: E402
+
+random.seed(7)
+start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def task_doc(i):
+    return Task(
+        project_id=str(uuid.uuid4()),
+        title=f"Task {i}: wire up the {random.choice(['login', 'billing', 'search', 'calendar'])} flow",
+        description="Acceptance criteria and notes " * random.randint(1, 8),
+        assigned_to=str(uuid.uuid4()),
+        status=random.choice(["todo", "doing", "done"]),
+        priority=random.choice(["low", "medium", "high"]),
+        due_date=(start + timedelta(days=i % 365)).date().isoformat(),
+    ).model_dump()
+
+
+def finance_doc(i):
+    return FinanceTransaction(
+        type=random.choice(["income", "expense", "salary"]),
+        category=random.choice(["software", "marketing", "content", "operational", "salary", "revenue"]),
+        amount=round(random.uniform(10, 5000), 2),
+        description=f"Invoice {i}",
+        date=(start + timedelta(days=i % 365)).date().isoformat(),
+        payment_method=random.choice(["card", "bank", None]),
+        created_by=str(uuid.uuid4()),
+    ).model_dump()
+
+
+def measure(model, docs):
+    adapter = TypeAdapter(List[model])
+
+    def before():
+        value = adapter.validate_python(docs)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def orjson_with_validation():
+        value = adapter.validate_python(docs)
+        return ORJSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def trusted():
+        return trusted_response(docs).body
+
+    assert json.loads(before()) == json.loads(trusted())
+    results = {}
+    for name, fn in (("before", before), ("orjson + validation", orjson_with_validation), ("trusted", trusted)):
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        results[name] = round(best * 1000 * 1000 / args.docs, 3)  # ms per 1k docs
+    return results
+
+
+def main():
+    report = {}
+    for name, model, factory in (("get_tasks", Task, task_doc), ("get_finance_transactions", FinanceTransaction, finance_doc)):
+        docs = [factory(i) for i in range(args.docs)]
+        report[name] = measure(model, docs)
+        baseline = report[name]["before"]
+        print(f"{name} (ms per 1k docs, best of {args.repeat}):")
+        for mode, ms in report[name].items():
+            print(f"  {mode:<22} {ms:>8.3f}  ({baseline / ms:.1f}x)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"docs": args.docs, "repeat": args.repeat, "ms_per_1k_docs": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
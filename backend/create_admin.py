@@ -0,0 +1,42 @@
+"""Create an Admin user, e.g. the first one on a fresh database.
+
+Registering team members needs an admin's token, so the first admin is
+created from the command line instead:
+
+    python create_admin.py --username admin --name "Jane Doe" [--password ...]
+
+The password is prompted for when not given. MONGO_URL and DB_NAME are read
+from the environment (or backend/.env) like the server does.
+"""
+import argparse
+import asyncio
+import getpass
+
+from server import User, client, db, hash_password  # noqa: E402
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--username", required=True)
+parser.add_argument("--name", required=True)
+parser.add_argument("--email")
+parser.add_argument("--password", help="prompted for when omitted")
+args = parser.parse_args()
+
+
+async def main():
+    if await db.users.find_one({"username": args.username}, {"_id": 1}):
+        raise SystemExit(f"Username {args.username!r} already exists")
+    password = args.password or getpass.getpass("Password: ")
+    user = User(
+        username=args.username,
+        password=await hash_password(password),
+        name=args.name,
+        role="Admin",
+        email=args.email,
+    )
+    await db.users.insert_one(user.model_dump())
+    print(f"Created admin {args.username} ({user.id})")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,391 @@
+"""Load test the hot API endpoints against a seeded database.
+
+The FastAPI app is driven in-process through httpx's ASGI transport. It runs
+against a local mongod (MONGO_URL, default mongodb://localhost:27017), or
+against mongomock-motor with --mock (pip install mongomock-motor). The database is seeded with realistic
+volumes (500 users, 100k tasks, 50k finance transactions, 200k kudos rows and
+a year of attendance at --scale 1). Then each endpoint gets --requests calls
+at --concurrency. For every endpoint the run reports p50/p95/p99 latency,
+throughput and Mongo commands per request, and the results are written as JSON
+so runs can be compared.
+
+Usage (from the backend directory):
+
+    python loadtest.py --output run.json
+    python loadtest.py --scale 0.1 --concurrency 32 --output after.json --compare run.json
+
+--compare exits non-zero if any endpoint's p95 regressed by more than
+--threshold (default 1.2x) against the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from pymongo import monitoring
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+parser.add_argument("--db", default="team_dashboard_loadtest")
+parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of a mongod")
+parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the seeded volumes")
+parser.add_argument("--reseed", action="store_true", help="drop and reseed even if the database has data")
+parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+parser.add_argument("--concurrency", type=int, default=16)
+parser.add_argument("--endpoints", help="comma separated subset of endpoint names to run")
+parser.add_argument("--disable-cache", action="store_true", help="run the dashboard with its caches off")
+parser.add_argument("--bcrypt-rounds", type=int, default=12)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--output", help="write results to this JSON file")
+parser.add_argument("--compare", help="baseline results JSON to check for p95 regressions")
+parser.add_argument("--threshold", type=float, default=1.2)
+args = parser.parse_args()
+
+os.environ["MONGO_URL"] = args.mongo_url
+os.environ["DB_NAME"] = args.db
+os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+os.environ.setdefault("JWT_SECRET", "loadtest")
+if args.disable_cache:
+    os.environ["DASHBOARD_GLOBAL_CACHE_TTL"] = "0"
+    os.environ["DASHBOARD_USER_CACHE_TTL"] = "0"
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.total = 0
+        self.by_command = Counter()
+
+    def started(self, event):
+        self.total += 1
+        self.by_command[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Must be registered before server creates its client
+command_counter = CommandCounter()
+monitoring.register(command_counter)
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from server import (  # noqa: E402
+    AttendanceRecord, FinanceTransaction, KudosTransaction, Meeting, Project, Task, User, app, pwd_context
+)
+
+PASSWORD = "loadtest-password"
+ROLES = ["Tech", "Design", "AI", "Cloud", "Research", "Content", "Intern", "Project Manager"]
+BATCH_SIZE = 5000
+
+
+def volumes(scale: float) -> dict:
+    return {
+        "users": max(2, int(500 * scale)),
+        "projects": max(1, int(200 * scale)),
+        "tasks": int(100_000 * scale),
+        "finance_transactions": int(50_000 * scale),
+        "kudos_transactions": int(200_000 * scale),
+        "meetings": int(5_000 * scale),
+        "attendance_days": 365,
+    }
+
+
+async def insert_batches(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+def iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+async def seed(db, counts: dict, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    year_ago = now - timedelta(days=365)
+    hashed = pwd_context.hash(PASSWORD)
+
+    users = [
+        User(
+            username=f"user{i}",
+            password=hashed,
+            name=f"User {i}",
+            role="Admin" if i == 0 else rng.choice(ROLES),
+            email=f"user{i}@example.com",
+            created_at=iso(year_ago + timedelta(minutes=i)),
+        ).model_dump()
+        for i in range(counts["users"])
+    ]
+    await insert_batches(db.users, users)
+    user_ids = [user["id"] for user in users]
+    names = {user["id"]: user["name"] for user in users}
+
+    def random_time():
+        return year_ago + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+    projects = [
+        Project(
+            name=f"Project {i}",
+            description="Seeded project",
+            type=rng.choice(["AI tools", "SaaS apps", "academy content"]),
+            assigned_members=rng.sample(user_ids, min(5, len(user_ids))),
+            status=rng.choice(["todo", "doing", "done"]),
+            created_at=iso(random_time()),
+        ).model_dump()
+        for i in range(counts["projects"])
+    ]
+    await insert_batches(db.projects, projects)
+    project_ids = [project["id"] for project in projects]
+
+    await insert_batches(db.tasks, (
+        Task(
+            project_id=rng.choice(project_ids),
+            title=f"Task {i}",
+            description="Seeded task with a short description",
+            assigned_to=rng.choice(user_ids),
+            status=rng.choice(["todo", "doing", "done", "done"]),
+            priority=rng.choice(["low", "medium", "high"]),
+            due_date=(now + timedelta(days=rng.randint(-60, 60))).date().isoformat(),
+            created_at=iso(random_time()),
+        ).model_dump()
+        for i in range(counts["tasks"])
+    ))
+
+    def finance_transaction(i):
+        kind = rng.choices(["income", "expense", "salary"], weights=[3, 5, 2])[0]
+        category = {"income": "revenue", "salary": "salary"}.get(kind) or rng.choice(["software", "marketing", "content", "operational"])
+        when = random_time()
+        return FinanceTransaction(
+            type=kind,
+            category=category,
+            amount=round(rng.uniform(20, 8000), 2),
+            description=f"Transaction {i}",
+            date=when.date().isoformat(),
+            created_by=user_ids[0],
+            created_at=iso(when),
+        ).model_dump()
+
+    await insert_batches(db.finance_transactions, (finance_transaction(i) for i in range(counts["finance_transactions"])))
+
+    await insert_batches(db.kudos_transactions, (
+        KudosTransaction(
+            user_id=(user_id := rng.choice(user_ids)),
+            user_name=names[user_id],
+            amount=rng.choice([-5, 5, 10, 20]),
+            reason="Seeded kudos",
+            category=rng.choice(["task_completion", "meeting_attendance", "training_completion", "manual"]),
+            given_by=user_ids[0],
+            created_at=iso(random_time()),
+        ).model_dump()
+        for _ in range(counts["kudos_transactions"])
+    ))
+
+    def meeting(i):
+        start = now + timedelta(hours=rng.randint(-24 * 180, 24 * 180))
+        return Meeting(
+            title=f"Meeting {i}",
+            agenda="Seeded meeting",
+            start_time=iso(start),
+            end_time=iso(start + timedelta(minutes=rng.choice([30, 60]))),
+            organizer=rng.choice(user_ids),
+            attendees=rng.sample(user_ids, min(8, len(user_ids))),
+            created_at=iso(start - timedelta(days=7)),
+        ).model_dump()
+
+    await insert_batches(db.meetings, (meeting(i) for i in range(counts["meetings"])))
+
+    def attendance():
+        for offset in range(counts["attendance_days"]):
+            day = (now - timedelta(days=offset)).date()
+            if day.weekday() >= 5:
+                continue
+            for user in users:
+                status = rng.choices(["present", "absent", "leave", "half_day"], weights=[90, 4, 4, 2])[0]
+                record = AttendanceRecord(user_id=user["id"], user_name=user["name"], date=day.isoformat(), status=status)
+                if status in ("present", "half_day"):
+                    check_in = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(hours=9, minutes=rng.randint(0, 60))
+                    hours = rng.uniform(3, 5) if status == "half_day" else rng.uniform(7, 10)
+                    record.check_in = iso(check_in)
+                    record.check_out = iso(check_in + timedelta(hours=hours))
+                    record.total_hours = round(hours, 2)
+                yield record.model_dump()
+
+    await insert_batches(db.attendance, attendance())
+    return users
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(http, name, make_request, total, concurrency):
+    latencies = []
+    errors = Counter()
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await make_request(http)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors[response.status_code] += 1
+
+    commands_before = command_counter.total
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    commands = command_counter.total - commands_before
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": dict(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "mongo_commands_per_request": None if args.mock else round(commands / total, 2),
+    }
+
+
+def endpoint_plan(users, rng, task_count):
+    user_ids = [user["id"] for user in users]
+
+    def get(path_fn):
+        async def request(http):
+            return await http.get(path_fn())
+        return request
+
+    async def login(http):
+        user = rng.choice(users)
+        return await http.post("/api/auth/login", json={"username": user["username"], "password": PASSWORD})
+
+    return {
+        "dashboard_stats": get(lambda: f"/api/dashboard/stats?user_id={rng.choice(user_ids)}"),
+        "finance_summary": get(lambda: "/api/finance/summary"),
+        "tasks": get(lambda: f"/api/tasks?user_id={rng.choice(user_ids)}"),
+        "attendance_summary": get(lambda: f"/api/attendance/summary?user_id={rng.choice(user_ids)}"),
+        "search_text": get(lambda: f"/api/search?q={rng.randrange(task_count)}"),
+        "search_typeahead": get(lambda: f"/api/search?mode=prefix&q=task%20{rng.randrange(1000)}"),
+        "auth_login": login,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["p95_ms"], result["p95_ms"]
+        ratio = after / before if before else float("inf")
+        marker = "REGRESSION" if ratio > threshold else "ok"
+        print(f"  {name:<20} p95 {before:>8.2f} -> {after:>8.2f} ms ({ratio:.2f}x) {marker}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+async def main():
+    rng = random.Random(args.seed)
+    counts = volumes(args.scale)
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.client = AsyncMongoMockClient()
+        server.db = server.client[args.db]
+        server._transactions_supported = False
+    db = server.db
+
+    if args.reseed or args.mock or await db.users.estimated_document_count() == 0:
+        if not args.mock:
+            await server.client.drop_database(args.db)
+        started = time.perf_counter()
+        await seed(db, counts, rng)
+        print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+    users = await db.users.find({}, {"_id": 0, "id": 1, "username": 1, "role": 1}).to_list(None)
+
+    # Builds indexes and backfills kudos balances / finance rollups for seeded data
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as http:
+            admin = next(user for user in users if user["role"] == "Admin")
+            response = await http.post("/api/auth/login", json={"username": admin["username"], "password": PASSWORD})
+            response.raise_for_status()
+            http.headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+            plan = endpoint_plan(users, rng, counts["tasks"])
+            if args.endpoints:
+                plan = {name: plan[name] for name in args.endpoints.split(",")}
+            results = {}
+            for name, make_request in plan.items():
+                if args.warmup:
+                    await drive(http, name, make_request, args.warmup, args.concurrency)
+                results[name] = await drive(http, name, make_request, args.requests, args.concurrency)
+                r = results[name]
+                print(
+                    f"{name:<20} {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  "
+                    f"p99 {r['p99_ms']:>8} ms  mongo/req {r['mongo_commands_per_request']}  errors {r['errors'] or 0}"
+                )
+    finally:
+        await app.router.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "backend": "mongomock" if args.mock else "mongod",
+            "volumes": counts,
+            "args": vars(args),
+        },
+        "endpoints": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        if compare(results, args.compare, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
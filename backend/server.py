@@ -1,34 +1,443 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, CursorType, IndexModel, InsertOne, UpdateOne, DeleteOne
+from pymongo import monitoring
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, ExecutionTimeout, OperationFailure, PyMongoError
+from starlette.routing import Match
 import os
+import io
+import re
+import csv
+import asyncio
 import logging
+import time
+import random
+import threading
+import heapq
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import Dict, List, Optional
 import uuid
-from datetime import datetime, timezone
+import base64
+import contextvars
+from collections import OrderedDict, defaultdict
+from itertools import islice
+from operator import itemgetter
+from calendar import monthrange
+from datetime import date, datetime, timedelta, timezone
 from passlib.context import CryptContext
+from jose import jwt, JWTError
+from dateutil.rrule import rrulestr
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
 import json
+import orjson
+import numpy as np
+import pandas as pd
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ========== METRICS ==========
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms rendered in Prometheus text format.
+
+    Mongo listeners report from Motor's executor threads, hence the lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._values = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+        self._values.setdefault(name, {})
+
+    def inc(self, name: str, labels: dict, amount: float = 1):
+        key = tuple(labels.items())
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, labels: dict, value: float):
+        key = tuple(labels.items())
+        with self._lock:
+            series = self._values[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in self._values[name].items():
+                    if kind != "histogram":
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets + ("+Inf",), value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+metrics.describe("http_requests_total", "counter", "HTTP requests by route and status")
+metrics.describe("http_request_duration_seconds", "histogram", "HTTP request latency by route")
+metrics.describe("http_requests_in_flight", "gauge", "HTTP requests currently being served by route")
+metrics.describe("mongo_commands_total", "counter", "Mongo commands by collection, command and outcome")
+metrics.describe("mongo_command_duration_seconds", "histogram", "Mongo command latency by collection and command")
+metrics.describe("mongo_documents_returned_total", "counter", "Documents returned in cursor batches by collection and command")
+metrics.describe("mongo_pool_wait_seconds", "histogram", "Time spent waiting to check a connection out of the pool")
+
+def _command_collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+def _documents_returned(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    return 0
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = _command_collection(event.command_name, event.command)
+
+    def succeeded(self, event):
+        labels = {"collection": self._collections.pop(event.request_id, ""), "command": event.command_name}
+        metrics.inc("mongo_commands_total", {**labels, "outcome": "success"})
+        metrics.observe("mongo_command_duration_seconds", labels, event.duration_micros / 1e6)
+        returned = _documents_returned(event.reply)
+        if returned:
+            metrics.inc("mongo_documents_returned_total", labels, returned)
+
+    def failed(self, event):
+        labels = {"collection": self._collections.pop(event.request_id, ""), "command": event.command_name}
+        metrics.inc("mongo_commands_total", {**labels, "outcome": "failure"})
+        metrics.observe("mongo_command_duration_seconds", labels, event.duration_micros / 1e6)
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    # Check-out starts and completes on the same executor thread
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            metrics.observe("mongo_pool_wait_seconds", {}, time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests per route template"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        labels = {"method": scope["method"], "route": self._route(scope)}
+        status = {"code": 500}
+        current_route.set(f"{labels['method']} {labels['route']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.inc("http_requests_in_flight", labels)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.observe("http_request_duration_seconds", labels, time.perf_counter() - start)
+            metrics.inc("http_requests_total", {**labels, "status": str(status["code"])})
+            metrics.inc("http_requests_in_flight", labels, -1)
+
+    @staticmethod
+    def _route(scope) -> str:
+        # Label by path template, never the raw path, to keep label cardinality bounded
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "<unmatched>"
+
+# Route of the request being served; Motor copies the context into its executor
+# threads, so command listeners can attribute queries to it.
+current_route = contextvars.ContextVar("current_route", default=None)
+
+# ========== SLOW QUERY LOG ==========
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', '0.1'))
+SLOW_QUERY_EXAMINED_RATIO = float(os.environ.get('SLOW_QUERY_EXAMINED_RATIO', '10'))
+# How often each query shape is explained regardless of its speed
+SLOW_QUERY_SHAPE_RECHECK_SECONDS = float(os.environ.get('SLOW_QUERY_SHAPE_RECHECK_SECONDS', '3600'))
+SLOW_QUERY_OPEN_CURSORS = 10000
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', str(16 * 1024 * 1024)))
+
+_EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+_UNLOGGED_COMMANDS = {"explain", "endSessions", "hello", "isMaster", "ping"}
+_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern", "readConcern"}
+
+def _query_shape(value):
+    """Replace literal values with '?' so queries differing only in parameters group together"""
+    if isinstance(value, dict):
+        return {key: _query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_query_shape(item) for item in value[:1]] + (["..."] if len(value) > 1 else [])
+    return "?"
+
+def _command_filter(command_name: str, command: dict):
+    if command_name == "find":
+        return {"filter": command.get("filter", {}), "sort": command.get("sort")}
+    if command_name == "aggregate":
+        return {"pipeline": command.get("pipeline", [])}
+    if command_name in ("count", "distinct", "findAndModify"):
+        return {"query": command.get("query", {})}
+    if command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        return {"q": statements[0].get("q", {})}
+    return {}
+
+def _find_key(value, key):
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+def _summarize_explain(explanation: dict) -> dict:
+    stats = _find_key(explanation, "executionStats") or {}
+    stages = _plan_stages(_find_key(explanation, "winningPlan") or {})
+    docs_examined = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+    return {
+        "stages": sorted(stages),
+        "collscan": "COLLSCAN" in stages,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "docs_examined": docs_examined,
+        "n_returned": returned,
+        "execution_ms": stats.get("executionTimeMillis"),
+        "inefficient": docs_examined > SLOW_QUERY_EXAMINED_RATIO * max(returned, 1),
+    }
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Flag slow or inefficient Mongo operations and log them to the capped slow_queries collection.
+
+    A cursor is judged once it is exhausted or killed, on the time and
+    documents summed over its getMores. Slow operations are logged and a
+    sample of them is re-run through explain("executionStats") to capture
+    the plan and keys/docs examined. Each query shape is also explained once
+    per SLOW_QUERY_SHAPE_RECHECK_SECONDS however fast it ran, and logged when
+    it examines more than SLOW_QUERY_EXAMINED_RATIO documents per document
+    returned, so quick collection scans on small collections show up too.
+    """
+    def __init__(self):
+        self.loop = None
+        self._started = {}
+        # Operations whose cursor is still open, by cursor id
+        self._cursors = OrderedDict()
+        self._explained = {}
+
+    def started(self, event):
+        if self.loop is None or event.command_name in _UNLOGGED_COMMANDS:
+            return
+        if event.command_name == "getMore":
+            self._started[event.request_id] = event.command["getMore"]
+            return
+        if event.command_name == "killCursors":
+            for cursor_id in event.command.get("cursors", []):
+                self._finish(self._cursors.pop(cursor_id, None))
+            return
+        collection = _command_collection(event.command_name, event.command)
+        if not collection or collection == "slow_queries":
+            return
+        self._started[event.request_id] = {
+            "collection": collection,
+            "command_name": event.command_name,
+            "command": event.command,
+            "database": event.database_name,
+            "route": current_route.get(),
+            "duration_ms": 0.0,
+            "returned": 0,
+        }
+
+    def succeeded(self, event):
+        started = self._started.pop(event.request_id, None)
+        if started is None or self.loop.is_closed():
+            return
+        operation = self._cursors.pop(started, None) if event.command_name == "getMore" else started
+        if operation is None:
+            return
+        operation["duration_ms"] += event.duration_micros / 1000
+        operation["returned"] += _documents_returned(event.reply)
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict) and cursor.get("id"):
+            self._cursors[cursor["id"]] = operation
+            if len(self._cursors) > SLOW_QUERY_OPEN_CURSORS:
+                # Cursors the client abandoned without exhausting or killing them
+                self._cursors.popitem(last=False)
+            return
+        self._finish(operation)
+
+    def failed(self, event):
+        started = self._started.pop(event.request_id, None)
+        if event.command_name == "getMore":
+            self._cursors.pop(started, None)
+
+    def _finish(self, operation: Optional[dict]):
+        if operation is None or self.loop.is_closed():
+            return
+        command_name, command = operation["command_name"], operation["command"]
+        shape = json.dumps(_query_shape(_command_filter(command_name, command)), sort_keys=True, default=str)
+        slow = operation["duration_ms"] >= SLOW_QUERY_MS
+        recheck = False
+        if command_name in _EXPLAINABLE_COMMANDS:
+            key = (operation["collection"], command_name, shape)
+            now = time.monotonic()
+            last = self._explained.get(key)
+            recheck = last is None or now - last >= SLOW_QUERY_SHAPE_RECHECK_SECONDS
+            if recheck:
+                self._explained[key] = now
+        if not slow and not recheck:
+            return
+        explain = recheck or (command_name in _EXPLAINABLE_COMMANDS and random.random() < SLOW_QUERY_EXPLAIN_RATE)
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "route": operation["route"],
+            "database": operation["database"],
+            "collection": operation["collection"],
+            "command": command_name,
+            "shape": shape,
+            "duration_ms": round(operation["duration_ms"], 2),
+            "docs_returned": operation["returned"],
+            "slow": slow,
+            "inefficient": False,
+            "plan": None,
+        }
+        asyncio.run_coroutine_threadsafe(
+            record_slow_query(entry, command if explain else None), self.loop
+        )
+
+slow_query_log = SlowQueryLog()
+mongo_command_metrics = MongoCommandMetrics()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_command_metrics, MongoPoolMetrics(), slow_query_log])
 db = client[os.environ['DB_NAME']]
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Pinning min/max rounds to the configured cost makes
+# verify_and_update() hand back a rehash whenever BCRYPT_ROUNDS changes.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt takes hundreds of milliseconds per call; it runs on this bounded pool so
+# it never blocks the event loop.
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '4')),
+    thread_name_prefix="password-hash",
+)
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.hash, password)
+
+async def verify_password(password: str, hashed: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash should be upgraded"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify_and_update, password, hashed)
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
+# Routes that must be reachable without a session token header; the ones that
+# still need a session depend on authenticate_query_token themselves
+public_router = APIRouter(prefix="/api")
 
 # ========== MODELS ==========
 
@@ -43,6 +452,7 @@ class User(BaseModel):
     contact: Optional[str] = None
     skillset: Optional[List[str]] = []
     current_tasks: Optional[List[str]] = []
+    is_active: bool = True  # Inactive users are left out of payroll runs
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class UserResponse(BaseModel):
@@ -55,6 +465,7 @@ class UserResponse(BaseModel):
     contact: Optional[str] = None
     skillset: Optional[List[str]] = []
     current_tasks: Optional[List[str]] = []
+    is_active: bool = True
     created_at: str
 
 class UserCreate(BaseModel):
@@ -73,6 +484,7 @@ class UserUpdate(BaseModel):
     contact: Optional[str] = None
     skillset: Optional[List[str]] = None
     current_tasks: Optional[List[str]] = None
+    is_active: Optional[bool] = None
 
 class LoginRequest(BaseModel):
     username: str
@@ -127,6 +539,8 @@ class CalendarEvent(BaseModel):
     end_time: str
     event_type: str  # startup, content, academy, personal
     attendees: List[str] = []
+    recurrence: Optional[str] = None  # RFC 5545 RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE
+    recurrence_end: Optional[str] = None  # end of the last occurrence; None while the series is open-ended
     google_event_id: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -137,6 +551,7 @@ class CalendarEventCreate(BaseModel):
     end_time: str
     event_type: str
     attendees: List[str] = []
+    recurrence: Optional[str] = None
 
 class LeaveRequest(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -270,6 +685,7 @@ class FinanceTransaction(BaseModel):
     payment_method: Optional[str] = None
     receipt_url: Optional[str] = None
     paid_to: Optional[str] = None  # For salary payments
+    salary_record_id: Optional[str] = None  # Set on transactions created by a payroll payment
     status: str = "completed"  # pending, completed
     created_by: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -308,6 +724,18 @@ class SalaryRecordCreate(BaseModel):
     deductions: float = 0.0
     bonuses: float = 0.0
 
+class PayrollRunRequest(BaseModel):
+    # Users without an entry here keep the base salary of their latest earlier record
+    base_salaries: Dict[str, float] = {}
+    bonuses: Dict[str, float] = {}
+    attendance_deductions: bool = False
+    working_days: Optional[int] = None  # Defaults to the weekdays in the month
+    expected_daily_hours: float = 8.0
+
+class PayrollPayRequest(BaseModel):
+    payment_date: Optional[str] = None
+    payment_method: Optional[str] = None
+
 # Attendance Models
 class AttendanceRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -340,6 +768,7 @@ class KudosTransaction(BaseModel):
     reason: str
     category: str  # task_completion, meeting_attendance, training_completion, manual
     given_by: str
+    source: Optional[str] = None  # Idempotency key for system-generated kudos, e.g. meeting_absence:<meeting>:<user>
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class KudosTransactionCreate(BaseModel):
@@ -411,6 +840,12 @@ class MeetingCreate(BaseModel):
     attendees: List[str] = []
     meeting_type: str = "team"
 
+class ConflictCheck(BaseModel):
+    attendees: List[str]
+    start_time: str
+    end_time: str
+    exclude_meeting_id: Optional[str] = None  # the meeting being rescheduled
+
 class MeetingAttendance(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -444,22 +879,1068 @@ class SubscriptionCreate(BaseModel):
     renewal_date: Optional[str] = None
     notes: Optional[str] = None
 
+# ========== INDEXES ==========
+
+def _id_index():
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+def _text_index(**weights: int):
+    # A collection may only have one text index, so it carries every searchable field
+    return IndexModel([(field, TEXT) for field in weights], weights=weights, name="search_text")
+
+def _created_at_index(*prefix: str):
+    # Matches the (created_at, id) keyset used by paginate(); usable in both directions.
+    keys = [(field, ASCENDING) for field in prefix] + [("created_at", DESCENDING), ("id", DESCENDING)]
+    return IndexModel(keys, name="_".join(prefix + ("created_at", "id")))
+
+# Every collection declares the indexes its handlers rely on. They are created
+# (and stale or retired ones dropped) on startup by ensure_indexes().
+COLLECTION_INDEXES = {
+    "session_revocations": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "users": [
+        _id_index(),
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        _created_at_index(),
+    ],
+    "projects": [
+        _id_index(),
+        _created_at_index(),
+        IndexModel([("assigned_members", ASCENDING)], name="assigned_members"),
+        IndexModel([("name", ASCENDING)], name="name"),
+        _text_index(name=10, description=3),
+    ],
+    "tasks": [
+        _id_index(),
+        IndexModel([("assigned_to", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)], name="assigned_to_status_created_at"),
+        _created_at_index("assigned_to"),
+        _created_at_index("project_id"),
+        _created_at_index(),
+        IndexModel([("title", ASCENDING)], name="title"),
+        _text_index(title=10, description=3),
+    ],
+    "calendar_events": [
+        _id_index(),
+        IndexModel([("start_time", ASCENDING), ("end_time", ASCENDING)], name="start_time_end_time"),
+        IndexModel([("attendees", ASCENDING), ("start_time", ASCENDING)], name="attendees_start_time"),
+        _created_at_index(),
+    ],
+    "calendar_sync_jobs": [
+        _id_index(),
+        IndexModel([("claim", ASCENDING)], partialFilterExpression={"claim": {"$type": "string"}}, name="claim"),
+        IndexModel([("event_id", ASCENDING)], unique=True, partialFilterExpression={"status": "pending"}, name="event_id_pending_unique"),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)], name="status_locked_until"),
+    ],
+    "leave_requests": [
+        _id_index(),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("user_id", ASCENDING), ("start_date", ASCENDING)], name="user_id_start_date"),
+        _created_at_index(),
+    ],
+    "content_items": [
+        _id_index(),
+        _created_at_index(),
+        IndexModel([("title", ASCENDING)], name="title"),
+        _text_index(title=10),
+    ],
+    "ai_projects": [_id_index(), _created_at_index()],
+    "research_notes": [
+        _id_index(),
+        _created_at_index(),
+        IndexModel([("title", ASCENDING)], name="title"),
+        _text_index(title=10, tags=5, content=1),
+        _created_at_index("tags"),
+        _created_at_index("author"),
+    ],
+    "research_tags": [
+        IndexModel([("tag", ASCENDING)], unique=True, name="tag_unique"),
+        IndexModel([("count", DESCENDING), ("tag", ASCENDING)], name="count_tag"),
+    ],
+    "academy_courses": [_id_index(), _created_at_index()],
+    "personal_tasks": [
+        _id_index(),
+        _created_at_index("user_id"),
+    ],
+    "cloud_services": [_id_index(), _created_at_index()],
+    "finance_transactions": [
+        _id_index(),
+        _created_at_index(),
+        IndexModel([("date", ASCENDING)], name="date"),
+        # A salary record is paid out at most once, even if two payments race
+        IndexModel([("salary_record_id", ASCENDING)], unique=True, partialFilterExpression={"salary_record_id": {"$type": "string"}}, name="salary_record_id_unique"),
+    ],
+    "finance_rollups": [
+        IndexModel([("month", ASCENDING), ("type", ASCENDING), ("category", ASCENDING)], unique=True, name="month_type_category_unique"),
+    ],
+    "salary_records": [
+        _id_index(),
+        _created_at_index(),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], unique=True, name="user_id_month_unique"),
+        IndexModel([("month", ASCENDING), ("status", ASCENDING)], name="month_status"),
+    ],
+    "availability": [
+        IndexModel([("month", ASCENDING), ("user_id", ASCENDING)], unique=True, name="month_user_id_unique"),
+    ],
+    "attendance": [
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], unique=True, name="user_id_date_unique"),
+        IndexModel([("date", DESCENDING), ("id", DESCENDING)], name="date_id"),
+    ],
+    "kudos_transactions": [
+        _id_index(),
+        IndexModel([("source", ASCENDING)], unique=True, partialFilterExpression={"source": {"$type": "string"}}, name="source_unique"),
+        _created_at_index("user_id"),
+        _created_at_index(),
+    ],
+    "kudos_balances": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+        IndexModel([("total_kudos", DESCENDING), ("user_id", ASCENDING)], name="total_kudos_user_id"),
+    ],
+    "kudos_periods": [
+        IndexModel([("period", ASCENDING), ("user_id", ASCENDING)], unique=True, name="period_user_id_unique"),
+        IndexModel([("period", ASCENDING), ("total_kudos", DESCENDING), ("user_id", ASCENDING)], name="period_total_kudos_user_id"),
+    ],
+    "training_courses": [
+        _id_index(),
+        _created_at_index(),
+    ],
+    "training_progress": [
+        _id_index(),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)], name="user_id_course_id"),
+        IndexModel([("course_id", ASCENDING)], name="course_id"),
+        _created_at_index(),
+    ],
+    "meetings": [
+        _id_index(),
+        IndexModel([("organizer", ASCENDING), ("start_time", ASCENDING)], name="organizer_start_time"),
+        IndexModel([("attendees", ASCENDING), ("start_time", ASCENDING)], name="attendees_start_time"),
+        IndexModel([("start_time", DESCENDING), ("id", DESCENDING)], name="start_time_id"),
+        IndexModel([("meeting_type", ASCENDING), ("start_time", DESCENDING), ("id", DESCENDING)], name="meeting_type_start_time_id"),
+    ],
+    "meeting_attendance": [
+        _id_index(),
+        IndexModel([("meeting_id", ASCENDING), ("user_id", ASCENDING)], unique=True, name="meeting_id_user_id_unique"),
+        _created_at_index("meeting_id"),
+    ],
+    "subscriptions": [
+        _id_index(),
+        IndexModel([("platform", ASCENDING), ("id", ASCENDING)], name="platform_id"),
+    ],
+}
+
+# Query shapes issued by the handlers, checked by verify_indexes.py. Each entry is
+# (handler, collection, filter, sort); none of them may plan as a COLLSCAN.
+_BY_CREATED = [("created_at", -1), ("id", -1)]
+_BY_CREATED_ASC = [("created_at", 1), ("id", 1)]
+INDEX_QUERY_SHAPES = [
+    ("login", "users", {"username": "x"}, None),
+    ("get_users", "users", {}, _BY_CREATED_ASC),
+    ("get_user", "users", {"id": "x"}, None),
+    ("get_projects", "projects", {}, _BY_CREATED_ASC),
+    ("update_project", "projects", {"id": "x"}, None),
+    ("get_tasks", "tasks", {}, _BY_CREATED_ASC),
+    ("get_tasks", "tasks", {"project_id": "x"}, _BY_CREATED_ASC),
+    ("get_tasks", "tasks", {"assigned_to": "x"}, _BY_CREATED_ASC),
+    ("update_task", "tasks", {"id": "x"}, None),
+    ("get_calendar_events", "calendar_events", {}, _BY_CREATED_ASC),
+    ("update_calendar_event", "calendar_events", {"id": "x"}, None),
+    ("enqueue_calendar_sync", "calendar_sync_jobs", {"event_id": "x", "status": "pending"}, None),
+    ("CalendarSyncWorker", "calendar_sync_jobs", {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": "x"}},
+        {"status": "running", "locked_until": {"$lt": "x"}},
+    ]}, [("next_attempt_at", 1)]),
+    ("CalendarSyncWorker", "calendar_sync_jobs", {"claim": "x"}, None),
+    ("get_calendar_events", "calendar_events", {"start_time": {"$lt": "x"}, "$or": [
+        {"end_time": {"$gt": "x"}},
+        {"recurrence": {"$type": "string"}, "recurrence_end": {"$not": {"$lte": "x"}}},
+    ]}, [("start_time", 1)]),
+    ("get_leave_requests", "leave_requests", {}, _BY_CREATED_ASC),
+    ("update_leave_request", "leave_requests", {"id": "x"}, None),
+    ("get_content_items", "content_items", {}, _BY_CREATED_ASC),
+    ("update_content_item", "content_items", {"id": "x"}, None),
+    ("get_ai_projects", "ai_projects", {}, _BY_CREATED_ASC),
+    ("update_ai_project", "ai_projects", {"id": "x"}, None),
+    ("get_research_notes", "research_notes", {}, _BY_CREATED_ASC),
+    ("delete_research_note", "research_notes", {"id": "x"}, None),
+    ("get_research_notes", "research_notes", {"tags": {"$all": ["x", "y"]}}, _BY_CREATED_ASC),
+    ("get_research_notes", "research_notes", {"tags": {"$in": ["x", "y"]}}, _BY_CREATED_ASC),
+    ("get_research_notes", "research_notes", {"author": "x"}, _BY_CREATED_ASC),
+    ("get_research_tags", "research_tags", {}, [("count", -1), ("tag", 1)]),
+    ("get_academy_courses", "academy_courses", {}, _BY_CREATED_ASC),
+    ("update_academy_course", "academy_courses", {"id": "x"}, None),
+    ("get_personal_tasks", "personal_tasks", {"user_id": "x"}, _BY_CREATED_ASC),
+    ("update_personal_task", "personal_tasks", {"id": "x"}, None),
+    ("get_cloud_services", "cloud_services", {}, _BY_CREATED_ASC),
+    ("update_cloud_service", "cloud_services", {"id": "x"}, None),
+    ("get_dashboard_stats", "tasks", {"assigned_to": "x", "status": {"$ne": "done"}}, [("created_at", -1)]),
+    ("get_dashboard_stats", "tasks", {"assigned_to": "x", "status": "done"}, None),
+    ("get_dashboard_stats", "projects", {"assigned_members": "x"}, None),
+    ("get_dashboard_stats", "leave_requests", {"status": "pending"}, None),
+    ("get_dashboard_stats", "kudos_balances", {"user_id": "x"}, None),
+    ("get_dashboard_stats", "meetings", {"$or": [{"organizer": "x"}, {"attendees": "x"}], "start_time": {"$gte": "x"}}, [("start_time", 1)]),
+    ("get_dashboard_stats", "projects", {}, [("created_at", -1)]),
+    ("get_dashboard_stats", "tasks", {}, [("created_at", -1)]),
+    ("get_finance_transactions", "finance_transactions", {}, _BY_CREATED),
+    ("delete_transaction", "finance_transactions", {"id": "x"}, None),
+    ("get_finance_summary", "finance_rollups", {"month": {"$gte": "x", "$lte": "x"}}, None),
+    ("get_finance_summary", "finance_transactions", {"date": {"$gte": "x", "$lt": "x"}}, None),
+    ("get_salary_records", "salary_records", {}, _BY_CREATED),
+    ("get_finance_summary", "salary_records", {"status": "pending"}, None),
+    ("update_salary_status", "salary_records", {"id": "x"}, None),
+    ("run_payroll", "salary_records", {"month": {"$lt": "x"}}, [("user_id", -1), ("month", -1)]),
+    ("run_payroll", "attendance", {"date": {"$gte": "x", "$lt": "x"}}, None),
+    ("pay_payroll", "salary_records", {"month": "x", "status": "pending"}, None),
+    ("pay_payroll", "finance_transactions", {"salary_record_id": {"$in": ["x", "y"], "$type": "string"}}, None),
+    ("export_finance", "finance_transactions", {"date": {"$gte": "x", "$lt": "x"}}, [("date", 1), ("id", 1)]),
+    ("export_finance", "salary_records", {"month": {"$gte": "x", "$lt": "x"}}, [("month", 1), ("user_id", 1)]),
+    ("get_finance_analytics", "finance_rollups", {"month": {"$gte": "x", "$lte": "x"}}, None),
+    ("check_in", "attendance", {"user_id": "x", "date": "x"}, None),
+    ("get_attendance_records", "attendance", {}, [("date", -1), ("id", -1)]),
+    ("get_attendance_records", "attendance", {"user_id": "x"}, [("date", -1), ("id", -1)]),
+    ("get_attendance_records", "attendance", {"user_id": "x", "date": {"$gte": "x", "$lt": "x"}}, [("date", -1), ("id", -1)]),
+    ("get_attendance_summary", "attendance", {"user_id": "x"}, None),
+    ("get_team_attendance_summary", "attendance", {"date": {"$gte": "x", "$lt": "x"}}, None),
+    ("get_availability_grid", "availability", {"month": "x"}, None),
+    ("set_availability", "availability", {"user_id": "x", "month": "x"}, None),
+    # Both the find and the delete_many in revoke_leave
+    ("revoke_leave", "attendance", {"user_id": "x", "date": {"$in": ["x", "y"]}, "status": "leave", "check_in": None}, None),
+    ("get_kudos_transactions", "kudos_transactions", {"user_id": "x"}, _BY_CREATED),
+    ("get_kudos_transactions", "kudos_transactions", {}, _BY_CREATED),
+    ("get_kudos_leaderboard", "kudos_balances", {}, [("total_kudos", -1), ("user_id", 1)]),
+    ("get_kudos_leaderboard", "kudos_balances", {"total_kudos": {"$gt": 0}}, None),
+    ("get_kudos_leaderboard", "kudos_periods", {"period": "x"}, [("total_kudos", -1), ("user_id", 1)]),
+    ("get_kudos_leaderboard", "kudos_periods", {"period": "x", "total_kudos": {"$gt": 0}}, None),
+    ("get_training_courses", "training_courses", {}, _BY_CREATED),
+    ("update_training_course", "training_courses", {"id": "x"}, None),
+    ("get_training_progress", "training_progress", {}, _BY_CREATED_ASC),
+    ("get_training_progress", "training_progress", {"user_id": "x"}, None),
+    ("get_training_progress", "training_progress", {"course_id": "x"}, None),
+    ("enroll_training", "training_progress", {"user_id": "x", "course_id": "x"}, None),
+    ("update_training_progress", "training_progress", {"id": "x"}, None),
+    ("get_meetings", "meetings", {}, [("start_time", -1), ("id", -1)]),
+    ("get_meetings", "meetings", {"$or": [{"organizer": "x"}, {"attendees": "x"}]}, [("start_time", -1), ("id", -1)]),
+    ("get_meetings", "meetings", {"meeting_type": "x"}, [("start_time", -1), ("id", -1)]),
+    ("update_meeting", "meetings", {"id": "x"}, None),
+    ("load_free_busy", "meetings", {
+        "$or": [{"organizer": {"$in": ["x", "y"]}}, {"attendees": {"$in": ["x", "y"]}}],
+        "start_time": {"$lt": "x"}, "end_time": {"$gt": "x"},
+    }, None),
+    ("load_free_busy", "calendar_events", {"attendees": {"$in": ["x", "y"]}, "start_time": {"$lt": "x"}, "$or": [
+        {"end_time": {"$gt": "x"}},
+        {"recurrence": {"$type": "string"}, "recurrence_end": {"$not": {"$lte": "x"}}},
+    ]}, None),
+    ("record_meeting_attendance", "users", {"id": {"$in": ["x", "y"]}}, None),
+    ("record_meeting_attendance", "meeting_attendance", {"meeting_id": "x", "user_id": "x"}, None),
+    ("record_meeting_attendance", "kudos_transactions", {"source": "x"}, None),
+    ("record_meeting_attendance", "kudos_transactions", {"source": {"$in": ["x", "y"]}}, None),
+    ("get_meeting_attendance", "meeting_attendance", {"meeting_id": "x"}, _BY_CREATED_ASC),
+    ("get_subscriptions", "subscriptions", {}, [("platform", 1), ("id", 1)]),
+    ("search", "tasks", {"$text": {"$search": "x"}}, None),
+    ("search", "projects", {"$text": {"$search": "x"}}, None),
+    ("search", "research_notes", {"$text": {"$search": "x"}}, None),
+    ("search", "content_items", {"$text": {"$search": "x"}}, None),
+    ("search", "tasks", {"title": {"$in": [re.compile("^x"), re.compile("^X")]}}, [("title", 1)]),
+    ("search", "projects", {"name": {"$in": [re.compile("^x"), re.compile("^X")]}}, [("name", 1)]),
+    ("search", "research_notes", {"title": {"$in": [re.compile("^x"), re.compile("^X")]}}, [("title", 1)]),
+    ("search", "content_items", {"title": {"$in": [re.compile("^x"), re.compile("^X")]}}, [("title", 1)]),
+    ("update_subscription", "subscriptions", {"id": "x"}, None),
+]
+
+_INDEX_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+def _index_matches(spec: dict, info: dict) -> bool:
+    if "weights" in spec:
+        # Text indexes are reported as _fts/_ftsx keys; the weights name the fields
+        return spec["weights"] == info.get("weights")
+    if list(spec["key"].items()) != [tuple(k) for k in info["key"]]:
+        return False
+    return all(spec.get(opt) == info.get(opt) for opt in _INDEX_OPTIONS)
+
+async def ensure_indexes():
+    """Create declared indexes and drop ones this code declared before but no longer does.
+
+    The names created for each collection are recorded in `index_registry`, so
+    indexes added by hand (or by another application) are left alone. Each
+    index is built on its own; if any of them fails, startup fails rather
+    than serving without it.
+    """
+    failures = []
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        collection = db[collection_name]
+        specs = {index.document["name"]: index.document for index in indexes}
+        registered = await db.index_registry.find_one({"_id": collection_name}) or {}
+        managed = set(registered.get("names", ()))
+        existing = await collection.index_information()
+        for index_name, info in existing.items():
+            if index_name == "_id_":
+                continue
+            stale = index_name in specs and not _index_matches(specs[index_name], info)
+            retired = index_name not in specs and index_name in managed
+            if stale or retired:
+                logger.info(f"Dropping index {collection_name}.{index_name}")
+                await collection.drop_index(index_name)
+        for index_name, index in zip(specs, indexes):
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                logger.error(f"Failed to build index {collection_name}.{index_name}: {e}")
+                failures.append(f"{collection_name}.{index_name}")
+        # Failed names stay registered too, so a later spec change can still drop them
+        await db.index_registry.update_one({"_id": collection_name}, {"$set": {"names": sorted(specs)}}, upsert=True)
+    if failures:
+        raise RuntimeError(f"Failed to build indexes: {', '.join(failures)}")
+
+def _plan_stages(plan) -> set:
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= _plan_stages(item)
+    return stages
+
+async def verify_query_plans() -> list:
+    """Explain every registered query shape and return the ones planned as a COLLSCAN"""
+    failures = []
+    for handler, collection_name, query, sort in INDEX_QUERY_SHAPES:
+        cursor = db[collection_name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        stages = _plan_stages(explanation["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            failures.append({"handler": handler, "collection": collection_name, "filter": query, "sort": sort})
+    return failures
+
+# ========== RESPONSES ==========
+
+def trusted_response(content, headers: Optional[dict] = None) -> ORJSONResponse:
+    """Serialize documents we wrote ourselves straight to JSON.
+
+    Returning a Response skips FastAPI's response_model re-validation and
+    re-serialization, while the route keeps its response_model for the
+    OpenAPI schema. Only use it for documents read with model_projection(),
+    since several update handlers $set whatever fields the client sends and
+    nothing else would filter those out.
+    """
+    return ORJSONResponse(content=content, headers=headers)
+
+def model_projection(model, exclude: tuple = ()) -> dict:
+    """Projection that reads only the fields `model` declares (minus `exclude`)"""
+    return {"_id": 0, **{field: 1 for field in model.model_fields if field not in exclude}}
+
+# ========== PAGINATION ==========
+
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_SIZE = 200
+
+SORT_BY_CREATED = [("created_at", ASCENDING), ("id", ASCENDING)]
+SORT_BY_CREATED_DESC = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+class PageParams:
+    """Keyset pagination parameters shared by the list endpoints.
+
+    `after` is the opaque cursor returned in the X-Next-Cursor header of the
+    previous page. Requesting `format=ndjson` (or sending an Accept header of
+    application/x-ndjson) streams every matching document instead; `limit`
+    is then optional.
+    """
+    def __init__(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        format: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.after = after
+        self.stream = format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def encode_cursor(doc: dict, sort: list) -> str:
+    values = [doc.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, sort: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def _keyset_filter(sort: list, values: list) -> dict:
+    # (a, b) > (x, y)  <=>  a > x OR (a == x AND b > y), with the comparison flipped per descending key
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prefix_field: value for (prefix_field, _), value in zip(sort[:i], values[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def _ndjson_stream(cursor):
+    lines = []
+    async for doc in cursor:
+        lines.append(orjson.dumps(doc, default=str))
+        if len(lines) >= NDJSON_CHUNK_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+async def paginate(collection, query: dict, sort: list, page: PageParams, model, exclude: tuple = ()):
+    """Return one keyset page of `collection` (or an NDJSON stream of all of it) in `sort` order.
+
+    Only the fields `model` declares are read, minus `exclude`. The last
+    entry of `sort` must be unique (normally `id`) so the cursor is unambiguous.
+    """
+    if page.after:
+        keyset = _keyset_filter(sort, decode_cursor(page.after, sort))
+        query = {"$and": [query, keyset]} if query else keyset
+    cursor = collection.find(query, model_projection(model, exclude)).sort(sort)
+
+    if page.stream:
+        if page.limit:
+            cursor = cursor.limit(page.limit)
+        return StreamingResponse(_ndjson_stream(cursor.batch_size(NDJSON_CHUNK_SIZE)), media_type=NDJSON_MEDIA_TYPE)
+
+    limit = page.limit or MAX_PAGE_SIZE
+    docs = await cursor.limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(docs[-1], sort)
+    return trusted_response(docs, headers)
+
+# ========== CACHING ==========
+
+_MISSING = object()
+
+class TTLCache:
+    """In-process cache whose entries expire `ttl` seconds after being stored.
+
+    Concurrent misses for the same key share a single load.
+    """
+    def __init__(self, ttl: float, maxsize: int = 4096):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._loading = {}
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return default
+        return entry[1]
+
+    def set(self, key, value):
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+            # A load already in flight may have read stale data; don't let it populate the cache
+            self._loading.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._loading.clear()
+
+    async def get_or_load(self, key, loader):
+        """Return (value, hit), calling `loader()` on a miss"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value, True
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), True
+        pending = asyncio.ensure_future(loader())
+        self._loading[key] = pending
+        try:
+            value = await pending
+        finally:
+            current = self._loading.get(key) is pending
+            if current:
+                self._loading.pop(key, None)
+        if current:
+            self.set(key, value)
+        return value, False
+
+# ========== TRANSACTIONS ==========
+
+_transactions_supported = None
+
+async def transactions_supported() -> bool:
+    """Multi-document transactions need a replica set or a sharded cluster"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+async def run_in_transaction(operation):
+    """Run `operation(session)` in a transaction when the deployment supports one, else with session=None"""
+    if not await transactions_supported():
+        return await operation(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(operation)
+
+# ========== SLOW QUERY RECORDING ==========
+
+async def ensure_slow_query_log():
+    try:
+        await db.create_collection("slow_queries", capped=True, size=SLOW_QUERY_LOG_BYTES)
+    except CollectionInvalid:
+        pass
+    slow_query_log.loop = asyncio.get_running_loop()
+
+async def record_slow_query(entry: dict, command: Optional[dict]):
+    if command is not None:
+        pipeline = command.get("pipeline", [])
+        if not any("$out" in stage or "$merge" in stage for stage in pipeline):
+            explain_command = {k: v for k, v in command.items() if k not in _SESSION_FIELDS and not k.startswith("$")}
+            try:
+                explanation = await client[entry["database"]].command(
+                    {"explain": explain_command, "verbosity": "executionStats"}
+                )
+                entry["plan"] = _summarize_explain(explanation)
+                entry["inefficient"] = entry["plan"]["inefficient"]
+            except OperationFailure as e:
+                logger.warning(f"Could not explain {entry['command']} on {entry['collection']}: {e}")
+    # Fast queries are only explained to check them, and kept when they examine too much
+    if not entry["slow"] and not entry["inefficient"]:
+        return
+    try:
+        await db.slow_queries.insert_one(entry)
+    except OperationFailure as e:
+        logger.warning(f"Could not record slow query: {e}")
+
+# ========== AUTHENTICATION ==========
+
+JWT_ALGORITHM = "HS256"
+JWT_SECRET = os.environ.get('JWT_SECRET')
+if not JWT_SECRET:
+    # A generated secret would only validate on one worker and die with it
+    raise RuntimeError("JWT_SECRET must be set so every worker signs and verifies the same tokens")
+JWT_EXPIRE_MINUTES = int(os.environ.get('JWT_EXPIRE_MINUTES', '720'))
+FINANCE_ROLES = set(os.environ.get('FINANCE_ROLES', 'Admin').split(','))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Claims of the authenticated request, for handlers that need the caller
+current_claims = contextvars.ContextVar("current_claims", default=None)
+
+class ClaimsCache:
+    """LRU of already-verified tokens so repeat requests skip signature checks"""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, token: str):
+        claims = self._entries.get(token)
+        if claims is None:
+            return None
+        if claims["exp"] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return claims
+
+    def set(self, token: str, claims: dict):
+        self._entries[token] = claims
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def evict_user(self, user_id: str):
+        for token in [token for token, claims in self._entries.items() if claims["sub"] == user_id]:
+            del self._entries[token]
+
+claims_cache = ClaimsCache(int(os.environ.get('AUTH_CLAIMS_CACHE_SIZE', '4096')))
+
+SESSION_REVOCATION_REFRESH_SECONDS = float(os.environ.get('SESSION_REVOCATION_REFRESH_SECONDS', '30'))
+
+class SessionRevocations:
+    """Per-user cutoffs: tokens issued before a user's cutoff are rejected.
+
+    Tokens carry the role, so a role change, deactivation or deletion has to
+    invalidate the ones already issued. Cutoffs are stored in
+    session_revocations and each process reloads them every SESSION_REVOCATION_REFRESH_SECONDS,
+    so other workers pick up a revocation within that interval.
+    """
+    def __init__(self):
+        self._cutoffs = {}
+
+    def is_revoked(self, claims: dict) -> bool:
+        cutoff = self._cutoffs.get(claims["sub"])
+        return cutoff is not None and claims["iat"] < cutoff
+
+    async def revoke(self, user_id: str):
+        cutoff = int(time.time())
+        self._cutoffs[user_id] = cutoff
+        claims_cache.evict_user(user_id)
+        await db.session_revocations.update_one(
+            {"user_id": user_id},
+            # A cutoff is moot once every token issued before it has expired
+            {"$set": {"cutoff": cutoff, "expires_at": datetime.fromtimestamp(cutoff + JWT_EXPIRE_MINUTES * 60, timezone.utc)}},
+            upsert=True
+        )
+
+    async def refresh(self):
+        self._cutoffs = {doc["user_id"]: doc["cutoff"] async for doc in db.session_revocations.find({}, {"_id": 0})}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(SESSION_REVOCATION_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except PyMongoError as e:
+                logger.warning(f"Could not refresh session revocations: {e}")
+
+session_revocations = SessionRevocations()
+
+def create_access_token(user: dict) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": user["id"],
+        "role": user["role"],
+        "name": user["name"],
+        "iat": now,
+        "exp": now + JWT_EXPIRE_MINUTES * 60,
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> dict:
+    claims = claims_cache.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+        claims_cache.set(token, claims)
+    if session_revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Session revoked, please log in again", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+def _claims_for(token: Optional[str]) -> dict:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    claims = decode_access_token(token)
+    current_claims.set(claims)
+    return claims
+
+async def authenticate(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    """Verify the Bearer session token without touching the database"""
+    return _claims_for(credentials.credentials if credentials else None)
+
+async def authenticate_query_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    access_token: Optional[str] = Query(None, include_in_schema=False),
+) -> dict:
+    """authenticate() that also takes the token from `?access_token=`.
+
+    Only for the routes whose clients cannot set headers (EventSource,
+    calendar subscriptions); a token in the URL ends up in access logs and
+    Referer headers, so nothing else accepts one there.
+    """
+    return _claims_for(credentials.credentials if credentials else access_token)
+
+def require_roles(*roles: str):
+    """Dependency that only lets callers whose token carries one of `roles` through"""
+    allowed = set(roles)
+
+    async def check_role(claims: dict = Depends(authenticate)) -> dict:
+        if claims.get("role") not in allowed:
+            raise HTTPException(status_code=403, detail="Not permitted")
+        return claims
+    return check_role
+
+FINANCE_ACCESS = [Depends(require_roles(*FINANCE_ROLES))]
+ADMIN_ACCESS = [Depends(require_roles("Admin"))]
+
+# ========== LIVE EVENTS ==========
+
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '256'))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+EVENT_RETRY_MS = 3000
+# With several workers each process only sees its own writes; a change stream
+# gives every worker every write instead (requires a replica set)
+EVENTS_CHANGE_STREAM = os.environ.get('EVENTS_CHANGE_STREAM', '').lower() in ('1', 'true', 'yes')
+
+# Fields naming the users a document concerns, used to route events to them
+_EVENT_USER_FIELDS = ("user_id", "assigned_to", "assigned_members", "organizer", "attendees", "assigned_engineers")
+_EVENT_REDACTED_FIELDS = {"_id", "password"}
+_FINANCE_TOPICS = {"finance_transactions", "salary_records"}
+_PRIVATE_TOPICS = {"personal_tasks"}
+# Derived or diagnostic collections the change stream should not forward
+_UNPUBLISHED_COLLECTIONS = {
+    "slow_queries", "activity_log", "calendar_sync_jobs", "finance_rollups",
+    "kudos_balances", "kudos_periods", "availability", "research_tags", "index_registry",
+    "session_revocations",
+}
+_CHANGE_OPS = {"insert": "create", "update": "update", "replace": "update", "delete": "delete"}
+
+metrics.describe("events_published_total", "counter", "Live change events published by collection")
+metrics.describe("events_subscribers", "gauge", "Open live event streams")
+metrics.describe("events_dropped_total", "counter", "Live event streams told to resync after falling behind")
+
+def _users_of(*docs) -> set:
+    users = set()
+    for doc in docs:
+        if not doc:
+            continue
+        for field in _EVENT_USER_FIELDS:
+            value = doc.get(field)
+            if isinstance(value, str):
+                users.add(value)
+            elif isinstance(value, list):
+                users.update(item for item in value if isinstance(item, str))
+    return users
+
+class EventSubscriber:
+    def __init__(self, topics: set, user_id: Optional[str], claims: dict):
+        self.topics = topics
+        self.user_id = user_id
+        self.claims = claims
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event: dict, users: set) -> bool:
+        topic = event["collection"]
+        # "*" marks a resync that covers every collection
+        if self.topics and topic != "*" and topic not in self.topics:
+            return False
+        if topic in _FINANCE_TOPICS and self.claims.get("role") not in FINANCE_ROLES:
+            return False
+        if topic in _PRIVATE_TOPICS and self.claims.get("sub") not in users:
+            return False
+        # Collection-wide resyncs reach everyone following the topic
+        return not self.user_id or event["op"] == "resync" or self.user_id in users
+
+    def drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+class EventBus:
+    """In-process fan-out of change events to live subscribers.
+
+    Publishing never waits: a subscriber whose queue is full stops receiving
+    events and is told to resync, so one slow client can't hold up writers.
+    """
+    def __init__(self):
+        self._subscribers = set()
+        self._seq = 0
+
+    def subscribe(self, topics: set, user_id: Optional[str], claims: dict) -> EventSubscriber:
+        subscriber = EventSubscriber(topics, user_id, claims)
+        self._subscribers.add(subscriber)
+        metrics.inc("events_subscribers", {})
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            metrics.inc("events_subscribers", {}, -1)
+
+    def publish(self, event: dict, users: set = frozenset()):
+        self._seq += 1
+        event["seq"] = self._seq
+        metrics.inc("events_published_total", {"collection": event["collection"]})
+        for subscriber in self._subscribers:
+            if subscriber.overflowed or not subscriber.wants(event, users):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                metrics.inc("events_dropped_total", {})
+
+event_bus = EventBus()
+
+def _change_event(collection: str, op: str, doc_id: Optional[str], fields: Optional[dict] = None) -> dict:
+    event = {"collection": collection, "op": op, "id": doc_id, "ts": datetime.now(timezone.utc).isoformat()}
+    if fields:
+        event["fields"] = {k: v for k, v in fields.items() if k not in _EVENT_REDACTED_FIELDS}
+    return event
+
+def publish_change(collection: str, op: str, doc_id: str, fields: Optional[dict] = None, previous: Optional[dict] = None):
+    """Tell live subscribers that a document changed, and record it in the activity log.
+
+    `fields` is the created document or the fields that were set; `previous`
+    is whatever the handler already read of the old document, so users who
+    were just removed from it still hear about the change.
+    """
+    activity_log.append(collection, op, doc_id, fields, previous)
+    if EVENTS_CHANGE_STREAM:
+        # The change stream watcher publishes every write, including this one
+        return
+    event_bus.publish(_change_event(collection, op, doc_id, fields), _users_of(fields, previous))
+
+def _event_from_change(change: dict):
+    op = _CHANGE_OPS.get(change["operationType"])
+    collection = change.get("ns", {}).get("coll")
+    if op is None or collection is None or collection in _UNPUBLISHED_COLLECTIONS:
+        return None
+    document = change.get("fullDocument") or {}
+    before = change.get("fullDocumentBeforeChange") or {}
+    doc_id = document.get("id") or before.get("id")
+    if doc_id is None:
+        # A delete without a pre-image only carries the Mongo _id, which clients never see
+        return _change_event(collection, "resync", None), set()
+    if op == "update" and change.get("updateDescription"):
+        fields = change["updateDescription"]["updatedFields"]
+    elif op == "delete":
+        fields = None
+    else:
+        fields = document
+    return _change_event(collection, op, doc_id, fields), _users_of(document, before)
+
+async def watch_changes():
+    """Publish every write in the database to this worker's subscribers via a change stream"""
+    resume_token = None
+    delay = 1
+    while True:
+        try:
+            async with db.watch(
+                full_document="updateLookup",
+                full_document_before_change="whenAvailable",
+                resume_after=resume_token,
+            ) as stream:
+                delay = 1
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event = _event_from_change(change)
+                    if event:
+                        event_bus.publish(*event)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.warning(f"Change stream interrupted, retrying in {delay}s: {e}")
+            if isinstance(e, OperationFailure) and e.code == 286:
+                # History lost: events were missed, so every client has to resync
+                resume_token = None
+                event_bus.publish(_change_event("*", "resync", None))
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+@public_router.get("/events")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = None,
+    user_id: Optional[str] = None,
+    claims: dict = Depends(authenticate_query_token),
+):
+    """Server-sent change events for the given comma-separated collections.
+
+    Each `change` event carries the collection, document id, op and the fields
+    that changed; a `resync` event means events were missed and the client
+    should refetch.
+    """
+    wanted = {topic for topic in (topics or "").split(",") if topic}
+    subscriber = event_bus.subscribe(wanted, user_id, claims)
+
+    async def stream():
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n".encode()
+            while True:
+                if subscriber.overflowed:
+                    subscriber.drain()
+                    yield b"event: resync\ndata: {}\n\n"
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keepalive\n\n"
+                    continue
+                name = b"resync" if event["op"] == "resync" else b"change"
+                yield b"id: %d\nevent: %s\ndata: %s\n\n" % (event["seq"], name, orjson.dumps(event, default=str))
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ========== ACTIVITY LOG ==========
+
+ACTIVITY_LOG_BYTES = int(os.environ.get('ACTIVITY_LOG_BYTES', str(64 * 1024 * 1024)))
+ACTIVITY_FLUSH_SECONDS = 0.5
+ACTIVITY_BATCH_SIZE = 200
+ACTIVITY_FOLLOW_IDLE_SECONDS = 15
+# Personal planner entries are nobody else's business
+_UNLOGGED_ACTIVITY = {"personal_tasks"}
+_COMPLETED_STATUSES = {"done", "completed"}
+
+def _activity_entry(collection: str, op: str, doc_id: Optional[str], fields: Optional[dict], previous: Optional[dict]) -> dict:
+    fields = fields or {}
+    previous = previous or {}
+    claims = current_claims.get() or {}
+    verb = "complete" if op == "update" and fields.get("status") in _COMPLETED_STATUSES else op
+    project_id = doc_id if collection == "projects" else fields.get("project_id") or previous.get("project_id")
+    return {
+        "id": str(uuid.uuid4()),
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "actor": claims.get("sub"),
+        "actor_name": claims.get("name"),
+        "type": f"{collection}.{verb}",
+        "collection": collection,
+        "op": op,
+        "doc_id": doc_id,
+        "title": fields.get("title") or fields.get("name") or previous.get("title") or previous.get("name"),
+        "project_id": project_id,
+        "fields": sorted(key for key in fields if key not in _EVENT_REDACTED_FIELDS) if op == "update" else [],
+    }
+
+class ActivityLog:
+    """Appends activity entries to the capped activity_log collection.
+
+    Handlers only buffer an entry; a background task writes the buffer with
+    one insert_many every ACTIVITY_FLUSH_SECONDS (sooner once a batch fills),
+    so recording activity adds no round trip to any request.
+    """
+    def __init__(self):
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+
+    def append(self, collection: str, op: str, doc_id: Optional[str], fields: Optional[dict] = None, previous: Optional[dict] = None):
+        if collection in _UNLOGGED_ACTIVITY:
+            return
+        self._buffer.append(_activity_entry(collection, op, doc_id, fields, previous))
+        if len(self._buffer) >= ACTIVITY_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def flush(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            await db.activity_log.insert_many(batch, ordered=True)
+        except PyMongoError as e:
+            logger.warning(f"Could not record {len(batch)} activity entries: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), ACTIVITY_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+activity_log = ActivityLog()
+
+async def ensure_activity_log():
+    try:
+        await db.create_collection("activity_log", capped=True, size=ACTIVITY_LOG_BYTES)
+    except CollectionInvalid:
+        pass
+
+def _activity_filter(actor: Optional[str], project_id: Optional[str], type: Optional[str], claims: dict) -> dict:
+    # `type` is either a collection ("tasks") or a collection.verb ("tasks.complete")
+    query = {}
+    if actor:
+        query["actor"] = actor
+    if project_id:
+        query["project_id"] = project_id
+    if type:
+        query["type" if "." in type else "collection"] = type
+    if claims.get("role") not in FINANCE_ROLES:
+        query = {"$and": [query, {"collection": {"$nin": list(_FINANCE_TOPICS)}}]}
+    return query
+
+@api_router.get("/activity")
+async def get_activity(
+    request: Request,
+    actor: Optional[str] = None,
+    project_id: Optional[str] = None,
+    type: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    follow: bool = False,
+    claims: dict = Depends(authenticate),
+):
+    """Newest-first activity, read backwards from the tail of the capped log.
+
+    `before` pages further back (pass the last entry's ts). With follow=true
+    the response is instead an NDJSON stream of new entries as they are
+    appended, read through a tailable cursor.
+    """
+    query = _activity_filter(actor, project_id, type, claims)
+    if follow:
+        return StreamingResponse(_follow_activity(request, query), media_type=NDJSON_MEDIA_TYPE)
+    if before:
+        query = {"$and": [query, {"ts": {"$lt": before}}]}
+    return await db.activity_log.find(query, {"_id": 0}).sort("$natural", DESCENDING).limit(limit).to_list(limit)
+
+async def _follow_activity(request: Request, query: dict):
+    # Start after the current tail so only new entries are streamed
+    newest = await db.activity_log.find({}, {"_id": 0, "ts": 1}).sort("$natural", DESCENDING).limit(1).to_list(1)
+    since = newest[0]["ts"] if newest else ""
+    cursor = None
+    idle_since = time.monotonic()
+    while not await request.is_disconnected():
+        # A tailable cursor dies at once on an empty log or when nothing matches
+        # yet, so it is reopened after the last entry sent for as long as the
+        # client stays connected
+        if cursor is None or not cursor.alive:
+            cursor = db.activity_log.find(
+                {"$and": [query, {"ts": {"$gt": since}}]}, {"_id": 0}, cursor_type=CursorType.TAILABLE_AWAIT
+            )
+        async for entry in cursor:
+            since = entry["ts"]
+            yield orjson.dumps(entry) + b"\n"
+            idle_since = time.monotonic()
+        if time.monotonic() - idle_since >= ACTIVITY_FOLLOW_IDLE_SECONDS:
+            # Keeps proxies from timing the stream out
+            yield b"\n"
+            idle_since = time.monotonic()
+        await asyncio.sleep(0.5)
+
 # ========== AUTH ENDPOINTS ==========
 
-@api_router.post("/auth/login")
+@public_router.post("/auth/login")
 async def login(request: LoginRequest):
     user = await db.users.find_one({"username": request.username}, {"_id": 0})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not pwd_context.verify(request.password, user["password"]):
+    valid, new_hash = await verify_password(request.password, user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if user.get("is_active") is False:
+        raise HTTPException(status_code=403, detail="Account is deactivated")
+    
+    # Transparently upgrade hashes created with a different cost factor
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password": new_hash}})
     
     # Remove password from response
     user.pop("password")
-    return {"user": user, "token": user["id"]}
+    return {
+        "user": user,
+        "token": create_access_token(user),
+        "token_type": "bearer",
+        "expires_in": JWT_EXPIRE_MINUTES * 60
+    }
 
-@api_router.post("/auth/register", response_model=UserResponse)
+# Only admins add team members; the first admin is created with create_admin.py
+@api_router.post("/auth/register", response_model=UserResponse, dependencies=ADMIN_ACCESS)
 async def register(user_data: UserCreate):
     # Check if username exists
     existing = await db.users.find_one({"username": user_data.username})
@@ -467,7 +1948,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # Hash password
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user_dict = user_data.model_dump()
     user_dict["password"] = hashed_password
     
@@ -475,6 +1956,7 @@ async def register(user_data: UserCreate):
     doc = user_obj.model_dump()
     
     await db.users.insert_one(doc)
+    publish_change("users", "create", doc["id"], doc)
     
     # Return without password
     response_dict = {k: v for k, v in doc.items() if k != 'password'}
@@ -483,9 +1965,8 @@ async def register(user_data: UserCreate):
 # ========== USER/TEAM MANAGEMENT ==========
 
 @api_router.get("/users", response_model=List[UserResponse])
-async def get_users():
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    return users
+async def get_users(page: PageParams = Depends()):
+    return await paginate(db.users, {}, SORT_BY_CREATED, page, UserResponse)
 
 @api_router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str):
@@ -494,155 +1975,541 @@ async def get_user(user_id: str):
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+# Fields that grant or withdraw access, so only admins may change them
+_ADMIN_USER_FIELDS = ("role", "is_active")
+
 @api_router.put("/users/{user_id}")
-async def update_user(user_id: str, user_data: UserUpdate):
+async def update_user(user_id: str, user_data: UserUpdate, claims: dict = Depends(authenticate)):
     update_dict = {k: v for k, v in user_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No data to update")
     
+    if claims.get("role") != "Admin" and any(field in update_dict for field in _ADMIN_USER_FIELDS):
+        current = await db.users.find_one({"id": user_id}, {"_id": 0, "role": 1, "is_active": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="User not found")
+        current.setdefault("is_active", True)
+        # The team form always sends the role back; only an actual change needs an admin
+        if any(field in update_dict and update_dict[field] != current[field] for field in _ADMIN_USER_FIELDS):
+            raise HTTPException(status_code=403, detail="Only admins can change roles or deactivate users")
+        for field in _ADMIN_USER_FIELDS:
+            update_dict.pop(field, None)
+        if not update_dict:
+            return {"message": "User updated successfully"}
+    
     result = await db.users.update_one({"id": user_id}, {"$set": update_dict})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    if any(field in update_dict for field in _ADMIN_USER_FIELDS):
+        await session_revocations.revoke(user_id)
     
+    publish_change("users", "update", user_id, update_dict)
     return {"message": "User updated successfully"}
 
-@api_router.delete("/users/{user_id}")
+@api_router.delete("/users/{user_id}", dependencies=ADMIN_ACCESS)
 async def delete_user(user_id: str):
     result = await db.users.delete_one({"id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await session_revocations.revoke(user_id)
+    publish_change("users", "delete", user_id)
     return {"message": "User deleted successfully"}
 
+# ========== BULK WRITES ==========
+
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '500'))
+_BULK_PROTECTED_FIELDS = {"_id", "id", "created_at"}
+
+metrics.describe("bulk_batch_duration_seconds", "histogram", "Bulk create/update batch latency by collection and operation")
+metrics.describe("bulk_items_total", "counter", "Items submitted to bulk endpoints by collection, operation and outcome")
+
+class BulkUpdateItem(BaseModel):
+    id: str
+    fields: dict
+
+def _check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="No items to process")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per batch")
+
+def _bulk_result(collection: str, op: str, started: float, count: int, errors: list, **extra) -> dict:
+    elapsed = time.perf_counter() - started
+    metrics.observe("bulk_batch_duration_seconds", {"collection": collection, "op": op}, elapsed)
+    metrics.inc("bulk_items_total", {"collection": collection, "op": op, "outcome": "ok"}, count - len(errors))
+    metrics.inc("bulk_items_total", {"collection": collection, "op": op, "outcome": "error"}, len(errors))
+    errors.sort(key=lambda error: error["index"])
+    return {**extra, "errors": errors, "elapsed_ms": round(elapsed * 1000, 2)}
+
+async def bulk_create(collection: str, model, create_model, items: List[dict]) -> dict:
+    """Validate `items` one by one and insert the valid ones with a single unordered insert_many.
+
+    Invalid or rejected items are reported by their position in the request
+    instead of failing the whole batch.
+    """
+    _check_batch_size(items)
+    started = time.perf_counter()
+    docs, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            docs.append(model(**create_model(**item).model_dump()).model_dump())
+            positions.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors(include_url=False, include_context=False)})
+    
+    failed = set()
+    if docs:
+        try:
+            await db[collection].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details["writeErrors"]:
+                failed.add(write_error["index"])
+                errors.append({"index": positions[write_error["index"]], "error": write_error["errmsg"]})
+    
+    inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+    users = []
+    for doc in inserted:
+        doc.pop("_id", None)
+        users.extend(_users_of(doc))
+        publish_change(collection, "create", doc["id"], doc)
+    invalidate_dashboard(*users)
+    return _bulk_result(collection, "create", started, len(items), errors,
+                        inserted=len(inserted), ids=[doc["id"] for doc in inserted])
+
+async def bulk_update(collection: str, items: List[BulkUpdateItem], previous_fields: tuple) -> dict:
+    """Apply partial updates to many documents with one unordered bulk_write.
+
+    The current documents' `previous_fields` are read first (one `$in` query)
+    so unknown ids can be reported per item and the affected users'
+    dashboards invalidated.
+    """
+    _check_batch_size(items)
+    started = time.perf_counter()
+    errors = []
+    ids = list(dict.fromkeys(item.id for item in items))
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in previous_fields}}
+    previous = {doc["id"]: doc async for doc in db[collection].find({"id": {"$in": ids}}, projection)}
+    
+    operations, updates, seen = [], [], set()
+    for index, item in enumerate(items):
+        # Unordered writes to the same document would race, so each id may appear once
+        if item.id in seen:
+            errors.append({"index": index, "id": item.id, "error": "Duplicate id in batch"})
+        elif item.id not in previous:
+            errors.append({"index": index, "id": item.id, "error": "Not found"})
+        elif not item.fields or _BULK_PROTECTED_FIELDS & item.fields.keys():
+            errors.append({"index": index, "id": item.id, "error": "No updatable fields"})
+        else:
+            operations.append(UpdateOne({"id": item.id}, {"$set": item.fields}))
+            updates.append((index, item))
+            seen.add(item.id)
+    
+    failed = set()
+    if operations:
+        try:
+            await db[collection].bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details["writeErrors"]:
+                index, item = updates[write_error["index"]]
+                failed.add(write_error["index"])
+                errors.append({"index": index, "id": item.id, "error": write_error["errmsg"]})
+    
+    users = []
+    for position, (index, item) in enumerate(updates):
+        if position in failed:
+            continue
+        users.extend(_users_of(previous[item.id], item.fields))
+        publish_change(collection, "update", item.id, item.fields, previous[item.id])
+    invalidate_dashboard(*users)
+    return _bulk_result(collection, "update", started, len(items), errors, updated=len(updates) - len(failed))
+
 # ========== PROJECT MANAGEMENT ==========
 
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects():
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    return projects
+async def get_projects(page: PageParams = Depends()):
+    return await paginate(db.projects, {}, SORT_BY_CREATED, page, Project)
 
 @api_router.post("/projects", response_model=Project)
 async def create_project(project_data: ProjectCreate):
     project_obj = Project(**project_data.model_dump())
     doc = project_obj.model_dump()
     await db.projects.insert_one(doc)
+    publish_change("projects", "create", doc["id"], doc)
+    invalidate_dashboard(*doc["assigned_members"])
     return project_obj
 
+@api_router.post("/projects/bulk")
+async def create_projects_bulk(items: List[dict]):
+    return await bulk_create("projects", Project, ProjectCreate, items)
+
+@api_router.patch("/projects/bulk")
+async def update_projects_bulk(items: List[BulkUpdateItem]):
+    return await bulk_update("projects", items, ("assigned_members", "name"))
+
 @api_router.put("/projects/{project_id}")
 async def update_project(project_id: str, update_data: dict):
-    result = await db.projects.update_one({"id": project_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.projects.find_one_and_update(
+        {"id": project_id}, {"$set": update_data}, {"_id": 0, "assigned_members": 1, "name": 1}
+    )
+    if not previous:
         raise HTTPException(status_code=404, detail="Project not found")
+    invalidate_dashboard(*previous.get("assigned_members", []), *update_data.get("assigned_members", []))
+    publish_change("projects", "update", project_id, update_data, previous)
     return {"message": "Project updated successfully"}
 
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str):
-    result = await db.projects.delete_one({"id": project_id})
-    if result.deleted_count == 0:
+    previous = await db.projects.find_one_and_delete({"id": project_id}, {"_id": 0, "assigned_members": 1, "name": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Project not found")
+    invalidate_dashboard(*previous.get("assigned_members", []))
+    publish_change("projects", "delete", project_id, previous=previous)
     return {"message": "Project deleted successfully"}
 
 # ========== TASK MANAGEMENT ==========
 
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(project_id: Optional[str] = None, user_id: Optional[str] = None):
+async def get_tasks(project_id: Optional[str] = None, user_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
         query["project_id"] = project_id
     if user_id:
         query["assigned_to"] = user_id
-    tasks = await db.tasks.find(query, {"_id": 0}).to_list(1000)
-    return tasks
+    return await paginate(db.tasks, query, SORT_BY_CREATED, page, Task)
 
 @api_router.post("/tasks", response_model=Task)
 async def create_task(task_data: TaskCreate):
     task_obj = Task(**task_data.model_dump())
     doc = task_obj.model_dump()
     await db.tasks.insert_one(doc)
+    publish_change("tasks", "create", doc["id"], doc)
+    invalidate_dashboard(doc["assigned_to"])
     return task_obj
 
+@api_router.post("/tasks/bulk")
+async def create_tasks_bulk(items: List[dict]):
+    return await bulk_create("tasks", Task, TaskCreate, items)
+
+@api_router.patch("/tasks/bulk")
+async def update_tasks_bulk(items: List[BulkUpdateItem]):
+    return await bulk_update("tasks", items, ("assigned_to", "project_id", "title"))
+
 @api_router.put("/tasks/{task_id}")
 async def update_task(task_id: str, update_data: dict):
-    result = await db.tasks.update_one({"id": task_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.tasks.find_one_and_update({"id": task_id}, {"$set": update_data}, {"_id": 0, "assigned_to": 1, "project_id": 1, "title": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_dashboard(previous.get("assigned_to"), update_data.get("assigned_to"))
+    publish_change("tasks", "update", task_id, update_data, previous)
     return {"message": "Task updated successfully"}
 
 @api_router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str):
-    result = await db.tasks.delete_one({"id": task_id})
-    if result.deleted_count == 0:
+    previous = await db.tasks.find_one_and_delete({"id": task_id}, {"_id": 0, "assigned_to": 1, "project_id": 1, "title": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_dashboard(previous.get("assigned_to"))
+    publish_change("tasks", "delete", task_id, previous=previous)
     return {"message": "Task deleted successfully"}
 
 # ========== CALENDAR MANAGEMENT ==========
 
+CALENDAR_MAX_WINDOW_DAYS = 366
+CALENDAR_MAX_OCCURRENCES = 1000
+CALENDAR_MAX_SERIES_LENGTH = 10000
+CALENDAR_FEED_PAST_DAYS = int(os.environ.get('CALENDAR_FEED_PAST_DAYS', '90'))
+ICS_CHUNK_SIZE = 100
+
 @api_router.get("/calendar/events", response_model=List[CalendarEvent])
-async def get_calendar_events():
-    events = await db.calendar_events.find({}, {"_id": 0}).to_list(1000)
-    return events
+async def get_calendar_events(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    user_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    page: PageParams = Depends()
+):
+    # With from/to, every event overlapping the window is returned in start order
+    # and recurring events are expanded into their occurrences within it
+    query = _calendar_filter(user_id, event_type)
+    if start is None and end is None:
+        return await paginate(db.calendar_events, query, SORT_BY_CREATED, page, CalendarEvent)
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="from and to must be given together")
+    window_start, window_end = _parse_window(start, end)
+    query.update(_calendar_window_filter(start, end))
+    occurrences = []
+    async for event in db.calendar_events.find(query, model_projection(CalendarEvent)).sort("start_time", ASCENDING):
+        occurrences.extend(expand_occurrences(event, window_start, window_end))
+    occurrences.sort(key=lambda occurrence: occurrence["start_time"])
+    return trusted_response(occurrences)
+
+@public_router.get("/calendar/feed.ics", dependencies=[Depends(authenticate_query_token)])
+async def get_calendar_feed(user_id: Optional[str] = None, event_type: Optional[str] = None):
+    """iCalendar feed for calendar clients to subscribe to.
+
+    Authenticates with `?access_token=` since subscriptions can't send headers.
+    Recurring events are emitted once with their RRULE for the client to expand.
+    """
+    now = datetime.now(timezone.utc)
+    since = (now - timedelta(days=CALENDAR_FEED_PAST_DAYS)).isoformat()
+    until = (now + timedelta(days=CALENDAR_MAX_WINDOW_DAYS)).isoformat()
+    query = _calendar_filter(user_id, event_type)
+    query.update(_calendar_window_filter(since, until))
+    cursor = db.calendar_events.find(query, {"_id": 0}).sort("start_time", ASCENDING)
+    return StreamingResponse(
+        _ics_stream(cursor),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'inline; filename="team-dashboard.ics"'},
+    )
 
 @api_router.post("/calendar/events", response_model=CalendarEvent)
 async def create_calendar_event(event_data: CalendarEventCreate):
-    event_obj = CalendarEvent(**event_data.model_dump())
+    event_dict = event_data.model_dump()
+    if event_dict["recurrence"]:
+        event_dict["recurrence"] = _normalize_recurrence(event_dict["recurrence"])
+        event_dict["recurrence_end"] = _recurrence_end(event_dict)
+    event_obj = CalendarEvent(**event_dict)
     doc = event_obj.model_dump()
-    
-    # Sync with Google Calendar
-    try:
-        google_event_id = await sync_to_google_calendar(event_data)
-        doc["google_event_id"] = google_event_id
-    except Exception as e:
-        logging.error(f"Failed to sync with Google Calendar: {e}")
-    
     await db.calendar_events.insert_one(doc)
+    # Pushed to Google Calendar by the sync worker, which fills in google_event_id
+    await enqueue_calendar_sync(doc["id"], "upsert")
+    publish_change("calendar_events", "create", doc["id"], doc)
     return event_obj
 
 @api_router.put("/calendar/events/{event_id}")
 async def update_calendar_event(event_id: str, update_data: dict):
+    if {"start_time", "end_time", "recurrence"} & update_data.keys():
+        # The series end has to follow the new schedule
+        current = await db.calendar_events.find_one({"id": event_id}, {"_id": 0, "start_time": 1, "end_time": 1, "recurrence": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if update_data.get("recurrence"):
+            update_data["recurrence"] = _normalize_recurrence(update_data["recurrence"])
+        merged = {**current, **update_data}
+        update_data["recurrence_end"] = _recurrence_end(merged) if merged.get("recurrence") else None
     result = await db.calendar_events.update_one({"id": event_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await enqueue_calendar_sync(event_id, "upsert")
+    publish_change("calendar_events", "update", event_id, update_data)
     return {"message": "Event updated successfully"}
 
 @api_router.delete("/calendar/events/{event_id}")
 async def delete_calendar_event(event_id: str):
-    result = await db.calendar_events.delete_one({"id": event_id})
-    if result.deleted_count == 0:
+    previous = await db.calendar_events.find_one_and_delete({"id": event_id}, {"_id": 0, "google_event_id": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Event not found")
+    await enqueue_calendar_sync(event_id, "delete", previous.get("google_event_id"))
+    publish_change("calendar_events", "delete", event_id)
     return {"message": "Event deleted successfully"}
 
+def _calendar_filter(user_id: Optional[str], event_type: Optional[str]) -> dict:
+    query = {}
+    if user_id:
+        query["attendees"] = user_id
+    if event_type:
+        query["event_type"] = event_type
+    return query
+
+def _calendar_window_filter(start: str, end: str) -> dict:
+    # Single events overlap the window by their own times; recurring ones until
+    # their last occurrence ends (recurrence_end is null for open-ended series)
+    return {
+        "start_time": {"$lt": end},
+        "$or": [
+            {"end_time": {"$gt": start}},
+            {"recurrence": {"$type": "string"}, "recurrence_end": {"$not": {"$lte": start}}},
+        ],
+    }
+
+def _parse_event_time(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date-time: {value}")
+
+def _parse_window(start: str, end: str) -> tuple:
+    window_start, window_end = _parse_event_time(start), _parse_event_time(end)
+    if (window_start.tzinfo is None) != (window_end.tzinfo is None):
+        # One bound has an offset: read the other as UTC, as event times are read against an aware window
+        window_start, window_end = (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc) for moment in (window_start, window_end))
+    if not window_start < window_end <= window_start + timedelta(days=CALENDAR_MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=400, detail=f"The window must be positive and at most {CALENDAR_MAX_WINDOW_DAYS} days")
+    return window_start, window_end
+
+def _as_reference(moment: datetime, reference: datetime) -> datetime:
+    # Events entered without an offset are wall-clock times; compare them as such
+    if reference.tzinfo is None:
+        return moment.replace(tzinfo=None)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def _format_like(moment: datetime, original: str) -> str:
+    # Keep the precision the event was stored with (datetime-local inputs omit seconds)
+    return moment.isoformat(timespec="minutes" if len(original) == 16 else "auto")
+
+def _normalize_recurrence(recurrence: str) -> str:
+    rule = recurrence.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    if "\n" in rule or ":" in rule:
+        raise HTTPException(status_code=400, detail="recurrence must be a single RRULE")
+    return rule.upper()
+
+def _parse_rule(event: dict):
+    start = _parse_event_time(event["start_time"])
+    try:
+        return rrulestr(event["recurrence"], dtstart=start), start
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid recurrence rule: {e}")
+
+def _recurrence_end(event: dict) -> Optional[str]:
+    """End of the last occurrence of a bounded series, or None if it never ends"""
+    rule, start = _parse_rule(event)
+    if "COUNT=" not in event["recurrence"] and "UNTIL=" not in event["recurrence"]:
+        return None
+    occurrences = list(islice(rule, CALENDAR_MAX_SERIES_LENGTH + 1))
+    if len(occurrences) > CALENDAR_MAX_SERIES_LENGTH:
+        raise HTTPException(status_code=400, detail=f"A series may have at most {CALENDAR_MAX_SERIES_LENGTH} occurrences")
+    if not occurrences:
+        raise HTTPException(status_code=400, detail="The recurrence rule has no occurrences")
+    duration = _parse_event_time(event["end_time"]) - start
+    return _format_like(occurrences[-1] + duration, event["end_time"])
+
+def expand_occurrences(event: dict, window_start: datetime, window_end: datetime) -> list:
+    """Occurrences of `event` that overlap the window; a single event is its own occurrence.
+
+    Only the window is expanded, so open-ended series cost no more than
+    bounded ones. Each occurrence keeps the series id and carries its own
+    start as `recurrence_id`.
+    """
+    if not event.get("recurrence"):
+        return [event]
+    rule, start = _parse_rule(event)
+    duration = _parse_event_time(event["end_time"]) - start
+    window_start = _as_reference(window_start, start)
+    window_end = _as_reference(window_end, start)
+    occurrences = []
+    for occurrence in rule.xafter(window_start - duration, count=CALENDAR_MAX_OCCURRENCES):
+        if occurrence >= window_end:
+            break
+        occurrence_start = _format_like(occurrence, event["start_time"])
+        occurrences.append({
+            **event,
+            "start_time": occurrence_start,
+            "end_time": _format_like(occurrence + duration, event["end_time"]),
+            "recurrence_id": occurrence_start,
+        })
+    return occurrences
+
+def _ics_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+def _ics_time(value: str) -> str:
+    moment = _parse_event_time(value)
+    if moment.tzinfo is None:
+        # Floating time: shown at the same wall-clock time in every zone
+        return moment.strftime("%Y%m%dT%H%M%S")
+    return moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def _ics_line(line: str) -> str:
+    # RFC 5545 folds content lines longer than 75 octets
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # Don't split a multi-byte UTF-8 sequence
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return "\r\n ".join(parts) + "\r\n"
+
+def _ics_event(event: dict) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event['id']}@team-dashboard",
+        f"DTSTAMP:{_ics_time(event['created_at'])}",
+        f"DTSTART:{_ics_time(event['start_time'])}",
+        f"DTEND:{_ics_time(event['end_time'])}",
+        f"SUMMARY:{_ics_escape(event['title'])}",
+        f"CATEGORIES:{_ics_escape(event['event_type'])}",
+    ]
+    if event.get("description"):
+        lines.append(f"DESCRIPTION:{_ics_escape(event['description'])}")
+    if event.get("recurrence"):
+        lines.append(f"RRULE:{event['recurrence']}")
+    lines.append("END:VEVENT")
+    return "".join(_ics_line(line) for line in lines)
+
+async def _ics_stream(cursor):
+    yield b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Team Dashboard//Calendar//EN\r\nCALSCALE:GREGORIAN\r\n"
+    chunk = []
+    async for event in cursor:
+        chunk.append(_ics_event(event))
+        if len(chunk) >= ICS_CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode()
+    yield b"END:VCALENDAR\r\n"
+
 # ========== LEAVE MANAGEMENT ==========
 
 @api_router.get("/leave-requests", response_model=List[LeaveRequest])
-async def get_leave_requests():
-    requests = await db.leave_requests.find({}, {"_id": 0}).to_list(1000)
-    return requests
+async def get_leave_requests(page: PageParams = Depends()):
+    return await paginate(db.leave_requests, {}, SORT_BY_CREATED, page, LeaveRequest)
 
 @api_router.post("/leave-requests", response_model=LeaveRequest)
 async def create_leave_request(request_data: LeaveRequestCreate):
+    _leave_dates(request_data.start_date, request_data.end_date)
     leave_obj = LeaveRequest(**request_data.model_dump())
     doc = leave_obj.model_dump()
     await db.leave_requests.insert_one(doc)
+    publish_change("leave_requests", "create", doc["id"], doc)
     return leave_obj
 
 @api_router.put("/leave-requests/{request_id}")
 async def update_leave_request(request_id: str, status: str):
-    result = await db.leave_requests.update_one({"id": request_id}, {"$set": {"status": status}})
-    if result.matched_count == 0:
+    if status == "approved":
+        # Requests stored before dates were validated on create are checked before the
+        # status is written, so a bad one can't end up approved with nothing filled in
+        current = await db.leave_requests.find_one({"id": request_id}, {"_id": 0, "start_date": 1, "end_date": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Leave request not found")
+        _leave_dates(current["start_date"], current["end_date"])
+    previous = await db.leave_requests.find_one_and_update(
+        {"id": request_id}, {"$set": {"status": status}},
+        {"_id": 0, "user_id": 1, "user_name": 1, "start_date": 1, "end_date": 1, "status": 1}
+    )
+    if not previous:
         raise HTTPException(status_code=404, detail="Leave request not found")
+    # Approving fills the leave into attendance and availability; un-approving takes it back out
+    try:
+        if status == "approved" and previous.get("status") != "approved":
+            await apply_approved_leave(previous)
+        elif status != "approved" and previous.get("status") == "approved":
+            await revoke_leave(previous)
+    except Exception:
+        # Put the old status back so retrying the same change applies it again
+        await db.leave_requests.update_one({"id": request_id, "status": status}, {"$set": {"status": previous.get("status")}})
+        raise
+    publish_change("leave_requests", "update", request_id, {"status": status}, previous)
     return {"message": "Leave request updated successfully"}
 
 # ========== CONTENT STUDIO ==========
 
 @api_router.get("/content", response_model=List[ContentItem])
-async def get_content_items():
-    items = await db.content_items.find({}, {"_id": 0}).to_list(1000)
-    return items
+async def get_content_items(page: PageParams = Depends()):
+    return await paginate(db.content_items, {}, SORT_BY_CREATED, page, ContentItem)
 
 @api_router.post("/content", response_model=ContentItem)
 async def create_content_item(item_data: ContentItemCreate):
     content_obj = ContentItem(**item_data.model_dump())
     doc = content_obj.model_dump()
     await db.content_items.insert_one(doc)
+    publish_change("content_items", "create", doc["id"], doc)
     return content_obj
 
 @api_router.put("/content/{item_id}")
@@ -650,20 +2517,21 @@ async def update_content_item(item_id: str, update_data: dict):
     result = await db.content_items.update_one({"id": item_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Content item not found")
+    publish_change("content_items", "update", item_id, update_data)
     return {"message": "Content item updated successfully"}
 
 # ========== AI DEVELOPMENT LAB ==========
 
 @api_router.get("/ai-projects", response_model=List[AIProject])
-async def get_ai_projects():
-    projects = await db.ai_projects.find({}, {"_id": 0}).to_list(1000)
-    return projects
+async def get_ai_projects(page: PageParams = Depends()):
+    return await paginate(db.ai_projects, {}, SORT_BY_CREATED, page, AIProject)
 
 @api_router.post("/ai-projects", response_model=AIProject)
 async def create_ai_project(project_data: AIProjectCreate):
     ai_project_obj = AIProject(**project_data.model_dump())
     doc = ai_project_obj.model_dump()
     await db.ai_projects.insert_one(doc)
+    publish_change("ai_projects", "create", doc["id"], doc)
     return ai_project_obj
 
 @api_router.put("/ai-projects/{project_id}")
@@ -671,41 +2539,92 @@ async def update_ai_project(project_id: str, update_data: dict):
     result = await db.ai_projects.update_one({"id": project_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="AI project not found")
+    publish_change("ai_projects", "update", project_id, update_data)
     return {"message": "AI project updated successfully"}
 
 # ========== RESEARCH HUB ==========
 
 @api_router.get("/research-notes", response_model=List[ResearchNote])
-async def get_research_notes():
-    notes = await db.research_notes.find({}, {"_id": 0}).to_list(1000)
-    return notes
+async def get_research_notes(
+    tags: Optional[str] = None,
+    match: str = Query("all", pattern="^(all|any)$"),
+    author: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    page: PageParams = Depends()
+):
+    # tags is comma separated; match=all needs every tag, match=any at least one.
+    # view=summary leaves out the note bodies for browsing.
+    query = {}
+    tag_list = _normalize_tags((tags or "").split(","))
+    if tag_list:
+        query["tags"] = {"$all" if match == "all" else "$in": tag_list}
+    if author:
+        query["author"] = author
+    exclude = ("content",) if view == "summary" else ()
+    return await paginate(db.research_notes, query, SORT_BY_CREATED, page, ResearchNote, exclude)
+
+@api_router.get("/research-notes/tags")
+async def get_research_tags(limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)):
+    """Tag cloud: the most used tags with their note counts"""
+    cursor = db.research_tags.find({"count": {"$gt": 0}}, {"_id": 0, "tag": 1, "count": 1})
+    return await cursor.sort([("count", DESCENDING), ("tag", ASCENDING)]).limit(limit).to_list(limit)
 
 @api_router.post("/research-notes", response_model=ResearchNote)
 async def create_research_note(note_data: ResearchNoteCreate):
-    note_obj = ResearchNote(**note_data.model_dump())
+    note_dict = note_data.model_dump()
+    note_dict["tags"] = _normalize_tags(note_dict["tags"])
+    note_obj = ResearchNote(**note_dict)
     doc = note_obj.model_dump()
     await db.research_notes.insert_one(doc)
+    await apply_research_tags(doc["tags"])
+    publish_change("research_notes", "create", doc["id"], doc)
     return note_obj
 
 @api_router.delete("/research-notes/{note_id}")
 async def delete_research_note(note_id: str):
-    result = await db.research_notes.delete_one({"id": note_id})
-    if result.deleted_count == 0:
+    previous = await db.research_notes.find_one_and_delete({"id": note_id}, {"_id": 0, "tags": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Research note not found")
+    await apply_research_tags(previous.get("tags", []), sign=-1)
+    publish_change("research_notes", "delete", note_id)
     return {"message": "Research note deleted successfully"}
 
+def _normalize_tags(tags: List[str]) -> List[str]:
+    # Trimmed and de-duplicated, so a note adds at most one to each tag's count
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag.strip()))
+
+async def apply_research_tags(tags: List[str], sign: int = 1):
+    """Add (or with sign=-1 remove) one note to each tag's count in the tag cloud"""
+    if not tags:
+        return
+    await db.research_tags.bulk_write([
+        UpdateOne({"tag": tag}, {"$inc": {"count": sign}}, upsert=True)
+        for tag in tags
+    ], ordered=False)
+    if sign < 0:
+        await db.research_tags.delete_many({"tag": {"$in": tags}, "count": {"$lte": 0}})
+
+async def rebuild_research_tags():
+    """Recompute the tag cloud from every note in one aggregation"""
+    await db.research_notes.aggregate([
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, "tag": "$_id", "count": 1}},
+        {"$out": "research_tags"}
+    ]).to_list(None)
+
 # ========== ACADEMY ZONE ==========
 
 @api_router.get("/academy/courses", response_model=List[AcademyCourse])
-async def get_academy_courses():
-    courses = await db.academy_courses.find({}, {"_id": 0}).to_list(1000)
-    return courses
+async def get_academy_courses(page: PageParams = Depends()):
+    return await paginate(db.academy_courses, {}, SORT_BY_CREATED, page, AcademyCourse)
 
 @api_router.post("/academy/courses", response_model=AcademyCourse)
 async def create_academy_course(course_data: AcademyCourseCreate):
     course_obj = AcademyCourse(**course_data.model_dump())
     doc = course_obj.model_dump()
     await db.academy_courses.insert_one(doc)
+    publish_change("academy_courses", "create", doc["id"], doc)
     return course_obj
 
 @api_router.put("/academy/courses/{course_id}")
@@ -713,48 +2632,51 @@ async def update_academy_course(course_id: str, update_data: dict):
     result = await db.academy_courses.update_one({"id": course_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
+    publish_change("academy_courses", "update", course_id, update_data)
     return {"message": "Course updated successfully"}
 
 # ========== PERSONAL PLANNER ==========
 
 @api_router.get("/personal-tasks", response_model=List[PersonalTask])
-async def get_personal_tasks(user_id: str):
-    tasks = await db.personal_tasks.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-    return tasks
+async def get_personal_tasks(user_id: str, page: PageParams = Depends()):
+    return await paginate(db.personal_tasks, {"user_id": user_id}, SORT_BY_CREATED, page, PersonalTask)
 
 @api_router.post("/personal-tasks", response_model=PersonalTask)
 async def create_personal_task(task_data: PersonalTaskCreate):
     task_obj = PersonalTask(**task_data.model_dump())
     doc = task_obj.model_dump()
     await db.personal_tasks.insert_one(doc)
+    publish_change("personal_tasks", "create", doc["id"], doc)
     return task_obj
 
 @api_router.put("/personal-tasks/{task_id}")
 async def update_personal_task(task_id: str, update_data: dict):
-    result = await db.personal_tasks.update_one({"id": task_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.personal_tasks.find_one_and_update({"id": task_id}, {"$set": update_data}, {"_id": 0, "user_id": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Personal task not found")
+    publish_change("personal_tasks", "update", task_id, update_data, previous)
     return {"message": "Personal task updated successfully"}
 
 @api_router.delete("/personal-tasks/{task_id}")
 async def delete_personal_task(task_id: str):
-    result = await db.personal_tasks.delete_one({"id": task_id})
-    if result.deleted_count == 0:
+    previous = await db.personal_tasks.find_one_and_delete({"id": task_id}, {"_id": 0, "user_id": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Personal task not found")
+    publish_change("personal_tasks", "delete", task_id, previous=previous)
     return {"message": "Personal task deleted successfully"}
 
 # ========== CLOUD PANEL ==========
 
 @api_router.get("/cloud-services", response_model=List[CloudService])
-async def get_cloud_services():
-    services = await db.cloud_services.find({}, {"_id": 0}).to_list(1000)
-    return services
+async def get_cloud_services(page: PageParams = Depends()):
+    return await paginate(db.cloud_services, {}, SORT_BY_CREATED, page, CloudService)
 
 @api_router.post("/cloud-services", response_model=CloudService)
 async def create_cloud_service(service_data: CloudServiceCreate):
     service_obj = CloudService(**service_data.model_dump())
     doc = service_obj.model_dump()
     await db.cloud_services.insert_one(doc)
+    publish_change("cloud_services", "create", doc["id"], doc)
     return service_obj
 
 @api_router.put("/cloud-services/{service_id}")
@@ -762,91 +2684,228 @@ async def update_cloud_service(service_id: str, update_data: dict):
     result = await db.cloud_services.update_one({"id": service_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Cloud service not found")
+    publish_change("cloud_services", "update", service_id, update_data)
     return {"message": "Cloud service updated successfully"}
 
+# ========== SEARCH ==========
+
+SEARCH_MAX_OFFSET = 500
+SNIPPET_CHARS = 160
+TYPEAHEAD_MAX_TIME_MS = int(os.environ.get('TYPEAHEAD_MAX_TIME_MS', '50'))
+
+# Result type -> collection, the field shown as the result title, the fields a
+# snippet is cut from and extra fields returned with each hit. The text index
+# weights in COLLECTION_INDEXES (title 10, tags 5, description 3, body 1) keep
+# scores comparable across collections.
+SEARCH_SOURCES = {
+    "task": {"collection": "tasks", "title": "title", "body": ("description",), "extra": ("project_id", "status", "assigned_to")},
+    "project": {"collection": "projects", "title": "name", "body": ("description",), "extra": ("status", "type")},
+    "research_note": {"collection": "research_notes", "title": "title", "body": ("content",), "extra": ("tags", "author")},
+    "content": {"collection": "content_items", "title": "title", "body": (), "extra": ("platform", "status")},
+}
+
+def _search_sources(types: Optional[str]) -> dict:
+    if not types:
+        return SEARCH_SOURCES
+    wanted = {kind for kind in types.split(",") if kind}
+    unknown = wanted - SEARCH_SOURCES.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+    return {kind: source for kind, source in SEARCH_SOURCES.items() if kind in wanted}
+
+def _snippet(text: Optional[str], terms: list) -> Optional[str]:
+    """Cut a window of `text` around the first query term it contains"""
+    if not text:
+        return None
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    end = start + SNIPPET_CHARS
+    return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+async def _text_search(kind: str, source: dict, q: str, terms: list, limit: int) -> list:
+    fields = (source["title"], *source["body"], *source["extra"])
+    projection = {"_id": 0, "id": 1, "created_at": 1, "score": {"$meta": "textScore"}, **{field: 1 for field in fields}}
+    cursor = db[source["collection"]].find({"$text": {"$search": q}}, projection)
+    docs = await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    results = []
+    for doc in docs:
+        body = next((doc[field] for field in source["body"] if doc.get(field)), None)
+        results.append({
+            "type": kind,
+            "id": doc["id"],
+            "title": doc.get(source["title"]),
+            "snippet": _snippet(body, terms),
+            "score": round(doc["score"], 4),
+            "created_at": doc.get("created_at"),
+            **{field: doc.get(field) for field in source["extra"]},
+        })
+    return results
+
+async def _prefix_search(kind: str, source: dict, prefix: str, limit: int):
+    """Titles starting with `prefix`, as an index range scan bounded by TYPEAHEAD_MAX_TIME_MS.
+
+    Case-insensitive regexes can't use an index, so the common spellings of
+    the prefix are matched as separate anchored ranges instead.
+    """
+    field = source["title"]
+    variants = {prefix, prefix.lower(), prefix.upper(), prefix.capitalize(), prefix.title()}
+    query = {field: {"$in": [re.compile("^" + re.escape(variant)) for variant in variants]}}
+    cursor = db[source["collection"]].find(query, {"_id": 0, "id": 1, field: 1})
+    cursor = cursor.sort(field, ASCENDING).limit(limit).max_time_ms(TYPEAHEAD_MAX_TIME_MS)
+    try:
+        docs = await cursor.to_list(limit)
+    except ExecutionTimeout:
+        return [], True
+    return [{"type": kind, "id": doc["id"], "title": doc[field]} for doc in docs], False
+
+@api_router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = None,
+    mode: str = Query("text", pattern="^(text|prefix)$"),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+):
+    """Search tasks, projects, research notes and content.
+
+    `mode=text` ranks full-text matches from every collection together;
+    `mode=prefix` is a typeahead over titles that returns `partial: true` when
+    a collection ran out of its time budget.
+    """
+    sources = _search_sources(types)
+    if mode == "prefix":
+        batches = await asyncio.gather(*(
+            _prefix_search(kind, source, q.strip(), limit) for kind, source in sources.items()
+        ))
+        results = sorted((hit for hits, _ in batches for hit in hits), key=lambda hit: hit["title"].casefold())
+        return {"results": results[:limit], "partial": any(partial for _, partial in batches)}
+    
+    # Every collection's top offset+limit hits are enough to rank the requested page
+    terms = re.findall(r"\w+", q.lower())
+    batches = await asyncio.gather(*(
+        _text_search(kind, source, q, terms, offset + limit) for kind, source in sources.items()
+    ))
+    results = sorted((hit for hits in batches for hit in hits), key=lambda hit: hit["score"], reverse=True)
+    more = len(results) > offset + limit
+    return {"results": results[offset:offset + limit], "next_offset": offset + limit if more else None}
+
 # ========== DASHBOARD STATS ==========
 
-@api_router.get("/dashboard/stats")
-async def get_dashboard_stats(user_id: Optional[str] = None):
-    stats = {}
-    
-    # Total counts
-    stats["total_projects"] = await db.projects.count_documents({})
-    stats["total_tasks"] = await db.tasks.count_documents({})
-    stats["total_members"] = await db.users.count_documents({})
-    stats["pending_leaves"] = await db.leave_requests.count_documents({"status": "pending"})
-    
-    # User-specific stats
-    if user_id:
-        stats["my_tasks"] = await db.tasks.count_documents({"assigned_to": user_id, "status": {"$ne": "done"}})
-        stats["my_tasks_completed"] = await db.tasks.count_documents({"assigned_to": user_id, "status": "done"})
-        stats["my_projects"] = await db.projects.count_documents({"assigned_members": user_id})
-        
-        # Get user's assigned tasks
-        my_assigned_tasks = await db.tasks.find(
-            {"assigned_to": user_id, "status": {"$ne": "done"}},
-            {"_id": 0}
-        ).sort("created_at", -1).limit(10).to_list(10)
-        stats["assigned_tasks"] = my_assigned_tasks
-        
-        # Get kudos balance
-        kudos_transactions = await db.kudos_transactions.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-        total_kudos = sum(t["amount"] for t in kudos_transactions)
-        stats["kudos_balance"] = total_kudos
-        
-        # Get upcoming meetings
+# Global counters are shared by every caller for a few seconds; per-user sections
+# live longer and are dropped by invalidate_dashboard() when that user's tasks,
+# projects, meetings or kudos change.
+dashboard_global_cache = TTLCache(ttl=float(os.environ.get('DASHBOARD_GLOBAL_CACHE_TTL', '5')))
+dashboard_user_cache = TTLCache(ttl=float(os.environ.get('DASHBOARD_USER_CACHE_TTL', '60')))
+
+def invalidate_dashboard(*user_ids):
+    dashboard_user_cache.invalidate(*(user_id for user_id in user_ids if user_id))
+
+async def _load_sections(sections: dict, timings: dict) -> dict:
+    """Run independent dashboard queries concurrently, recording each one's duration in ms"""
+    async def run(name, load):
+        start = time.perf_counter()
+        value = await load()
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return name, value
+    return dict(await asyncio.gather(*(run(name, load) for name, load in sections.items())))
+
+def _dashboard_global_sections() -> dict:
+    return {
+        "total_projects": lambda: db.projects.estimated_document_count(),
+        "total_tasks": lambda: db.tasks.estimated_document_count(),
+        "total_members": lambda: db.users.estimated_document_count(),
+        "pending_leaves": lambda: db.leave_requests.count_documents({"status": "pending"}),
+        "recent_projects": lambda: db.projects.find({}, model_projection(Project)).sort("created_at", -1).limit(5).to_list(5),
+        "recent_tasks": lambda: db.tasks.find({}, model_projection(Task)).sort("created_at", -1).limit(5).to_list(5),
+        # Shared by every caller, so finance activity is left out
+        "recent_activity": lambda: db.activity_log.find(
+            {"collection": {"$nin": list(_FINANCE_TOPICS)}}, {"_id": 0}
+        ).sort("$natural", -1).limit(10).to_list(10),
+    }
+
+def _dashboard_user_sections(user_id: str) -> dict:
+    async def kudos_balance():
+        balance = await db.kudos_balances.find_one({"user_id": user_id}, {"_id": 0, "total_kudos": 1})
+        return balance["total_kudos"] if balance else 0
+
+    def upcoming_meetings():
         now = datetime.now(timezone.utc).isoformat()
-        upcoming_meetings = await db.meetings.find(
+        return db.meetings.find(
             {
                 "$or": [{"organizer": user_id}, {"attendees": user_id}],
                 "start_time": {"$gte": now}
             },
             {"_id": 0}
         ).sort("start_time", 1).limit(5).to_list(5)
-        stats["upcoming_meetings"] = upcoming_meetings
+
+    return {
+        "my_tasks": lambda: db.tasks.count_documents({"assigned_to": user_id, "status": {"$ne": "done"}}),
+        "my_tasks_completed": lambda: db.tasks.count_documents({"assigned_to": user_id, "status": "done"}),
+        "my_projects": lambda: db.projects.count_documents({"assigned_members": user_id}),
+        "assigned_tasks": lambda: db.tasks.find(
+            {"assigned_to": user_id, "status": {"$ne": "done"}},
+            {"_id": 0}
+        ).sort("created_at", -1).limit(10).to_list(10),
+        "kudos_balance": kudos_balance,
+        "upcoming_meetings": upcoming_meetings,
+    }
+
+@api_router.get("/dashboard/stats")
+async def get_dashboard_stats(user_id: Optional[str] = None, timings: bool = False):
+    section_timings = {}
+    loads = [dashboard_global_cache.get_or_load(
+        "global", lambda: _load_sections(_dashboard_global_sections(), section_timings)
+    )]
+    if user_id:
+        loads.append(dashboard_user_cache.get_or_load(
+            user_id, lambda: _load_sections(_dashboard_user_sections(user_id), section_timings)
+        ))
+    results = await asyncio.gather(*loads)
     
-    # Recent activity
-    recent_projects = await db.projects.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
-    recent_tasks = await db.tasks.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    stats = {}
+    for section_stats, _ in results:
+        stats.update(section_stats)
     
-    stats["recent_projects"] = recent_projects
-    stats["recent_tasks"] = recent_tasks
+    if timings:
+        stats["timings_ms"] = section_timings
+        stats["cache_hits"] = {name: hit for name, (_, hit) in zip(["global", "user"], results)}
     
     return stats
 
 
 # ========== FINANCE MODULE ==========
 
-@api_router.get("/finance/transactions", response_model=List[FinanceTransaction])
-async def get_finance_transactions():
-    transactions = await db.finance_transactions.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return transactions
+@api_router.get("/finance/transactions", response_model=List[FinanceTransaction], dependencies=FINANCE_ACCESS)
+async def get_finance_transactions(page: PageParams = Depends()):
+    return await paginate(db.finance_transactions, {}, SORT_BY_CREATED_DESC, page, FinanceTransaction)
 
-@api_router.post("/finance/transactions", response_model=FinanceTransaction)
+@api_router.post("/finance/transactions", response_model=FinanceTransaction, dependencies=FINANCE_ACCESS)
 async def create_finance_transaction(transaction_data: FinanceTransactionCreate):
     transaction_obj = FinanceTransaction(**transaction_data.model_dump())
     doc = transaction_obj.model_dump()
     await db.finance_transactions.insert_one(doc)
+    publish_change("finance_transactions", "create", doc["id"], doc)
+    await apply_finance_rollups([doc])
     return transaction_obj
 
-@api_router.get("/finance/summary")
-async def get_finance_summary():
-    # Get all transactions
-    transactions = await db.finance_transactions.find({}, {"_id": 0}).to_list(10000)
-    
-    total_income = sum(t["amount"] for t in transactions if t["type"] == "income")
-    total_expenses = sum(t["amount"] for t in transactions if t["type"] == "expense")
-    total_salary = sum(t["amount"] for t in transactions if t["type"] == "salary")
-    
-    # Category breakdown
-    categories = {}
-    for t in transactions:
-        if t["type"] == "expense":
-            category = t["category"]
-            categories[category] = categories.get(category, 0) + t["amount"]
+@api_router.get("/finance/summary", dependencies=FINANCE_ACCESS)
+async def get_finance_summary(start_date: Optional[str] = None, end_date: Optional[str] = None):
+    # Bounds are inclusive and either YYYY-MM or YYYY-MM-DD. Whole-month ranges
+    # (including all-time) are answered from the monthly rollups; day ranges
+    # aggregate the ledger directly.
+    for value in (start_date, end_date):
+        if value is not None:
+            _parse_period(value)
+    if all(value is None or len(value) == 7 for value in (start_date, end_date)):
+        summary = await _finance_summary_from_rollups(start_date, end_date)
+    else:
+        summary = await _finance_summary_from_ledger(start_date, end_date)
     
-    # Recent transactions
-    recent = sorted(transactions, key=lambda x: x["created_at"], reverse=True)[:10]
+    totals = summary["totals"]
+    total_income = totals.get("income", 0)
+    total_expenses = totals.get("expense", 0)
+    total_salary = totals.get("salary", 0)
     
     # Pending salary payments
     pending_salaries = await db.salary_records.count_documents({"status": "pending"})
@@ -856,25 +2915,136 @@ async def get_finance_summary():
         "total_expenses": total_expenses,
         "total_salary": total_salary,
         "net_balance": total_income - total_expenses - total_salary,
-        "expense_by_category": categories,
-        "recent_transactions": recent,
-        "pending_salary_payments": pending_salaries
+        "expense_by_category": summary["expense_by_category"],
+        "recent_transactions": summary["recent_transactions"],
+        "pending_salary_payments": pending_salaries,
+        "period": {"start_date": start_date, "end_date": end_date}
     }
 
-@api_router.delete("/finance/transactions/{transaction_id}")
+@api_router.post("/finance/rollups/rebuild", dependencies=FINANCE_ACCESS)
+async def rebuild_finance_rollups_endpoint():
+    await rebuild_finance_rollups()
+    return {"message": "Finance rollups rebuilt successfully"}
+
+@api_router.delete("/finance/transactions/{transaction_id}", dependencies=FINANCE_ACCESS)
 async def delete_transaction(transaction_id: str):
-    result = await db.finance_transactions.delete_one({"id": transaction_id})
-    if result.deleted_count == 0:
+    doc = await db.finance_transactions.find_one_and_delete(
+        {"id": transaction_id},
+        {"_id": 0, "date": 1, "type": 1, "category": 1, "amount": 1}
+    )
+    if not doc:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    await apply_finance_rollups([doc], sign=-1)
+    publish_change("finance_transactions", "delete", transaction_id)
     return {"message": "Transaction deleted successfully"}
 
+def _parse_period(value: str) -> date:
+    try:
+        if len(value) == 7:
+            return datetime.strptime(value, "%Y-%m").date()
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date '{value}', expected YYYY-MM or YYYY-MM-DD")
+
+def _next_period(value: str) -> str:
+    """Return the YYYY-MM or YYYY-MM-DD value immediately after the given one, in the same format"""
+    start = _parse_period(value)
+    if len(value) == 7:
+        return f"{start.year + 1}-01" if start.month == 12 else f"{start.year}-{start.month + 1:02d}"
+    return (start + timedelta(days=1)).isoformat()
+
+def _date_range_filter(start: Optional[str], end: Optional[str]) -> dict:
+    """Build an index-friendly range over a date string field from inclusive YYYY-MM / YYYY-MM-DD bounds"""
+    condition = {}
+    if start:
+        condition["$gte"] = start
+    if end:
+        condition["$lt"] = _next_period(end)
+    return condition
+
+async def apply_finance_rollups(transactions: list, sign: int = 1):
+    """Add (or with sign=-1 remove) transactions to the per-month, per-type, per-category totals"""
+    operations = [
+        UpdateOne(
+            {"month": t["date"][:7], "type": t["type"], "category": t["category"]},
+            {"$inc": {"total": sign * t["amount"], "count": sign}},
+            upsert=True
+        )
+        for t in transactions
+    ]
+    if operations:
+        await db.finance_rollups.bulk_write(operations, ordered=False)
+
+async def rebuild_finance_rollups():
+    """Recompute finance_rollups from the full ledger in one aggregation"""
+    await db.finance_transactions.aggregate([
+        {"$group": {
+            "_id": {"month": {"$substrCP": ["$date", 0, 7]}, "type": "$type", "category": "$category"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "month": "$_id.month",
+            "type": "$_id.type",
+            "category": "$_id.category",
+            "total": 1,
+            "count": 1
+        }},
+        {"$out": "finance_rollups"}
+    ]).to_list(None)
+
+def _finance_facet(amount_field: str) -> dict:
+    return {
+        "totals": [{"$group": {"_id": "$type", "total": {"$sum": f"${amount_field}"}}}],
+        "expense_by_category": [
+            {"$match": {"type": "expense"}},
+            {"$group": {"_id": "$category", "total": {"$sum": f"${amount_field}"}}}
+        ]
+    }
+
+def _finance_summary_from_facet(result: dict) -> dict:
+    return {
+        "totals": {row["_id"]: row["total"] for row in result["totals"]},
+        "expense_by_category": {row["_id"]: row["total"] for row in result["expense_by_category"] if row["total"]},
+        "recent_transactions": result.get("recent_transactions", [])
+    }
+
+async def _finance_summary_from_rollups(start_month: Optional[str], end_month: Optional[str]) -> dict:
+    match = {}
+    month_range = {}
+    if start_month:
+        month_range["$gte"] = start_month
+    if end_month:
+        month_range["$lte"] = end_month
+    if month_range:
+        match["month"] = month_range
+    rows = await db.finance_rollups.aggregate([
+        {"$match": match},
+        {"$facet": _finance_facet("total")}
+    ]).to_list(1)
+    summary = _finance_summary_from_facet(rows[0])
+
+    date_range = _date_range_filter(start_month, end_month)
+    query = {"date": date_range} if date_range else {}
+    summary["recent_transactions"] = await db.finance_transactions.find(query, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
+    return summary
+
+async def _finance_summary_from_ledger(start_date: Optional[str], end_date: Optional[str]) -> dict:
+    facet = _finance_facet("amount")
+    facet["recent_transactions"] = [{"$sort": {"created_at": -1}}, {"$limit": 10}, {"$project": {"_id": 0}}]
+    rows = await db.finance_transactions.aggregate([
+        {"$match": {"date": _date_range_filter(start_date, end_date)}},
+        {"$facet": facet}
+    ]).to_list(1)
+    return _finance_summary_from_facet(rows[0])
+
 # Salary Management
-@api_router.get("/finance/salaries", response_model=List[SalaryRecord])
-async def get_salary_records():
-    salaries = await db.salary_records.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return salaries
+@api_router.get("/finance/salaries", response_model=List[SalaryRecord], dependencies=FINANCE_ACCESS)
+async def get_salary_records(page: PageParams = Depends()):
+    return await paginate(db.salary_records, {}, SORT_BY_CREATED_DESC, page, SalaryRecord)
 
-@api_router.post("/finance/salaries", response_model=SalaryRecord)
+@api_router.post("/finance/salaries", response_model=SalaryRecord, dependencies=FINANCE_ACCESS)
 async def create_salary_record(salary_data: SalaryRecordCreate):
     # Calculate net salary
     net_salary = salary_data.base_salary - salary_data.deductions + salary_data.bonuses
@@ -884,10 +3054,14 @@ async def create_salary_record(salary_data: SalaryRecordCreate):
     
     salary_obj = SalaryRecord(**salary_dict)
     doc = salary_obj.model_dump()
-    await db.salary_records.insert_one(doc)
+    try:
+        await db.salary_records.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A salary record for this user and month already exists")
+    publish_change("salary_records", "create", doc["id"], doc)
     return salary_obj
 
-@api_router.put("/finance/salaries/{salary_id}")
+@api_router.put("/finance/salaries/{salary_id}", dependencies=FINANCE_ACCESS)
 async def update_salary_status(salary_id: str, status: str, payment_date: Optional[str] = None):
     update_data = {"status": status}
     if payment_date:
@@ -896,8 +3070,471 @@ async def update_salary_status(salary_id: str, status: str, payment_date: Option
     result = await db.salary_records.update_one({"id": salary_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Salary record not found")
+    publish_change("salary_records", "update", salary_id, update_data)
     return {"message": "Salary status updated successfully"}
 
+# Payroll runs
+def _month_bounds(month: str) -> tuple:
+    try:
+        start = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month, expected YYYY-MM")
+    return start, monthrange(start.year, start.month)[1]
+
+def _weekdays_in_month(month: str) -> int:
+    start, day_count = _month_bounds(month)
+    return sum(1 for day in range(day_count) if (start + timedelta(days=day)).weekday() < 5)
+
+async def _previous_base_salaries(month: str) -> dict:
+    """Each user's base salary from their latest record before `month`"""
+    rows = await db.salary_records.aggregate([
+        {"$match": {"month": {"$lt": month}}},
+        {"$sort": {"user_id": -1, "month": -1}},
+        {"$group": {"_id": "$user_id", "base_salary": {"$first": "$base_salary"}}},
+    ]).to_list(None)
+    return {row["_id"]: row["base_salary"] for row in rows}
+
+async def _attendance_shortfall(month: str, expected_daily_hours: float) -> dict:
+    """Per-user absent days (half days count as half) and hours short of a full day, for one month"""
+    rows = await db.attendance.aggregate([
+        {"$match": {"date": _date_range_filter(month, month)}},
+        {"$group": {
+            "_id": "$user_id",
+            "absent_days": {"$sum": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$status", "absent"]}, "then": 1},
+                    {"case": {"$eq": ["$status", "half_day"]}, "then": 0.5},
+                ],
+                "default": 0
+            }}},
+            # Days without a check-out have no hours and are not counted short
+            "short_hours": {"$sum": {"$cond": [
+                {"$and": [{"$eq": ["$status", "present"]}, {"$isNumber": "$total_hours"}]},
+                {"$max": [0, {"$subtract": [expected_daily_hours, "$total_hours"]}]},
+                0
+            ]}},
+        }},
+    ]).to_list(None)
+    return {row["_id"]: row for row in rows}
+
+def _salary_duplicate_plan(groups: list, booked: set) -> tuple:
+    """Pick which duplicate (user_id, month) salary records can be removed safely.
+
+    A record is settled once it is paid or has a salary transaction booked
+    against it. Each group keeps its settled record, or the oldest one when
+    none is settled, and the rest are removed. Groups with more than one
+    settled record need a person to sort them out and are returned unresolved.
+    """
+    remove, unresolved = [], []
+    for group in groups:
+        records = sorted(group["records"], key=lambda r: (r.get("created_at") or "", r["id"]))
+        settled = [r for r in records if r.get("status") == "paid" or r["id"] in booked]
+        if len(settled) > 1:
+            unresolved.append(group["_id"])
+            continue
+        keep = settled[0] if settled else records[0]
+        remove.extend(r["id"] for r in records if r is not keep)
+    return remove, unresolved
+
+async def dedupe_salary_records():
+    """Remove duplicate salary records so the (user_id, month) unique index can be built.
+
+    Runs before ensure_indexes() and refuses to start while duplicates that
+    cannot be removed safely remain, since run_payroll relies on that index
+    to stay idempotent.
+    """
+    groups = await db.salary_records.aggregate([
+        {"$group": {
+            "_id": {"user_id": "$user_id", "month": "$month"},
+            "records": {"$push": {"id": "$id", "status": "$status", "created_at": "$created_at"}},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]).to_list(None)
+    if not groups:
+        return
+    record_ids = [record["id"] for group in groups for record in group["records"]]
+    booked = {
+        doc["salary_record_id"] async for doc in db.finance_transactions.find(
+            {"salary_record_id": {"$in": record_ids, "$type": "string"}}, {"_id": 0, "salary_record_id": 1}
+        )
+    }
+    remove, unresolved = _salary_duplicate_plan(groups, booked)
+    if remove:
+        logger.warning(f"Removing {len(remove)} duplicate pending salary records: {', '.join(remove)}")
+        await db.salary_records.delete_many({"id": {"$in": remove}})
+    if unresolved:
+        listed = ", ".join(f"{key['user_id']} {key['month']}" for key in unresolved)
+        raise RuntimeError(f"Salary records paid more than once for the same month, resolve them by hand: {listed}")
+
+@api_router.post("/finance/payroll/run", dependencies=FINANCE_ACCESS)
+async def run_payroll(month: str = Query(..., pattern=r"^\d{4}-\d{2}$"), run: Optional[PayrollRunRequest] = None):
+    """Create the month's pending salary record for every active user in one bulk write.
+
+    Records are upserted on (user_id, month) with $setOnInsert, so a rerun
+    only fills in users that are still missing and never touches existing
+    (possibly already paid) records. Users with neither a base salary in the
+    request nor an earlier record are skipped and listed.
+    """
+    run = run or PayrollRunRequest()
+    working_days = _weekdays_in_month(month)
+    if run.working_days is not None:
+        working_days = run.working_days
+    if working_days <= 0 or run.expected_daily_hours <= 0:
+        raise HTTPException(status_code=400, detail="working_days and expected_daily_hours must be positive")
+    
+    users, base_salaries = await asyncio.gather(
+        db.users.find({"is_active": {"$ne": False}}, {"_id": 0, "id": 1, "name": 1}).to_list(None),
+        _previous_base_salaries(month),
+    )
+    base_salaries.update(run.base_salaries)
+    shortfall = await _attendance_shortfall(month, run.expected_daily_hours) if run.attendance_deductions else {}
+    
+    records, skipped = [], []
+    for user in users:
+        base_salary = base_salaries.get(user["id"])
+        if base_salary is None:
+            skipped.append(user["id"])
+            continue
+        deductions = 0.0
+        if user["id"] in shortfall:
+            daily_rate = base_salary / working_days
+            row = shortfall[user["id"]]
+            deductions = row["absent_days"] * daily_rate + row["short_hours"] * daily_rate / run.expected_daily_hours
+            deductions = round(min(deductions, base_salary), 2)
+        bonuses = run.bonuses.get(user["id"], 0.0)
+        records.append(SalaryRecord(
+            user_id=user["id"],
+            user_name=user["name"],
+            month=month,
+            base_salary=base_salary,
+            deductions=deductions,
+            bonuses=bonuses,
+            net_salary=round(base_salary - deductions + bonuses, 2),
+        ).model_dump())
+    
+    created = set()
+    if records:
+        operations = [
+            UpdateOne({"user_id": doc["user_id"], "month": month}, {"$setOnInsert": doc}, upsert=True)
+            for doc in records
+        ]
+        try:
+            result = await db.salary_records.bulk_write(operations, ordered=False)
+            created = set(result.upserted_ids)
+        except BulkWriteError as e:
+            # A concurrent run inserted the same (user_id, month) first; that record stands
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            created = {upsert["index"] for upsert in e.details["upserted"]}
+    
+    for index in created:
+        doc = records[index]
+        doc.pop("_id", None)
+        publish_change("salary_records", "create", doc["id"], doc)
+    return {
+        "message": "Payroll run completed successfully",
+        "month": month,
+        "created": len(created),
+        "existing": len(records) - len(created),
+        "skipped_user_ids": skipped,
+        "total_net_salary": round(sum(records[index]["net_salary"] for index in created), 2),
+    }
+
+@api_router.post("/finance/payroll/pay", dependencies=FINANCE_ACCESS)
+async def pay_payroll(
+    month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
+    payment: Optional[PayrollPayRequest] = None,
+    claims: dict = Depends(authenticate),
+):
+    """Mark the month's pending salary records paid and book a salary transaction for each.
+
+    Both writes happen in one transaction where the deployment supports it.
+    Without one, the transactions are booked before the records are marked
+    paid, so a failure part way leaves records pending rather than paid with
+    nothing booked; rerunning books only what is still missing (the unique
+    salary_record_id index backs this up) and then marks the records paid.
+    """
+    payment = payment or PayrollPayRequest()
+    _month_bounds(month)
+    payment_date = payment.payment_date or datetime.now(timezone.utc).date().isoformat()
+    _parse_period(payment_date)
+    
+    async def write(session):
+        pending = await db.salary_records.find(
+            {"month": month, "status": "pending"},
+            {"_id": 0, "id": 1, "user_id": 1, "user_name": 1, "net_salary": 1},
+            session=session
+        ).to_list(None)
+        if not pending:
+            return []
+        record_ids = [record["id"] for record in pending]
+        # Left over from an earlier payment that failed before marking its records paid
+        booked = {
+            doc["salary_record_id"] async for doc in db.finance_transactions.find(
+                {"salary_record_id": {"$in": record_ids, "$type": "string"}}, {"_id": 0, "salary_record_id": 1}, session=session
+            )
+        }
+        transactions = [
+            FinanceTransaction(
+                type="salary",
+                category="salary",
+                amount=record["net_salary"],
+                description=f"Salary {month} - {record['user_name']}",
+                date=payment_date,
+                payment_method=payment.payment_method,
+                paid_to=record["user_id"],
+                salary_record_id=record["id"],
+                created_by=claims["sub"],
+            ).model_dump()
+            for record in pending
+            if record["id"] not in booked
+        ]
+        if transactions:
+            try:
+                await db.finance_transactions.insert_many(transactions, ordered=False, session=session)
+            except BulkWriteError as e:
+                # Inside a transaction nothing was written; let it abort
+                if session is not None:
+                    raise
+                # Rows that hit the unique index were booked by a concurrent payment, which accounts for them
+                failed = {error["index"] for error in e.details["writeErrors"]}
+                transactions = [doc for i, doc in enumerate(transactions) if i not in failed]
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    await apply_finance_rollups(transactions)
+                    raise
+            if session is None:
+                # Nothing will roll the booked rows back, so the rollups follow them at once
+                await apply_finance_rollups(transactions)
+        await db.salary_records.update_many(
+            {"id": {"$in": record_ids}, "status": "pending"},
+            {"$set": {"status": "paid", "payment_date": payment_date}},
+            session=session
+        )
+        return transactions
+    
+    try:
+        transactions = await run_in_transaction(write)
+    except BulkWriteError as e:
+        # Only duplicate bookings mean another payment got there first
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        raise HTTPException(status_code=409, detail="Payroll is already being paid")
+    # With a transaction, rollups and events only once the payment has committed
+    if await transactions_supported():
+        await apply_finance_rollups(transactions)
+    for doc in transactions:
+        doc.pop("_id", None)
+        publish_change("salary_records", "update", doc["salary_record_id"], {"status": "paid", "payment_date": payment_date})
+        publish_change("finance_transactions", "create", doc["id"], doc)
+    return {
+        "message": "Payroll paid successfully",
+        "month": month,
+        "paid": len(transactions),
+        "total_paid": round(sum(doc["amount"] for doc in transactions), 2),
+    }
+
+# Exports and analytics
+EXPORT_CHUNK_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 10000
+# Each export dataset: collection, model (for the columns), period field and sort
+EXPORT_DATASETS = {
+    "transactions": ("finance_transactions", FinanceTransaction, "date", [("date", ASCENDING), ("id", ASCENDING)]),
+    "salaries": ("salary_records", SalaryRecord, "month", [("month", ASCENDING), ("user_id", ASCENDING)]),
+}
+
+def _export_query(period_field: str, start_date: Optional[str], end_date: Optional[str]) -> dict:
+    if period_field == "month":
+        # Salary records are keyed by YYYY-MM, so day bounds widen to their months
+        start_date, end_date = start_date and start_date[:7], end_date and end_date[:7]
+    date_range = _date_range_filter(start_date, end_date)
+    return {period_field: date_range} if date_range else {}
+
+async def _csv_stream(cursor, columns: list):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([doc.get(column) for column in columns])
+        rows += 1
+        if rows % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _arrow_schema(pa, model, columns: list):
+    return pa.schema([
+        (column, pa.float64() if model.model_fields[column].annotation is float else pa.string())
+        for column in columns
+    ])
+
+async def _parquet_stream(cursor, model, columns: list):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(pa, model, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    rows = []
+    async for doc in cursor:
+        rows.append({column: doc.get(column) for column in columns})
+        if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            rows = []
+            yield sink.drain()
+    if rows:
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    writer.close()
+    yield sink.drain()
+
+@api_router.get("/finance/export", dependencies=FINANCE_ACCESS)
+async def export_finance(
+    dataset: str = Query("transactions", pattern="^(transactions|salaries)$"),
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+):
+    """Stream the ledger or the salary records for a date range as CSV or Parquet.
+
+    Rows are written straight from the cursor in chunks (one row group per
+    PARQUET_ROW_GROUP_SIZE rows for Parquet), so memory use doesn't grow with
+    the export. Bounds are inclusive YYYY-MM or YYYY-MM-DD.
+    """
+    for value in (start_date, end_date):
+        if value is not None:
+            _parse_period(value)
+    collection, model, period_field, sort = EXPORT_DATASETS[dataset]
+    columns = list(model.model_fields)
+    cursor = db[collection].find(
+        _export_query(period_field, start_date, end_date), {"_id": 0}
+    ).sort(sort).batch_size(EXPORT_CHUNK_SIZE)
+    period = "-".join(value for value in (start_date, end_date) if value) or "all"
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+        return StreamingResponse(
+            _parquet_stream(cursor, model, columns),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="{dataset}-{period}.parquet"'},
+        )
+    return StreamingResponse(
+        _csv_stream(cursor, columns),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{dataset}-{period}.csv"'},
+    )
+
+CASH_FLOW_TYPES = ["income", "expense", "salary"]
+
+def _month_index(start_month: str, end_month: str):
+    return pd.period_range(start_month, end_month, freq="M").strftime("%Y-%m")
+
+def cash_flow_analytics(rollups: list, opening: dict, start_month: str, end_month: str, burn_window: int, months_ahead: int) -> dict:
+    """Monthly cash-flow series from finance rollup rows, all computed column-wise.
+
+    Outflow is expenses plus salaries. Net burn is the trailing `burn_window`
+    month mean of outflow minus income; runway is the closing balance over
+    net burn and is only given while the balance is actually shrinking.
+    """
+    months = _month_index(start_month, end_month)
+    series = pd.DataFrame(0.0, index=months, columns=CASH_FLOW_TYPES)
+    if rollups:
+        series = (
+            pd.DataFrame(rollups, columns=["month", "type", "total"])
+            .pivot_table(index="month", columns="type", values="total", aggfunc="sum")
+            .reindex(index=months, columns=CASH_FLOW_TYPES)
+            .fillna(0.0)
+        )
+    income = series["income"].to_numpy()
+    outflow = series["expense"].to_numpy() + series["salary"].to_numpy()
+    net = income - outflow
+    opening_balance = opening.get("income", 0.0) - opening.get("expense", 0.0) - opening.get("salary", 0.0)
+    balance = opening_balance + np.cumsum(net)
+    gross_burn = pd.Series(outflow).rolling(burn_window, min_periods=1).mean().to_numpy()
+    net_burn = pd.Series(outflow - income).rolling(burn_window, min_periods=1).mean().to_numpy()
+
+    current_balance = float(balance[-1])
+    current_net_burn = float(net_burn[-1])
+    runway = max(current_balance, 0.0) / current_net_burn if current_net_burn > 0 else None
+    forecast = current_balance - current_net_burn * np.arange(1, months_ahead + 1)
+    forecast_months = _month_index(
+        (pd.Period(end_month, freq="M") + 1).strftime("%Y-%m"),
+        (pd.Period(end_month, freq="M") + months_ahead).strftime("%Y-%m"),
+    ) if months_ahead else []
+
+    def rounded(values):
+        return np.round(values, 2).tolist()
+    return {
+        "start_month": start_month,
+        "end_month": end_month,
+        "opening_balance": round(opening_balance, 2),
+        "current_balance": round(current_balance, 2),
+        "gross_burn": round(float(gross_burn[-1]), 2),
+        "net_burn": round(current_net_burn, 2),
+        "runway_months": round(runway, 1) if runway is not None else None,
+        "months": [
+            {"month": month, "income": i, "expense": e, "salary": s, "net": n, "balance": b, "net_burn": nb}
+            for month, i, e, s, n, b, nb in zip(
+                months, rounded(income), rounded(series["expense"].to_numpy()), rounded(series["salary"].to_numpy()),
+                rounded(net), rounded(balance), rounded(net_burn)
+            )
+        ],
+        "forecast": [{"month": month, "balance": b} for month, b in zip(forecast_months, rounded(forecast))],
+    }
+
+@api_router.get("/finance/analytics", dependencies=FINANCE_ACCESS)
+async def get_finance_analytics(
+    start_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    burn_window: int = Query(3, ge=1, le=12),
+    months_ahead: int = Query(6, ge=0, le=36),
+):
+    """Running balance, burn rate and a straight-line runway forecast, built from the monthly rollups"""
+    for value in (start_month, end_month):
+        if value is not None:
+            _parse_period(value)
+    end_month = end_month or datetime.now(timezone.utc).strftime("%Y-%m")
+    if start_month is None:
+        first = await db.finance_rollups.find({}, {"_id": 0, "month": 1}).sort("month", ASCENDING).limit(1).to_list(1)
+        start_month = min(first[0]["month"], end_month) if first else end_month
+    if start_month > end_month:
+        raise HTTPException(status_code=400, detail="start_month must not be after end_month")
+
+    rollups, opening = await asyncio.gather(
+        db.finance_rollups.find(
+            {"month": {"$gte": start_month, "$lte": end_month}}, {"_id": 0, "month": 1, "type": 1, "total": 1}
+        ).to_list(None),
+        db.finance_rollups.aggregate([
+            {"$match": {"month": {"$lt": start_month}}},
+            {"$group": {"_id": "$type", "total": {"$sum": "$total"}}}
+        ]).to_list(None),
+    )
+    opening = {row["_id"]: row["total"] for row in opening}
+    return cash_flow_analytics(rollups, opening, start_month, end_month, burn_window, months_ahead)
+
 # ========== ATTENDANCE MODULE ==========
 
 @api_router.post("/attendance/check-in")
@@ -912,11 +3549,12 @@ async def check_in(data: AttendanceCheckIn):
     check_in_time = datetime.now(timezone.utc).isoformat()
     
     if existing:
-        # Update existing record
+        # Update existing record (e.g. a leave day the person came in on after all)
         await db.attendance.update_one(
             {"user_id": data.user_id, "date": today},
-            {"$set": {"check_in": check_in_time}}
+            {"$set": {"check_in": check_in_time, "status": "present"}}
         )
+        publish_change("attendance", "update", existing["id"], {"user_id": data.user_id, "check_in": check_in_time, "status": "present"})
     else:
         # Create new record
         attendance_obj = AttendanceRecord(
@@ -928,6 +3566,8 @@ async def check_in(data: AttendanceCheckIn):
         )
         doc = attendance_obj.model_dump()
         await db.attendance.insert_one(doc)
+        publish_change("attendance", "create", doc["id"], doc)
+    await set_availability(data.user_id, data.user_name, {today: "present"})
     
     return {"message": "Checked in successfully", "time": check_in_time}
 
@@ -951,85 +3591,787 @@ async def check_out(data: AttendanceCheckOut):
         {"user_id": data.user_id, "date": data.date},
         {"$set": {"check_out": check_out_time, "total_hours": round(total_hours, 2)}}
     )
+    publish_change("attendance", "update", record["id"], {
+        "user_id": data.user_id, "check_out": check_out_time, "total_hours": round(total_hours, 2)
+    })
     
     return {"message": "Checked out successfully", "time": check_out_time, "total_hours": round(total_hours, 2)}
 
 @api_router.get("/attendance/records")
-async def get_attendance_records(user_id: Optional[str] = None, month: Optional[str] = None):
+async def get_attendance_records(user_id: Optional[str] = None, month: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if user_id:
         query["user_id"] = user_id
     if month:
-        # Filter by month (YYYY-MM format)
-        query["date"] = {"$regex": f"^{month}"}
+        # Filter by month (YYYY-MM format) as an index range rather than a regex
+        query["date"] = _date_range_filter(month, month)
     
-    records = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
-    return records
+    return await paginate(db.attendance, query, [("date", DESCENDING), ("id", DESCENDING)], page, AttendanceRecord)
 
 @api_router.get("/attendance/summary")
-async def get_attendance_summary(user_id: Optional[str] = None):
-    query = {}
+async def get_attendance_summary(user_id: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    query = _attendance_period_filter(start_date, end_date)
     if user_id:
         query["user_id"] = user_id
     
-    records = await db.attendance.find(query, {"_id": 0}).to_list(10000)
-    
-    total_days = len(records)
-    present_days = len([r for r in records if r["status"] == "present"])
-    absent_days = len([r for r in records if r["status"] == "absent"])
-    leave_days = len([r for r in records if r["status"] == "leave"])
-    
-    total_hours = sum(r.get("total_hours", 0) for r in records if r.get("total_hours"))
-    
+    rows = await db.attendance.aggregate(_attendance_summary_pipeline(query, None)).to_list(1)
+    return _attendance_summary(rows[0] if rows else {})
+
+@api_router.get("/attendance/team-summary")
+async def get_team_attendance_summary(month: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    # Per-user present/absent/leave days and hours for a period, in one aggregation
+    if month:
+        start_date = end_date = month
+    query = _attendance_period_filter(start_date, end_date)
+    pipeline = _attendance_summary_pipeline(query, "$user_id")
+    pipeline.append({"$sort": {"user_name": 1}})
+    rows = await db.attendance.aggregate(pipeline).to_list(None)
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "users": [
+            {"user_id": row["_id"], "user_name": row["user_name"], **_attendance_summary(row)}
+            for row in rows
+        ]
+    }
+
+def _attendance_period_filter(start_date: Optional[str], end_date: Optional[str]) -> dict:
+    date_range = _date_range_filter(start_date, end_date)
+    return {"date": date_range} if date_range else {}
+
+def _count_status(status: str) -> dict:
+    return {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+
+def _attendance_summary_pipeline(query: dict, group_by) -> list:
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": group_by,
+            "user_name": {"$last": "$user_name"},
+            "total_days": {"$sum": 1},
+            "present_days": _count_status("present"),
+            "absent_days": _count_status("absent"),
+            "leave_days": _count_status("leave"),
+            "total_hours": {"$sum": {"$ifNull": ["$total_hours", 0]}}
+        }}
+    ]
+
+def _attendance_summary(row: dict) -> dict:
+    present_days = row.get("present_days", 0)
+    total_hours = row.get("total_hours", 0)
     return {
-        "total_days": total_days,
+        "total_days": row.get("total_days", 0),
         "present_days": present_days,
-        "absent_days": absent_days,
-        "leave_days": leave_days,
+        "absent_days": row.get("absent_days", 0),
+        "leave_days": row.get("leave_days", 0),
         "total_hours_worked": round(total_hours, 2),
         "average_hours_per_day": round(total_hours / present_days, 2) if present_days > 0 else 0
     }
 
+# Day-status vectors: one availability document per user and month whose `days`
+# array mirrors that user's attendance, so a team-month grid is a single read.
+DAY_STATUS_CODES = {"present": 1, "absent": 2, "leave": 3, "half_day": 4}
+MAX_LEAVE_DAYS = 366
+
+def _leave_dates(start_date: str, end_date: str) -> List[str]:
+    try:
+        first, last = date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Leave dates must be YYYY-MM-DD")
+    if not 0 <= (last - first).days < MAX_LEAVE_DAYS:
+        raise HTTPException(status_code=400, detail=f"A leave must span 1 to {MAX_LEAVE_DAYS} days")
+    return [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+async def set_availability(user_id: str, user_name: str, statuses: dict):
+    """Write {date: status} into the user's monthly day-status vectors.
+
+    Per month, an upsert creates the zeroed vector if missing and a second
+    update sets the days; both run in one ordered bulk_write (they can't share
+    an update since both touch `days`).
+    """
+    operations = []
+    for month, entries in _group_by_month(statuses).items():
+        year, month_number = int(month[:4]), int(month[5:7])
+        key = {"user_id": user_id, "month": month}
+        operations.append(UpdateOne(key, {
+            "$setOnInsert": {"days": [0] * monthrange(year, month_number)[1]},
+            "$set": {"user_name": user_name},
+        }, upsert=True))
+        operations.append(UpdateOne(key, {"$set": {
+            f"days.{int(day[8:10]) - 1}": DAY_STATUS_CODES.get(status, 0) for day, status in entries
+        }}))
+    if operations:
+        await db.availability.bulk_write(operations, ordered=True)
+
+def _group_by_month(statuses: dict) -> dict:
+    months = defaultdict(list)
+    for day, status in statuses.items():
+        months[day[:7]].append((day, status))
+    return months
+
+async def apply_approved_leave(leave: dict):
+    """Mark the days of an approved leave as `leave` in attendance and availability.
+
+    Only days without an attendance record are filled, so days someone
+    checked in on stay present.
+    """
+    dates = _leave_dates(leave["start_date"], leave["end_date"])
+    records = [
+        AttendanceRecord(user_id=leave["user_id"], user_name=leave["user_name"], date=day, status="leave").model_dump()
+        for day in dates
+    ]
+    result = await db.attendance.bulk_write([
+        UpdateOne({"user_id": leave["user_id"], "date": record["date"]}, {"$setOnInsert": record}, upsert=True)
+        for record in records
+    ], ordered=False)
+    inserted = [records[index] for index in result.upserted_ids]
+    await set_availability(leave["user_id"], leave["user_name"], {record["date"]: "leave" for record in inserted})
+    for record in inserted:
+        publish_change("attendance", "create", record["id"], record)
+
+async def revoke_leave(leave: dict):
+    """Undo apply_approved_leave() for a leave that is no longer approved"""
+    dates = _leave_dates(leave["start_date"], leave["end_date"])
+    query = {"user_id": leave["user_id"], "date": {"$in": dates}, "status": "leave", "check_in": None}
+    removed = await db.attendance.find(query, {"_id": 0, "id": 1, "date": 1}).to_list(None)
+    if not removed:
+        return
+    # Same shape as the find, so user_id_date_unique serves the delete too
+    await db.attendance.delete_many({**query, "date": {"$in": [record["date"] for record in removed]}})
+    await set_availability(leave["user_id"], leave["user_name"], {record["date"]: None for record in removed})
+    for record in removed:
+        publish_change("attendance", "delete", record["id"], previous={"user_id": leave["user_id"]})
+
+async def rebuild_availability():
+    """Recompute every day-status vector from the attendance records"""
+    await db.availability.delete_many({})
+    pipeline = [
+        {"$group": {
+            "_id": {"user_id": "$user_id", "month": {"$substrCP": ["$date", 0, 7]}},
+            "user_name": {"$first": "$user_name"},
+            "days": {"$push": {"date": "$date", "status": "$status"}}
+        }}
+    ]
+    async for row in db.attendance.aggregate(pipeline):
+        await set_availability(row["_id"]["user_id"], row["user_name"], {day["date"]: day["status"] for day in row["days"]})
+
+@api_router.get("/attendance/availability")
+async def get_availability_grid(month: str = Query(..., pattern=r"^\d{4}-\d{2}$")):
+    """Day-by-day status of the team for a month, with per-day totals.
+
+    Codes in each user's `days`: 0 no record, 1 present, 2 absent, 3 leave,
+    4 half day. Users without any record that month count as available.
+    """
+    year, month_number = int(month[:4]), int(month[5:7])
+    if not 1 <= month_number <= 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    day_count = monthrange(year, month_number)[1]
+    docs, active_users = await asyncio.gather(
+        db.availability.find({"month": month}, {"_id": 0, "user_id": 1, "user_name": 1, "days": 1}).to_list(None),
+        db.users.find({"is_active": {"$ne": False}}, {"_id": 0, "id": 1}).to_list(None),
+    )
+    # Deactivated users are neither part of the team size nor of the grid
+    active_ids = {user["id"] for user in active_users}
+    docs = [doc for doc in docs if doc["user_id"] in active_ids]
+    team_size = len(active_ids)
+    grid = np.array([doc["days"] for doc in docs], dtype=np.int8).reshape(len(docs), day_count)
+    
+    def per_day(status: str) -> list:
+        return (grid == DAY_STATUS_CODES[status]).sum(axis=0).tolist()
+    
+    on_leave = per_day("leave")
+    absent = per_day("absent")
+    return {
+        "month": month,
+        "days": day_count,
+        "team_size": team_size,
+        "users": docs,
+        "present_per_day": per_day("present"),
+        "on_leave_per_day": on_leave,
+        "absent_per_day": absent,
+        "available_per_day": (team_size - np.array(on_leave) - np.array(absent)).tolist(),
+    }
 
-# ========== GOOGLE CALENDAR SYNC ==========
 
+# ========== ADMIN ==========
+
+@api_router.get("/admin/slow-queries", dependencies=ADMIN_ACCESS)
+async def get_slow_queries(limit: int = Query(20, ge=1, le=200), since: Optional[str] = None):
+    # Worst query shapes first: ones examining far more than they return, then by total time spent in them
+    match = {"ts": {"$gte": since}} if since else {}
+    return await db.slow_queries.aggregate([
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {"collection": "$collection", "command": "$command", "shape": "$shape"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "max_docs_returned": {"$max": "$docs_returned"},
+            "inefficient": {"$max": "$inefficient"},
+            "routes": {"$addToSet": "$route"},
+            "last_seen": {"$last": "$ts"},
+            "plans": {"$push": "$plan"}
+        }},
+        {"$sort": {"inefficient": -1, "total_ms": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0,
+            "collection": "$_id.collection",
+            "command": "$_id.command",
+            "shape": "$_id.shape",
+            "count": 1,
+            "total_ms": {"$round": ["$total_ms", 2]},
+            "max_ms": 1,
+            "avg_ms": {"$round": ["$avg_ms", 2]},
+            "max_docs_returned": 1,
+            "inefficient": 1,
+            "routes": 1,
+            "last_seen": 1,
+            # Most recent explain sample, if any was taken
+            "plan": {"$last": {"$filter": {"input": "$plans", "cond": {"$ne": ["$$this", None]}}}}
+        }}
+    ]).to_list(limit)
+
+# ========== METRICS ENDPOINT ==========
+
+@public_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
+# ========== GOOGLE CALENDAR SYNC ==========
+
+# Calendar mutations only record a job in calendar_sync_jobs (the outbox); a
+# background worker pushes pending jobs to the calendar backend, so request
+# latency never depends on the external API.
+CALENDAR_SYNC_BACKEND = os.environ.get('CALENDAR_SYNC_BACKEND', 'google')  # google, local, off
+CALENDAR_SYNC_BATCH_SIZE = int(os.environ.get('CALENDAR_SYNC_BATCH_SIZE', '20'))
+CALENDAR_SYNC_RATE = float(os.environ.get('CALENDAR_SYNC_RATE', '5'))  # calls per second
+CALENDAR_SYNC_POLL_SECONDS = float(os.environ.get('CALENDAR_SYNC_POLL_SECONDS', '2'))
+CALENDAR_SYNC_MAX_ATTEMPTS = int(os.environ.get('CALENDAR_SYNC_MAX_ATTEMPTS', '8'))
+CALENDAR_SYNC_LOCK_SECONDS = 300
+CALENDAR_SYNC_TIMEZONE = os.environ.get('CALENDAR_SYNC_TIMEZONE', 'UTC')
+
+metrics.describe("calendar_sync_jobs_total", "counter", "Calendar sync jobs processed by operation and outcome")
+
+class CalendarSyncError(Exception):
+    """A sync call failed; `retryable` is False for errors a retry can't fix"""
+    def __init__(self, message: str, retryable: bool = True, status: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+
+class GoogleCalendarClient:
+    """Google Calendar API v3 through OAuth2 refresh-token credentials.
+
+    The API client is synchronous, so calls run in a worker thread. Access
+    tokens are refreshed by the client on first use.
+    """
+    def __init__(self, client_id: str, client_secret: str, refresh_token: str, calendar_id: str = "primary"):
+        credentials = Credentials(
+            None,
+            refresh_token=refresh_token,
+            client_id=client_id,
+            client_secret=client_secret,
+            token_uri="https://oauth2.googleapis.com/token",
+        )
+        self.events = build("calendar", "v3", credentials=credentials, cache_discovery=False).events()
+        self.calendar_id = calendar_id
+
+    async def _execute(self, request):
+        try:
+            return await asyncio.to_thread(request.execute)
+        except HttpError as e:
+            status = e.resp.status
+            raise CalendarSyncError(f"Google Calendar returned {status}: {e}", retryable=status == 429 or status >= 500, status=status)
+
+    async def create_event(self, event: dict) -> str:
+        created = await self._execute(self.events.insert(calendarId=self.calendar_id, body=_google_event_body(event)))
+        return created["id"]
+
+    async def update_event(self, google_event_id: str, event: dict):
+        await self._execute(self.events.update(calendarId=self.calendar_id, eventId=google_event_id, body=_google_event_body(event)))
+
+    async def delete_event(self, google_event_id: str):
+        try:
+            await self._execute(self.events.delete(calendarId=self.calendar_id, eventId=google_event_id))
+        except CalendarSyncError as e:
+            # Already gone on Google's side
+            if e.status not in (404, 410):
+                raise
+
+class LocalCalendarClient:
+    """In-memory stand-in for the Google client, for development and tests"""
+    def __init__(self):
+        self.events = {}
+
+    async def create_event(self, event: dict) -> str:
+        google_event_id = f"local-{uuid.uuid4()}"
+        self.events[google_event_id] = _google_event_body(event)
+        return google_event_id
+
+    async def update_event(self, google_event_id: str, event: dict):
+        if google_event_id not in self.events:
+            raise CalendarSyncError(f"Unknown event {google_event_id}", retryable=False)
+        self.events[google_event_id] = _google_event_body(event)
+
+    async def delete_event(self, google_event_id: str):
+        self.events.pop(google_event_id, None)
+
+def make_calendar_client():
+    """The configured calendar backend, or None when sync is off or not configured"""
+    if CALENDAR_SYNC_BACKEND == "local":
+        return LocalCalendarClient()
+    if CALENDAR_SYNC_BACKEND != "google":
+        return None
+    settings = {
+        "client_id": os.environ.get('GOOGLE_CALENDAR_CLIENT_ID'),
+        "client_secret": os.environ.get('GOOGLE_CALENDAR_CLIENT_SECRET'),
+        "refresh_token": os.environ.get('GOOGLE_CALENDAR_REFRESH_TOKEN'),
+    }
+    if not all(settings.values()):
+        logging.warning("Google Calendar credentials not configured, calendar sync is off")
+        return None
+    return GoogleCalendarClient(calendar_id=os.environ.get('GOOGLE_CALENDAR_ID', 'primary'), **settings)
+
+def _google_event_time(value: str) -> dict:
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        return {"dateTime": moment.isoformat(), "timeZone": CALENDAR_SYNC_TIMEZONE}
+    return {"dateTime": moment.isoformat()}
+
+def _google_event_body(event: dict) -> dict:
+    body = {
+        "summary": event["title"],
+        "description": event.get("description") or "",
+        "start": _google_event_time(event["start_time"]),
+        "end": _google_event_time(event["end_time"]),
+    }
+    if event.get("recurrence"):
+        body["recurrence"] = [f"RRULE:{event['recurrence']}"]
+    return body
+
+async def enqueue_calendar_sync(event_id: str, op: str, google_event_id: Optional[str] = None):
+    """Record that an event must be pushed ("upsert") or removed ("delete").
+
+    There is at most one pending job per event: later mutations overwrite it,
+    and since the worker pushes the event as it is when the job runs, a burst
+    of edits costs a single API call.
+    """
+    if calendar_sync_worker is None:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    job_filter = {"event_id": event_id, "status": "pending"}
+    update = {
+        "$set": {"op": op, "google_event_id": google_event_id, "next_attempt_at": now, "updated_at": now},
+        "$setOnInsert": {"id": str(uuid.uuid4()), "attempts": 0, "created_at": now},
+    }
+    try:
+        await db.calendar_sync_jobs.update_one(job_filter, update, upsert=True)
+    except DuplicateKeyError:
+        # A concurrent upsert inserted the pending job first; update that one
+        await db.calendar_sync_jobs.update_one(job_filter, update)
+    calendar_sync_worker.wake()
+
+class CalendarSyncWorker:
+    """Drains calendar_sync_jobs: claims due jobs in batches, calls the client
+    at most `rate` times per second, and retries failures with exponential
+    backoff until `max_attempts`, after which the job is marked failed.
+
+    Jobs are claimed atomically with a lease, so several workers can share the
+    outbox and a job held by a crashed worker is picked up again.
+    """
+    def __init__(self, client, batch_size: int, rate: float, max_attempts: int):
+        self.client = client
+        self.batch_size = batch_size
+        self.interval = 1 / rate
+        self.max_attempts = max_attempts
+        self._next_call = 0.0
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Calendar sync batch failed: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), CALENDAR_SYNC_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        jobs = await self._claim()
+        for job in jobs:
+            await self._throttle()
+            await self._process(job)
+        return len(jobs)
+
+    async def _claim(self) -> list:
+        """Claim up to batch_size due jobs in three round trips, whatever the batch size.
+
+        The candidates' ids are read first because update_many can't take a
+        limit. The update re-checks that each job is still due and stamps it
+        with this claim's token, so a job another worker took in between is
+        skipped. The claimed jobs are then read back by that token.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "running", "locked_until": {"$lt": now}},
+        ]}
+        candidates = await db.calendar_sync_jobs.find(due, {"_id": 0, "id": 1}).sort(
+            "next_attempt_at", ASCENDING
+        ).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+        claim = str(uuid.uuid4())
+        lease = (datetime.now(timezone.utc) + timedelta(seconds=CALENDAR_SYNC_LOCK_SECONDS)).isoformat()
+        result = await db.calendar_sync_jobs.update_many(
+            {"$and": [{"id": {"$in": [job["id"] for job in candidates]}}, due]},
+            {"$set": {"status": "running", "locked_until": lease, "claim": claim}, "$inc": {"attempts": 1}}
+        )
+        if result.modified_count == 0:
+            return []
+        jobs = await db.calendar_sync_jobs.find({"claim": claim}, {"_id": 0}).to_list(None)
+        jobs.sort(key=lambda job: job.get("next_attempt_at") or "")
+        return jobs
+
+    async def _throttle(self):
+        now = time.monotonic()
+        delay = self._next_call - now
+        self._next_call = max(now, self._next_call) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _process(self, job: dict):
+        try:
+            if job["op"] == "delete":
+                if job.get("google_event_id"):
+                    await self.client.delete_event(job["google_event_id"])
+            else:
+                await self._push(job["event_id"])
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            await self._fail(job, e, retryable and job["attempts"] < self.max_attempts)
+            return
+        await db.calendar_sync_jobs.delete_one({"id": job["id"]})
+        metrics.inc("calendar_sync_jobs_total", {"op": job["op"], "outcome": "synced"})
+
+    async def _push(self, event_id: str):
+        event = await db.calendar_events.find_one({"id": event_id}, {"_id": 0})
+        if event is None:
+            # Deleted since; its delete job takes care of the remote copy
+            return
+        if event.get("google_event_id"):
+            await self.client.update_event(event["google_event_id"], event)
+            return
+        google_event_id = await self.client.create_event(event)
+        result = await db.calendar_events.update_one({"id": event_id}, {"$set": {"google_event_id": google_event_id}})
+        if result.matched_count == 0:
+            # Deleted while the create was in flight, before its id could be recorded
+            await self.client.delete_event(google_event_id)
+            return
+        publish_change("calendar_events", "update", event_id, {"google_event_id": google_event_id})
+
+    async def _fail(self, job: dict, error: Exception, retry: bool):
+        if retry:
+            delay = min(2 ** job["attempts"], 3600) * random.uniform(0.5, 1.5)
+            update = {
+                "status": "pending",
+                "next_attempt_at": (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat(),
+            }
+            logger.warning(f"Calendar sync of {job['event_id']} failed (attempt {job['attempts']}), retrying in {delay:.0f}s: {error}")
+        else:
+            update = {"status": "failed"}
+            logger.error(f"Calendar sync of {job['event_id']} failed permanently: {error}")
+        update["last_error"] = str(error)
+        try:
+            await db.calendar_sync_jobs.update_one({"id": job["id"]}, {"$set": update, "$unset": {"locked_until": "", "claim": ""}})
+        except DuplicateKeyError:
+            # A newer job for the event is already pending and supersedes this one
+            await db.calendar_sync_jobs.delete_one({"id": job["id"]})
+        metrics.inc("calendar_sync_jobs_total", {"op": job["op"], "outcome": "retry" if retry else "failed"})
+
+calendar_sync_client = make_calendar_client()
+calendar_sync_worker = (
+    CalendarSyncWorker(calendar_sync_client, CALENDAR_SYNC_BATCH_SIZE, CALENDAR_SYNC_RATE, CALENDAR_SYNC_MAX_ATTEMPTS)
+    if calendar_sync_client is not None else None
+)
 
 # ========== KUDOS SYSTEM ==========
 
 @api_router.get("/kudos/transactions")
-async def get_kudos_transactions(user_id: Optional[str] = None):
+async def get_kudos_transactions(user_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if user_id:
         query["user_id"] = user_id
-    transactions = await db.kudos_transactions.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return transactions
+    return await paginate(db.kudos_transactions, query, SORT_BY_CREATED_DESC, page, KudosTransaction)
 
 @api_router.post("/kudos/transactions", response_model=KudosTransaction)
 async def create_kudos_transaction(kudos_data: KudosTransactionCreate):
     kudos_obj = KudosTransaction(**kudos_data.model_dump())
-    doc = kudos_obj.model_dump()
-    await db.kudos_transactions.insert_one(doc)
+    await record_kudos(kudos_obj)
     return kudos_obj
 
 @api_router.get("/kudos/balance/{user_id}")
 async def get_kudos_balance(user_id: str):
-    transactions = await db.kudos_transactions.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-    total_kudos = sum(t["amount"] for t in transactions)
-    return {"user_id": user_id, "total_kudos": total_kudos, "transactions_count": len(transactions)}
+    balance = await db.kudos_balances.find_one({"user_id": user_id}, {"_id": 0})
+    if not balance:
+        return {"user_id": user_id, "total_kudos": 0, "transactions_count": 0}
+    return {"user_id": user_id, "total_kudos": balance["total_kudos"], "transactions_count": balance["transactions_count"]}
+
+@api_router.get("/kudos/leaderboard")
+async def get_kudos_leaderboard(
+    window: str = Query("all", pattern="^(week|month|all)$"),
+    limit: int = Query(10, ge=1, le=100),
+    claims: dict = Depends(authenticate),
+):
+    """Top kudos earners for the current ISO week, calendar month or all time, plus the caller's rank.
+
+    All-time reads the materialized balances and windows read the per-period
+    buckets, both through a (total_kudos desc) index, so the top N touches N
+    documents. Ties share a rank.
+    """
+    if window == "all":
+        collection, query, period = db.kudos_balances, {}, None
+    else:
+        week, month = _kudos_periods(datetime.now(timezone.utc).isoformat())
+        period = week if window == "week" else month
+        collection, query = db.kudos_periods, {"period": period}
+    
+    projection = {"_id": 0, "user_id": 1, "user_name": 1, "total_kudos": 1}
+    top, mine = await asyncio.gather(
+        collection.find(query, projection).sort([("total_kudos", DESCENDING), ("user_id", ASCENDING)]).limit(limit).to_list(limit),
+        collection.find_one({**query, "user_id": claims["sub"]}, projection),
+    )
+    entries, rank, previous_total = [], 0, None
+    for position, row in enumerate(top, start=1):
+        if row["total_kudos"] != previous_total:
+            rank, previous_total = position, row["total_kudos"]
+        entries.append({"rank": rank, **row})
+    
+    # Users without a balance or bucket have zero kudos in the window
+    my_total = mine["total_kudos"] if mine else 0
+    my_rank = next((entry["rank"] for entry in entries if entry["user_id"] == claims["sub"]), None)
+    if my_rank is None:
+        my_rank = await collection.count_documents({**query, "total_kudos": {"$gt": my_total}}) + 1
+    return {
+        "window": window,
+        "period": period,
+        "entries": entries,
+        "me": {"user_id": claims["sub"], "rank": my_rank, "total_kudos": my_total},
+    }
+
+@api_router.post("/kudos/reconcile", dependencies=ADMIN_ACCESS)
+async def reconcile_kudos(dry_run: bool = False):
+    result = await reconcile_kudos_balances(fix=not dry_run)
+    result["periods"] = await reconcile_kudos_periods(fix=not dry_run)
+    return result
+
+async def record_kudos(kudos_obj: KudosTransaction, session=None):
+    """Append a kudos transaction to the ledger and apply it to the user's materialized balance"""
+    for doc in await record_kudos_many([kudos_obj], session=session):
+        publish_change("kudos_transactions", "create", doc["id"], doc)
+    return kudos_obj.model_dump()
+
+def _kudos_periods(created_at: str) -> tuple:
+    """The leaderboard buckets a kudos timestamp falls in: its ISO week (2025-W07) and month (2025-02)"""
+    iso_year, iso_week, _ = date.fromisoformat(created_at[:10]).isocalendar()
+    return f"{iso_year}-W{iso_week:02d}", created_at[:7]
+
+async def record_kudos_many(kudos_objs: List[KudosTransaction], session=None) -> list:
+    """Write kudos transactions in one bulk_write, then apply them to the leaderboard buckets and the balances.
+
+    Transactions carrying a `source` are only written (and counted) once, so
+    system-generated kudos can be re-recorded safely. Returns the documents
+    that were actually applied.
+    """
+    docs = [kudos_obj.model_dump() for kudos_obj in kudos_objs]
+    if not docs:
+        return []
+    operations = [
+        UpdateOne({"source": doc["source"]}, {"$setOnInsert": doc}, upsert=True) if doc["source"] else InsertOne(doc)
+        for doc in docs
+    ]
+    result = await db.kudos_transactions.bulk_write(operations, ordered=False, session=session)
+    applied = [doc for i, doc in enumerate(docs) if not doc["source"] or i in result.upserted_ids]
+    await apply_kudos_totals(applied, session=session)
+    return applied
+
+async def revoke_kudos_sources(sources: List[str], session=None) -> list:
+    """Delete the kudos transactions recorded under `sources` and take them back off the buckets and balances.
+
+    Each transaction is removed with find_one_and_delete, so two concurrent
+    revocations never both subtract it. Returns the documents removed.
+    """
+    if not sources:
+        return []
+    found = await db.kudos_transactions.find({"source": {"$in": sources}}, {"_id": 0, "source": 1}, session=session).to_list(None)
+    removed = []
+    for doc in found:
+        deleted = await db.kudos_transactions.find_one_and_delete({"source": doc["source"]}, {"_id": 0}, session=session)
+        if deleted is not None:
+            removed.append(deleted)
+    await apply_kudos_totals(removed, sign=-1, session=session)
+    return removed
+
+async def apply_kudos_totals(docs: list, sign: int = 1, session=None):
+    """Add (or with sign=-1, subtract) kudos transactions to the leaderboard buckets and the balances"""
+    balances, buckets = {}, {}
+    for doc in docs:
+        updated_at = doc["created_at"] if sign > 0 else datetime.now(timezone.utc).isoformat()
+        balance = balances.setdefault(doc["user_id"], {"amount": 0, "count": 0, "user_name": doc["user_name"], "updated_at": updated_at})
+        balance["amount"] += sign * doc["amount"]
+        balance["count"] += sign
+        for period in _kudos_periods(doc["created_at"]):
+            bucket = buckets.setdefault((period, doc["user_id"]), {"amount": 0, "count": 0, "user_name": doc["user_name"]})
+            bucket["amount"] += sign * doc["amount"]
+            bucket["count"] += sign
+    if buckets:
+        await db.kudos_periods.bulk_write([
+            UpdateOne(
+                {"period": period, "user_id": user_id},
+                {"$inc": {"total_kudos": bucket["amount"], "transactions_count": bucket["count"]}, "$set": {"user_name": bucket["user_name"]}},
+                upsert=True
+            )
+            for (period, user_id), bucket in buckets.items()
+        ], ordered=False, session=session)
+    if balances:
+        await db.kudos_balances.bulk_write([
+            UpdateOne(
+                {"user_id": user_id},
+                {
+                    "$inc": {"total_kudos": balance["amount"], "transactions_count": balance["count"]},
+                    "$set": {"user_name": balance["user_name"], "updated_at": balance["updated_at"]}
+                },
+                upsert=True
+            )
+            for user_id, balance in balances.items()
+        ], ordered=False, session=session)
+    invalidate_dashboard(*balances)
+
+async def reconcile_kudos_balances(fix: bool = True) -> dict:
+    """Rebuild kudos balances from the ledger and report any drift from the materialized values"""
+    ledger = {}
+    async for row in db.kudos_transactions.aggregate([
+        {"$group": {
+            "_id": "$user_id",
+            "user_name": {"$last": "$user_name"},
+            "total_kudos": {"$sum": "$amount"},
+            "transactions_count": {"$sum": 1}
+        }}
+    ]):
+        ledger[row["_id"]] = row
+
+    drift = []
+    operations = []
+    seen = set()
+    async for balance in db.kudos_balances.find({}, {"_id": 0}):
+        user_id = balance["user_id"]
+        seen.add(user_id)
+        expected = ledger.get(user_id)
+        if expected is None:
+            drift.append({"user_id": user_id, "balance": balance["total_kudos"], "ledger": 0})
+            operations.append(DeleteOne({"user_id": user_id}))
+        elif (balance.get("total_kudos"), balance.get("transactions_count")) != (expected["total_kudos"], expected["transactions_count"]):
+            drift.append({"user_id": user_id, "balance": balance.get("total_kudos"), "ledger": expected["total_kudos"]})
+            operations.append(UpdateOne(
+                {"user_id": user_id},
+                {"$set": {"total_kudos": expected["total_kudos"], "transactions_count": expected["transactions_count"]}}
+            ))
+    now = datetime.now(timezone.utc).isoformat()
+    for user_id, expected in ledger.items():
+        if user_id in seen:
+            continue
+        drift.append({"user_id": user_id, "balance": None, "ledger": expected["total_kudos"]})
+        operations.append(UpdateOne(
+            {"user_id": user_id},
+            {"$set": {
+                "user_name": expected["user_name"],
+                "total_kudos": expected["total_kudos"],
+                "transactions_count": expected["transactions_count"],
+                "updated_at": now
+            }},
+            upsert=True
+        ))
+
+    if fix and operations:
+        await db.kudos_balances.bulk_write(operations, ordered=False)
+        invalidate_dashboard(*(entry["user_id"] for entry in drift))
+    if drift:
+        logger.warning(f"Kudos balance drift for {len(drift)} user(s)")
+    return {"users_checked": len(ledger), "drift": drift, "fixed": fix and bool(operations)}
+
+async def reconcile_kudos_periods(fix: bool = True) -> dict:
+    """Rebuild the weekly and monthly leaderboard buckets from the ledger and report drift.
+
+    The ledger is grouped per user and day in Mongo; days are folded into
+    weeks and months here with the same _kudos_periods() the write path uses.
+    """
+    ledger = {}
+    async for row in db.kudos_transactions.aggregate([
+        {"$group": {
+            "_id": {"user_id": "$user_id", "day": {"$substrCP": ["$created_at", 0, 10]}},
+            "user_name": {"$last": "$user_name"},
+            "total_kudos": {"$sum": "$amount"},
+            "transactions_count": {"$sum": 1}
+        }}
+    ]):
+        for period in _kudos_periods(row["_id"]["day"]):
+            expected = ledger.setdefault((period, row["_id"]["user_id"]), {"user_name": row["user_name"], "total_kudos": 0, "transactions_count": 0})
+            expected["total_kudos"] += row["total_kudos"]
+            expected["transactions_count"] += row["transactions_count"]
+
+    drift = []
+    operations = []
+    seen = set()
+    async for bucket in db.kudos_periods.find({}, {"_id": 0}):
+        key = (bucket["period"], bucket["user_id"])
+        seen.add(key)
+        expected = ledger.get(key)
+        if expected is None:
+            drift.append({"period": key[0], "user_id": key[1], "bucket": bucket.get("total_kudos"), "ledger": 0})
+            operations.append(DeleteOne({"period": key[0], "user_id": key[1]}))
+        elif (bucket.get("total_kudos"), bucket.get("transactions_count")) != (expected["total_kudos"], expected["transactions_count"]):
+            drift.append({"period": key[0], "user_id": key[1], "bucket": bucket.get("total_kudos"), "ledger": expected["total_kudos"]})
+            operations.append(UpdateOne(
+                {"period": key[0], "user_id": key[1]},
+                {"$set": {"total_kudos": expected["total_kudos"], "transactions_count": expected["transactions_count"]}}
+            ))
+    for key, expected in ledger.items():
+        if key in seen:
+            continue
+        drift.append({"period": key[0], "user_id": key[1], "bucket": None, "ledger": expected["total_kudos"]})
+        operations.append(UpdateOne({"period": key[0], "user_id": key[1]}, {"$set": expected}, upsert=True))
+
+    if fix and operations:
+        await db.kudos_periods.bulk_write(operations, ordered=False)
+    if drift:
+        logger.warning(f"Kudos leaderboard bucket drift for {len(drift)} user period(s)")
+    return {"periods_checked": len(ledger), "drift": drift, "fixed": fix and bool(operations)}
 
 # ========== TRAINING SECTION ==========
 
 @api_router.get("/training/courses", response_model=List[TrainingCourse])
-async def get_training_courses():
-    courses = await db.training_courses.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return courses
+async def get_training_courses(page: PageParams = Depends()):
+    return await paginate(db.training_courses, {}, SORT_BY_CREATED_DESC, page, TrainingCourse)
 
 @api_router.post("/training/courses", response_model=TrainingCourse)
 async def create_training_course(course_data: TrainingCourseCreate):
     course_obj = TrainingCourse(**course_data.model_dump())
     doc = course_obj.model_dump()
     await db.training_courses.insert_one(doc)
+    publish_change("training_courses", "create", doc["id"], doc)
     return course_obj
 
 @api_router.put("/training/courses/{course_id}")
@@ -1037,17 +4379,17 @@ async def update_training_course(course_id: str, update_data: dict):
     result = await db.training_courses.update_one({"id": course_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
+    publish_change("training_courses", "update", course_id, update_data)
     return {"message": "Course updated successfully"}
 
 @api_router.get("/training/progress")
-async def get_training_progress(user_id: Optional[str] = None, course_id: Optional[str] = None):
+async def get_training_progress(user_id: Optional[str] = None, course_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if user_id:
         query["user_id"] = user_id
     if course_id:
         query["course_id"] = course_id
-    progress = await db.training_progress.find(query, {"_id": 0}).to_list(1000)
-    return progress
+    return await paginate(db.training_progress, query, SORT_BY_CREATED, page, TrainingProgress)
 
 @api_router.post("/training/progress")
 async def enroll_training(user_id: str, user_name: str, course_id: str):
@@ -1059,6 +4401,7 @@ async def enroll_training(user_id: str, user_name: str, course_id: str):
     progress_obj = TrainingProgress(user_id=user_id, user_name=user_name, course_id=course_id)
     doc = progress_obj.model_dump()
     await db.training_progress.insert_one(doc)
+    publish_change("training_progress", "create", doc["id"], doc)
     return progress_obj
 
 @api_router.put("/training/progress/{progress_id}")
@@ -1080,98 +4423,370 @@ async def update_training_progress(progress_id: str, update_data: TrainingProgre
                     category="training_completion",
                     given_by="system"
                 )
-                await db.kudos_transactions.insert_one(kudos_obj.model_dump())
+                await record_kudos(kudos_obj)
             update_dict["completed"] = True
     
-    result = await db.training_progress.update_one({"id": progress_id}, {"$set": update_dict})
-    if result.matched_count == 0:
+    previous = await db.training_progress.find_one_and_update({"id": progress_id}, {"$set": update_dict}, {"_id": 0, "user_id": 1})
+    if not previous:
         raise HTTPException(status_code=404, detail="Progress record not found")
+    publish_change("training_progress", "update", progress_id, update_dict, previous)
     return {"message": "Progress updated successfully"}
 
 # ========== MEETINGS ==========
 
 @api_router.get("/meetings", response_model=List[Meeting])
-async def get_meetings(user_id: Optional[str] = None, meeting_type: Optional[str] = None):
+async def get_meetings(user_id: Optional[str] = None, meeting_type: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if user_id:
         query["$or"] = [{"organizer": user_id}, {"attendees": user_id}]
     if meeting_type:
         query["meeting_type"] = meeting_type
-    meetings = await db.meetings.find(query, {"_id": 0}).sort("start_time", -1).to_list(1000)
-    return meetings
+    return await paginate(db.meetings, query, [("start_time", DESCENDING), ("id", DESCENDING)], page, Meeting)
 
 @api_router.post("/meetings", response_model=Meeting)
-async def create_meeting(meeting_data: MeetingCreate):
+async def create_meeting(meeting_data: MeetingCreate, allow_conflicts: bool = False):
+    """Create a meeting, refusing with 409 when an attendee is already busy unless `allow_conflicts` is set"""
+    if not allow_conflicts:
+        await ensure_no_conflicts(
+            [meeting_data.organizer, *meeting_data.attendees], meeting_data.start_time, meeting_data.end_time
+        )
     meeting_obj = Meeting(**meeting_data.model_dump())
     doc = meeting_obj.model_dump()
     await db.meetings.insert_one(doc)
+    publish_change("meetings", "create", doc["id"], doc)
+    invalidate_dashboard(doc["organizer"], *doc["attendees"])
     return meeting_obj
 
+_MEETING_SCHEDULE_FIELDS = ("start_time", "end_time", "organizer", "attendees")
+
 @api_router.put("/meetings/{meeting_id}")
-async def update_meeting(meeting_id: str, update_data: dict):
-    result = await db.meetings.update_one({"id": meeting_id}, {"$set": update_data})
-    if result.matched_count == 0:
+async def update_meeting(meeting_id: str, update_data: dict, allow_conflicts: bool = False):
+    """Update a meeting; moving it or changing who attends is checked for conflicts like create_meeting"""
+    if not allow_conflicts and any(field in update_data for field in _MEETING_SCHEDULE_FIELDS):
+        current = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, **{field: 1 for field in _MEETING_SCHEDULE_FIELDS}})
+        if not current:
+            raise HTTPException(status_code=404, detail="Meeting not found")
+        merged = {**current, **{field: update_data[field] for field in _MEETING_SCHEDULE_FIELDS if field in update_data}}
+        await ensure_no_conflicts(
+            [merged["organizer"], *merged["attendees"]], merged["start_time"], merged["end_time"], exclude_meeting_id=meeting_id
+        )
+    previous = await db.meetings.find_one_and_update(
+        {"id": meeting_id}, {"$set": update_data}, {"_id": 0, "organizer": 1, "attendees": 1}
+    )
+    if not previous:
         raise HTTPException(status_code=404, detail="Meeting not found")
+    invalidate_dashboard(
+        previous.get("organizer"), *previous.get("attendees", []),
+        update_data.get("organizer"), *update_data.get("attendees", [])
+    )
+    publish_change("meetings", "update", meeting_id, update_data, previous)
     return {"message": "Meeting updated successfully"}
 
-@api_router.post("/meetings/{meeting_id}/attendance")
-async def record_meeting_attendance(meeting_id: str, attendance_data: MeetingAttendanceCreate):
-    # Get meeting details
-    meeting = await db.meetings.find_one({"id": meeting_id})
-    if not meeting:
-        raise HTTPException(status_code=404, detail="Meeting not found")
-    
-    # Record attendance for all attendees
-    for attendee_id in meeting["attendees"]:
-        user = await db.users.find_one({"id": attendee_id})
-        if not user:
+def _attendance_writes(meeting_id: str, meeting: dict, names: dict, present: set) -> tuple:
+    """Attendance rows, absence penalties and penalty sources to revoke for a meeting's attendees.
+
+    Rows are upserted per (meeting, user) and absence penalties carry a
+    deterministic source, so recording the same meeting again is idempotent.
+    Attendees now present have the source of any earlier penalty listed for
+    revocation, in case an earlier recording marked them absent.
+    Attendees without a user record (`names` maps user id to name) are skipped.
+    """
+    records = []
+    penalties = []
+    pardoned = []
+    for attendee_id in dict.fromkeys(meeting["attendees"]):
+        if attendee_id not in names:
             continue
-        
-        status = "present" if attendee_id in attendance_data.attendees_present else "absent"
-        
-        # Create attendance record
-        attendance_obj = MeetingAttendance(
+        status = "present" if attendee_id in present else "absent"
+        records.append(MeetingAttendance(
             meeting_id=meeting_id,
             user_id=attendee_id,
-            user_name=user["name"],
+            user_name=names[attendee_id],
             status=status
-        )
-        await db.meeting_attendance.insert_one(attendance_obj.model_dump())
+        ).model_dump())
         
         # Deduct kudos if absent
         if status == "absent":
-            kudos_obj = KudosTransaction(
+            penalties.append(KudosTransaction(
                 user_id=attendee_id,
-                user_name=user["name"],
+                user_name=names[attendee_id],
                 amount=-5,
                 reason=f"Missed meeting: {meeting['title']}",
                 category="meeting_attendance",
-                given_by=meeting["organizer"]
-            )
-            await db.kudos_transactions.insert_one(kudos_obj.model_dump())
+                given_by=meeting["organizer"],
+                source=f"meeting_absence:{meeting_id}:{attendee_id}"
+            ))
+        else:
+            pardoned.append(f"meeting_absence:{meeting_id}:{attendee_id}")
+    return records, penalties, pardoned
+
+@api_router.post("/meetings/{meeting_id}/attendance")
+async def record_meeting_attendance(meeting_id: str, attendance_data: MeetingAttendanceCreate):
+    # Get meeting details
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "title": 1, "organizer": 1, "attendees": 1})
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    attendee_ids = list(dict.fromkeys(meeting["attendees"]))
+    users = await db.users.find({"id": {"$in": attendee_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    names = {user["id"]: user["name"] for user in users}
+    records, penalties, pardoned = _attendance_writes(meeting_id, meeting, names, set(attendance_data.attendees_present))
+    attendance_operations = [
+        UpdateOne(
+            {"meeting_id": meeting_id, "user_id": record["user_id"]},
+            {"$set": {"status": record["status"]}, "$setOnInsert": {k: v for k, v in record.items() if k != "status"}},
+            upsert=True
+        )
+        for record in records
+    ]
+    
+    async def write(session):
+        if attendance_operations:
+            await db.meeting_attendance.bulk_write(attendance_operations, ordered=False, session=session)
+        applied = await record_kudos_many(penalties, session=session)
+        # A correction that marks someone present takes back their earlier penalty
+        revoked = await revoke_kudos_sources(pardoned, session=session)
+        # Mark meeting as attendance tracked
+        await db.meetings.update_one({"id": meeting_id}, {"$set": {"attendance_tracked": True}}, session=session)
+        return applied, revoked
     
-    # Mark meeting as attendance tracked
-    await db.meetings.update_one({"id": meeting_id}, {"$set": {"attendance_tracked": True}})
+    applied, revoked = await run_in_transaction(write)
+    # Published only once the transaction has committed
+    for doc in applied:
+        publish_change("kudos_transactions", "create", doc["id"], doc)
+    for doc in revoked:
+        publish_change("kudos_transactions", "delete", doc["id"], previous=doc)
+    publish_change("meetings", "update", meeting_id, {"attendance_tracked": True}, meeting)
     
-    return {"message": "Attendance recorded successfully"}
+    return {
+        "message": "Attendance recorded successfully",
+        "recorded": len(attendance_operations),
+        "absent": len(penalties),
+        "penalties_applied": len(applied),
+        "penalties_revoked": len(revoked)
+    }
 
 @api_router.get("/meetings/{meeting_id}/attendance")
-async def get_meeting_attendance(meeting_id: str):
-    attendance = await db.meeting_attendance.find({"meeting_id": meeting_id}, {"_id": 0}).to_list(1000)
-    return attendance
+async def get_meeting_attendance(meeting_id: str, page: PageParams = Depends()):
+    return await paginate(db.meeting_attendance, {"meeting_id": meeting_id}, SORT_BY_CREATED, page, MeetingAttendance)
+
+# ========== AVAILABILITY ==========
+
+def _merge_intervals(intervals) -> tuple:
+    """Union of (start, end) pairs sorted by start, as parallel starts/ends lists"""
+    starts, ends = [], []
+    for start, end in intervals:
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+class FreeBusy:
+    """Busy intervals per user, indexed for conflict, busy and free-slot queries.
+
+    Built from (user_id, start, end, item) tuples with times in epoch seconds.
+    Each user's intervals are kept sorted by start, to report which items
+    conflict, next to their merged union, which answers busy/free questions
+    with binary searches instead of scans.
+    """
+    def __init__(self, intervals):
+        by_user = defaultdict(list)
+        for user_id, start, end, item in intervals:
+            if end > start:
+                by_user[user_id].append((start, end, item))
+        self._raw = {}
+        self._merged = {}
+        for user_id, items in by_user.items():
+            items.sort(key=itemgetter(0))
+            longest = max(end - start for start, end, _ in items)
+            self._raw[user_id] = ([start for start, _, _ in items], items, longest)
+            self._merged[user_id] = _merge_intervals((start, end) for start, end, _ in items)
+
+    def conflicts(self, user_id: str, start: float, end: float) -> list:
+        """Items of `user_id` overlapping [start, end)"""
+        raw = self._raw.get(user_id)
+        if raw is None:
+            return []
+        starts, items, longest = raw
+        # Nothing starting before start - longest can still be running at start
+        lo = bisect_left(starts, start - longest)
+        hi = bisect_left(starts, end)
+        return [item for item_start, item_end, item in items[lo:hi] if item_end > start]
+
+    def busy(self, user_id: str, start: float, end: float) -> list:
+        """Merged busy blocks of `user_id` clipped to [start, end)"""
+        merged = self._merged.get(user_id)
+        if merged is None:
+            return []
+        starts, ends = merged
+        lo = bisect_right(ends, start)
+        hi = bisect_left(starts, end)
+        return [(max(starts[i], start), min(ends[i], end)) for i in range(lo, hi)]
+
+    def free_slots(self, user_ids: list, start: float, end: float, duration: float, limit: Optional[int] = None) -> list:
+        """Gaps of at least `duration` in [start, end) when none of `user_ids` is busy"""
+        slots = []
+        cursor = start
+        for busy_start, busy_end in heapq.merge(*(self.busy(user_id, start, end) for user_id in user_ids)):
+            if busy_start - cursor >= duration:
+                slots.append((cursor, busy_start))
+                if limit is not None and len(slots) >= limit:
+                    return slots
+            cursor = max(cursor, busy_end)
+        if end - cursor >= duration:
+            slots.append((cursor, end))
+        return slots
+
+def _epoch(moment: datetime) -> float:
+    # Times entered without an offset are compared as if they were UTC
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+def _from_epoch(seconds: float, naive: bool) -> str:
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    return (moment.replace(tzinfo=None) if naive else moment).isoformat()
+
+def _working_windows(start: float, end: float, offset: float, day_start: Optional[int], day_end: Optional[int], weekdays_only: bool) -> list:
+    """Split [start, end) into the daily working-hour windows it contains.
+
+    Hours are local to a zone `offset` seconds ahead of UTC.
+    """
+    if day_start is None and day_end is None and not weekdays_only:
+        return [(start, end)]
+    first_hour, last_hour = day_start or 0, day_end or 24
+    day = datetime.fromtimestamp(start + offset, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    windows = []
+    while day.timestamp() - offset < end:
+        if not weekdays_only or day.weekday() < 5:
+            window_start = max(start, (day + timedelta(hours=first_hour)).timestamp() - offset)
+            window_end = min(end, (day + timedelta(hours=last_hour)).timestamp() - offset)
+            if window_end > window_start:
+                windows.append((window_start, window_end))
+        day += timedelta(days=1)
+    return windows
+
+def _split_ids(value: str) -> list:
+    user_ids = list(dict.fromkeys(user_id for user_id in value.split(",") if user_id))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="user_ids is required")
+    return user_ids
+
+async def load_free_busy(user_ids: list, window_start: datetime, window_end: datetime, exclude_meeting_id: Optional[str] = None) -> FreeBusy:
+    """Build a FreeBusy for `user_ids` from their meetings and calendar events in the window"""
+    start, end = window_start.isoformat(), window_end.isoformat()
+    wanted = set(user_ids)
+    meeting_query = {
+        "$or": [{"organizer": {"$in": user_ids}}, {"attendees": {"$in": user_ids}}],
+        "start_time": {"$lt": end},
+        "end_time": {"$gt": start},
+    }
+    if exclude_meeting_id:
+        meeting_query["id"] = {"$ne": exclude_meeting_id}
+    event_query = {"attendees": {"$in": user_ids}, **_calendar_window_filter(start, end)}
+    projection = {"_id": 0, "id": 1, "title": 1, "start_time": 1, "end_time": 1, "organizer": 1, "attendees": 1, "recurrence": 1}
+    meetings, events = await asyncio.gather(
+        db.meetings.find(meeting_query, projection).to_list(None),
+        db.calendar_events.find(event_query, projection).to_list(None),
+    )
+    
+    def intervals():
+        for source, docs in (("meeting", meetings), ("calendar_event", events)):
+            for doc in docs:
+                occurrences = expand_occurrences(doc, window_start, window_end) if source == "calendar_event" else [doc]
+                users = wanted.intersection([doc.get("organizer"), *doc.get("attendees", [])])
+                for occurrence in occurrences:
+                    try:
+                        occurrence_start = _epoch(datetime.fromisoformat(occurrence["start_time"]))
+                        occurrence_end = _epoch(datetime.fromisoformat(occurrence["end_time"]))
+                    except ValueError:
+                        continue
+                    item = {"source": source, "id": doc["id"], "title": doc["title"],
+                            "start_time": occurrence["start_time"], "end_time": occurrence["end_time"]}
+                    for user_id in users:
+                        yield user_id, occurrence_start, occurrence_end, item
+    
+    return FreeBusy(intervals())
+
+async def find_conflicts(attendees: list, start_time: str, end_time: str, exclude_meeting_id: Optional[str] = None) -> dict:
+    """Meetings and calendar events each attendee already has during the proposed time"""
+    start, end = _parse_event_time(start_time), _parse_event_time(end_time)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    user_ids = list(dict.fromkeys(attendees))
+    free_busy = await load_free_busy(user_ids, start, end, exclude_meeting_id)
+    conflicts = {}
+    for user_id in user_ids:
+        items = free_busy.conflicts(user_id, _epoch(start), _epoch(end))
+        if items:
+            conflicts[user_id] = items
+    return conflicts
+
+async def ensure_no_conflicts(attendees: list, start_time: str, end_time: str, exclude_meeting_id: Optional[str] = None):
+    conflicts = await find_conflicts(attendees, start_time, end_time, exclude_meeting_id)
+    if conflicts:
+        raise HTTPException(status_code=409, detail={"message": "Attendees are busy at that time", "conflicts": conflicts})
+
+@api_router.post("/availability/conflicts")
+async def check_conflicts(check: ConflictCheck):
+    conflicts = await find_conflicts(check.attendees, check.start_time, check.end_time, check.exclude_meeting_id)
+    return {"has_conflicts": bool(conflicts), "conflicts": conflicts}
+
+@api_router.get("/availability/busy")
+async def get_busy_blocks(user_ids: str, start: str = Query(..., alias="from"), end: str = Query(..., alias="to")):
+    window_start, window_end = _parse_window(start, end)
+    ids = _split_ids(user_ids)
+    free_busy = await load_free_busy(ids, window_start, window_end)
+    naive = window_start.tzinfo is None
+    lo, hi = _epoch(window_start), _epoch(window_end)
+    return {
+        user_id: [
+            {"start": _from_epoch(busy_start, naive), "end": _from_epoch(busy_end, naive)}
+            for busy_start, busy_end in free_busy.busy(user_id, lo, hi)
+        ]
+        for user_id in ids
+    }
+
+@api_router.get("/availability/free-slots")
+async def get_free_slots(
+    user_ids: str,
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    duration_minutes: int = Query(30, ge=5, le=24 * 60),
+    day_start: Optional[int] = Query(None, ge=0, le=23),
+    day_end: Optional[int] = Query(None, ge=1, le=24),
+    weekdays_only: bool = False,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Slots of at least duration_minutes when every user in user_ids is free.
+
+    day_start/day_end (hours, in the window's time zone) and weekdays_only
+    restrict slots to working time.
+    """
+    window_start, window_end = _parse_window(start, end)
+    ids = _split_ids(user_ids)
+    free_busy = await load_free_busy(ids, window_start, window_end)
+    naive = window_start.tzinfo is None
+    offset = 0 if naive else window_start.utcoffset().total_seconds()
+    slots = []
+    for lo, hi in _working_windows(_epoch(window_start), _epoch(window_end), offset, day_start, day_end, weekdays_only):
+        slots.extend(free_busy.free_slots(ids, lo, hi, duration_minutes * 60, limit - len(slots)))
+        if len(slots) >= limit:
+            break
+    return {"slots": [{"start": _from_epoch(slot_start, naive), "end": _from_epoch(slot_end, naive)} for slot_start, slot_end in slots]}
 
 # ========== SUBSCRIPTIONS ==========
 
 @api_router.get("/subscriptions", response_model=List[Subscription])
-async def get_subscriptions():
-    subscriptions = await db.subscriptions.find({}, {"_id": 0}).sort("platform", 1).to_list(1000)
-    return subscriptions
+async def get_subscriptions(page: PageParams = Depends()):
+    return await paginate(db.subscriptions, {}, [("platform", ASCENDING), ("id", ASCENDING)], page, Subscription)
 
 @api_router.post("/subscriptions", response_model=Subscription)
 async def create_subscription(subscription_data: SubscriptionCreate):
     subscription_obj = Subscription(**subscription_data.model_dump())
     doc = subscription_obj.model_dump()
     await db.subscriptions.insert_one(doc)
+    publish_change("subscriptions", "create", doc["id"], doc)
     return subscription_obj
 
 @api_router.put("/subscriptions/{subscription_id}")
@@ -1179,6 +4794,7 @@ async def update_subscription(subscription_id: str, update_data: dict):
     result = await db.subscriptions.update_one({"id": subscription_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Subscription not found")
+    publish_change("subscriptions", "update", subscription_id, update_data)
     return {"message": "Subscription updated successfully"}
 
 @api_router.delete("/subscriptions/{subscription_id}")
@@ -1186,34 +4802,12 @@ async def delete_subscription(subscription_id: str):
     result = await db.subscriptions.delete_one({"id": subscription_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subscription not found")
+    publish_change("subscriptions", "delete", subscription_id)
     return {"message": "Subscription deleted successfully"}
 
-async def sync_to_google_calendar(event_data: CalendarEventCreate):
-    """Sync event to Google Calendar"""
-    try:
-        # Get credentials from environment
-        google_email = os.environ.get('GOOGLE_CALENDAR_EMAIL')
-        google_app_password = os.environ.get('GOOGLE_CALENDAR_PASSWORD')
-        
-        if not google_email or not google_app_password:
-            logging.warning("Google Calendar credentials not configured")
-            return None
-        
-        # For now, we'll use a simplified approach
-        # In production, you'd use OAuth2 flow
-        # This is a placeholder for the actual Google Calendar API integration
-        
-        # Note: App passwords work with SMTP but Google Calendar API requires OAuth2
-        # You'll need to set up OAuth2 credentials for full integration
-        logging.info(f"Would sync event '{event_data.title}' to Google Calendar")
-        
-        return None
-    except Exception as e:
-        logging.error(f"Google Calendar sync error: {e}")
-        return None
-
-# Include router
-app.include_router(api_router)
+# Include routers
+app.include_router(public_router)
+app.include_router(api_router, dependencies=[Depends(authenticate)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -1221,7 +4815,9 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -1229,22 +4825,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    await ensure_slow_query_log()
+    await ensure_activity_log()
+    app.state.activity_log = asyncio.create_task(activity_log.run())
+    await dedupe_salary_records()
+    await ensure_indexes()
+    await session_revocations.refresh()
+    app.state.session_revocations = asyncio.create_task(session_revocations.run())
+    # Backfill materialized kudos balances on first boot after the ledger already has data
+    if await db.kudos_balances.estimated_document_count() == 0 and await db.kudos_transactions.estimated_document_count() > 0:
+        await reconcile_kudos_balances()
+    if await db.kudos_periods.estimated_document_count() == 0 and await db.kudos_transactions.estimated_document_count() > 0:
+        await reconcile_kudos_periods()
+    if await db.finance_rollups.estimated_document_count() == 0 and await db.finance_transactions.estimated_document_count() > 0:
+        await rebuild_finance_rollups()
+    if await db.availability.estimated_document_count() == 0 and await db.attendance.estimated_document_count() > 0:
+        await rebuild_availability()
+    if await db.research_tags.estimated_document_count() == 0 and await db.research_notes.estimated_document_count() > 0:
+        await rebuild_research_tags()
+    if EVENTS_CHANGE_STREAM:
+        app.state.change_watcher = asyncio.create_task(watch_changes())
+    if calendar_sync_worker is not None:
+        app.state.calendar_sync = asyncio.create_task(calendar_sync_worker.run())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.activity_log.cancel()
+    app.state.session_revocations.cancel()
+    await activity_log.flush()
+    if EVENTS_CHANGE_STREAM:
+        app.state.change_watcher.cancel()
+    if calendar_sync_worker is not None:
+        app.state.calendar_sync.cancel()
     client.close()
-from fastapi import FastAPI
-from starlette.middleware.cors import CORSMiddleware
-
-app = FastAPI()
-
-# Allow frontend to call backend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Replace * with your frontend URL if you want security
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    password_executor.shutdown(wait=False)
 
 @app.get("/")
 def home():
@@ -0,0 +1,28 @@
+"""Fail if any registered handler query shape would run as a collection scan.
+
+Usage (from the backend directory, with MONGO_URL/DB_NAME set as for the server):
+
+    python verify_indexes.py [--no-ensure]
+"""
+import asyncio
+import json
+import sys
+
+from server import client, ensure_indexes, verify_query_plans
+
+
+async def main(ensure: bool) -> int:
+    if ensure:
+        await ensure_indexes()
+    failures = await verify_query_plans()
+    for failure in failures:
+        print(f"COLLSCAN: {failure['handler']} on {failure['collection']} "
+              f"filter={json.dumps(failure['filter'])} sort={failure['sort']}")
+    if not failures:
+        print("All query shapes use an index")
+    client.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(ensure="--no-ensure" not in sys.argv[1:])))
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import "@/App.css";
 import { BrowserRouter, Routes, Route, Navigate } from "react-router-dom";
+import axios from "axios";
 import Login from "./pages/Login";
 import Dashboard from "./pages/Dashboard";
 import TeamManagement from "./pages/TeamManagement";
@@ -19,6 +20,14 @@ import Training from "./pages/Training";
 import Subscriptions from "./pages/Subscriptions";
 import { Toaster } from "sonner";
 
+const setAuthToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
+  } else {
+    delete axios.defaults.headers.common['Authorization'];
+  }
+};
+
 function App() {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -26,20 +35,38 @@ function App() {
   useEffect(() => {
     // Check if user is logged in
     const storedUser = localStorage.getItem('user');
-    if (storedUser) {
+    const storedToken = localStorage.getItem('token');
+    if (storedUser && storedToken) {
+      setAuthToken(storedToken);
       setUser(JSON.parse(storedUser));
     }
     setLoading(false);
+
+    // Expired or invalid session: send the user back to the login page
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && axios.defaults.headers.common['Authorization']) {
+          handleLogout();
+        }
+        return Promise.reject(error);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
   }, []);
 
-  const handleLogin = (userData) => {
+  const handleLogin = (userData, token) => {
+    setAuthToken(token);
     setUser(userData);
     localStorage.setItem('user', JSON.stringify(userData));
+    localStorage.setItem('token', token);
   };
 
   const handleLogout = () => {
+    setAuthToken(null);
     setUser(null);
     localStorage.removeItem('user');
+    localStorage.removeItem('token');
   };
 
   if (loading) {
@@ -0,0 +1,53 @@
+import { useEffect, useRef } from 'react';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// Subscribe to /api/events for the given collections. `onEvent` receives each
+// change ({ collection, op, id, fields }); `onResync` is called when events may
+// have been missed (the server fell behind or the connection dropped) and the
+// caller should refetch.
+const useLiveEvents = (topics, onEvent, onResync) => {
+  const handlers = useRef({ onEvent, onResync });
+  handlers.current = { onEvent, onResync };
+  const topicList = topics.join(',');
+
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    const params = new URLSearchParams({ topics: topicList, access_token: token });
+    const source = new EventSource(`${API}/events?${params}`);
+    let dropped = false;
+
+    source.addEventListener('change', (e) => handlers.current.onEvent(JSON.parse(e.data)));
+    source.addEventListener('resync', () => handlers.current.onResync && handlers.current.onResync());
+    source.onerror = () => {
+      dropped = true;
+    };
+    source.onopen = () => {
+      if (dropped) {
+        dropped = false;
+        if (handlers.current.onResync) handlers.current.onResync();
+      }
+    };
+    return () => source.close();
+  }, [topicList]);
+};
+
+// Apply a change event to a list of documents keyed by `id`
+const applyChange = (items, event) => {
+  if (event.op === 'delete') {
+    return items.filter((item) => item.id !== event.id);
+  }
+  const index = items.findIndex((item) => item.id === event.id);
+  if (index === -1) {
+    return event.op === 'create' ? [...items, event.fields] : items;
+  }
+  const next = [...items];
+  next[index] = { ...items[index], ...event.fields };
+  return next;
+};
+
+export { useLiveEvents, applyChange };
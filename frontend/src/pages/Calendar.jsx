@@ -15,6 +15,15 @@ import { Calendar as CalendarComponent } from '@/components/ui/calendar';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Wall-clock bounds of the month around `date`, in the same form as datetime-local inputs
+const monthWindow = (date) => {
+  const pad = (n) => String(n).padStart(2, '0');
+  const first = new Date(date.getFullYear(), date.getMonth(), 1);
+  const next = new Date(date.getFullYear(), date.getMonth() + 1, 1);
+  const format = (d) => `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}T00:00`;
+  return { from: format(first), to: format(next) };
+};
+
 const Calendar = ({ user, onLogout }) => {
   const [events, setEvents] = useState([]);
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -28,13 +37,16 @@ const Calendar = ({ user, onLogout }) => {
     attendees: [],
   });
 
+  const monthKey = `${selectedDate.getFullYear()}-${selectedDate.getMonth()}`;
+
   useEffect(() => {
     fetchEvents();
-  }, []);
+  }, [monthKey]);
 
   const fetchEvents = async () => {
     try {
-      const response = await axios.get(`${API}/calendar/events`);
+      // Only the visible month, with recurring events expanded by the server
+      const response = await axios.get(`${API}/calendar/events`, { params: monthWindow(selectedDate) });
       setEvents(response.data);
     } catch (error) {
       toast.error('Failed to fetch events');
@@ -45,7 +57,7 @@ const Calendar = ({ user, onLogout }) => {
     e.preventDefault();
     try {
       await axios.post(`${API}/calendar/events`, formData);
-      toast.success('Event created and synced to Google Calendar!');
+      toast.success('Event created successfully');
       setDialogOpen(false);
       setFormData({
         title: '',
@@ -207,7 +219,7 @@ const Calendar = ({ user, onLogout }) => {
                     const colors = getEventColor(event.event_type);
                     return (
                       <div
-                        key={event.id}
+                        key={`${event.id}-${event.recurrence_id || ''}`}
                         className="p-4 rounded-lg"
                         style={{
                           background: colors.bg,
@@ -23,7 +23,7 @@ const Login = ({ onLogin }) => {
         password,
       });
 
-      onLogin(response.data.user);
+      onLogin(response.data.user, response.data.token);
       toast.success('Login successful!');
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Login failed');
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import axios from 'axios';
 import Layout from '../components/Layout';
+import { useLiveEvents, applyChange } from '@/hooks/use-live-events';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -14,6 +15,12 @@ import { Plus, Edit2, Users as UsersIcon } from 'lucide-react';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const groupByStatus = (list) => ({
+  todo: list.filter((p) => p.status === 'todo'),
+  doing: list.filter((p) => p.status === 'doing'),
+  done: list.filter((p) => p.status === 'done'),
+});
+
 const Projects = ({ user, onLogout }) => {
   const [projects, setProjects] = useState({ todo: [], doing: [], done: [] });
   const [members, setMembers] = useState([]);
@@ -36,17 +43,20 @@ const Projects = ({ user, onLogout }) => {
   const fetchProjects = async () => {
     try {
       const response = await axios.get(`${API}/projects`);
-      const grouped = {
-        todo: response.data.filter((p) => p.status === 'todo'),
-        doing: response.data.filter((p) => p.status === 'doing'),
-        done: response.data.filter((p) => p.status === 'done'),
-      };
-      setProjects(grouped);
+      setProjects(groupByStatus(response.data));
     } catch (error) {
       toast.error('Failed to fetch projects');
     }
   };
 
+  const applyToBoard = (event) =>
+    setProjects((current) => groupByStatus(applyChange([...current.todo, ...current.doing, ...current.done], event)));
+
+  // Other people's changes arrive as change events instead of refetching the board. Our own
+  // are applied from the response as well, so they show up even while the stream is down;
+  // the matching event then merges into the same card.
+  useLiveEvents(['projects'], applyToBoard, fetchProjects);
+
   const fetchMembers = async () => {
     try {
       const response = await axios.get(`${API}/users`);
@@ -61,14 +71,15 @@ const Projects = ({ user, onLogout }) => {
     try {
       if (editMode) {
         await axios.put(`${API}/projects/${selectedProject.id}`, formData);
+        applyToBoard({ op: 'update', id: selectedProject.id, fields: formData });
         toast.success('Project updated successfully');
       } else {
-        await axios.post(`${API}/projects`, formData);
+        const response = await axios.post(`${API}/projects`, formData);
+        applyToBoard({ op: 'create', id: response.data.id, fields: response.data });
         toast.success('Project created successfully');
       }
       setDialogOpen(false);
       resetForm();
-      fetchProjects();
     } catch (error) {
       toast.error('Failed to save project');
     }
@@ -102,7 +113,7 @@ const Projects = ({ user, onLogout }) => {
   const moveProject = async (projectId, newStatus) => {
     try {
       await axios.put(`${API}/projects/${projectId}`, { status: newStatus });
-      fetchProjects();
+      applyToBoard({ op: 'update', id: projectId, fields: { status: newStatus } });
       toast.success('Project status updated');
     } catch (error) {
       toast.error('Failed to update project');
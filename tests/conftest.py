@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# The backend is a flat directory of modules rather than a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Importing server only creates a lazy Mongo client; nothing here connects
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "team_dashboard_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
@@ -0,0 +1,184 @@
+"""Small in-memory stand-ins for the Motor collections the handlers touch."""
+import copy
+from types import SimpleNamespace
+
+from pymongo.errors import OperationFailure
+
+
+_OPERATORS = {
+    "$in": lambda value, operand: value in operand,
+    "$ne": lambda value, operand: value != operand,
+    "$type": lambda value, operand: operand == "string" and isinstance(value, str),
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+def matches(doc, query):
+    """Evaluate the subset of the query language the handlers under test use"""
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if not all(_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    included = [field for field, keep in (projection or {}).items() if keep and field != "_id"]
+    return copy.deepcopy({field: doc[field] for field in included if field in doc} if included else doc)
+
+
+def _apply_update(doc, update, inserting=False):
+    for field, value in update.get("$set", {}).items():
+        doc[field] = copy.deepcopy(value)
+    for field, value in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + value
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+    if inserting:
+        for field, value in update.get("$setOnInsert", {}).items():
+            doc[field] = copy.deepcopy(value)
+
+
+class FakeCursor:
+    def __init__(self, docs, projection=None):
+        # Like the server, sort on the full documents and project on the way out
+        self.docs = docs
+        self.projection = projection
+
+    def sort(self, keys, direction=None):
+        if isinstance(keys, str):
+            keys = [(keys, direction)]
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda doc: doc.get(field), reverse=order == -1)
+        return self
+
+    def limit(self, count):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return [_project(doc, self.projection) for doc in (self.docs[:length] if length else self.docs)]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield _project(doc, self.projection)
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.indexes = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        self.failing_indexes = set()
+        # Pipelines aren't evaluated: aggregate() returns whatever a test primes here
+        self.aggregated = []
+        # bulk_write() only records its operations, for tests to compare with the expected ones
+        self.bulk_writes = []
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor([doc for doc in self.docs if matches(doc, query or {})], projection)
+
+    def aggregate(self, pipeline, **kwargs):
+        return FakeCursor(copy.deepcopy(self.aggregated))
+
+    async def bulk_write(self, operations, **kwargs):
+        self.bulk_writes.append(list(operations))
+        return SimpleNamespace(upserted_ids={})
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        for doc in self.docs:
+            if matches(doc, query or {}):
+                return _project(doc, projection)
+        return None
+
+    async def count_documents(self, query, **kwargs):
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    async def insert_one(self, doc, **kwargs):
+        self.docs.append(copy.deepcopy(doc))
+
+    async def insert_many(self, docs, **kwargs):
+        self.docs.extend(copy.deepcopy(docs))
+
+    async def update_one(self, query, update, upsert=False, **kwargs):
+        for doc in self.docs:
+            if matches(doc, query):
+                _apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, upserted_id=None)
+        if upsert:
+            doc = dict(query)
+            _apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+        return SimpleNamespace(matched_count=0, upserted_id=doc.get("_id") if upsert else None)
+
+    async def find_one_and_delete(self, query, projection=None, **kwargs):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                return _project(self.docs.pop(i), projection)
+        return None
+
+    async def find_one_and_update(self, query, update, projection=None, **kwargs):
+        for doc in self.docs:
+            if matches(doc, query):
+                previous = _project(doc, projection)
+                _apply_update(doc, update)
+                return previous
+        return None
+
+    async def update_many(self, query, update, **kwargs):
+        matched = [doc for doc in self.docs if matches(doc, query)]
+        for doc in matched:
+            _apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    async def delete_one(self, query, **kwargs):
+        await self.find_one_and_delete(query)
+
+    async def delete_many(self, query, **kwargs):
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+
+    async def index_information(self):
+        return copy.deepcopy(self.indexes)
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+    async def create_indexes(self, models, **kwargs):
+        for model in models:
+            document = dict(model.document)
+            name = document.pop("name")
+            if name in self.failing_indexes:
+                raise OperationFailure(f"cannot build {name}", code=11000)
+            document["key"] = list(document["key"].items())
+            self.indexes[name] = {"v": 2, **document}
+        return [model.document["name"] for model in models]
+
+
+class FakeDatabase:
+    def __init__(self, **collections):
+        self.collections = {name: FakeCollection(docs) for name, docs in collections.items()}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from pymongo.errors import PyMongoError
+
+import server
+from server import ActivityLog, _activity_entry, _activity_filter
+from tests.fakes import FakeDatabase
+
+
+@pytest.fixture
+def as_ann():
+    token = server.current_claims.set({"sub": "u-ann", "name": "Ann"})
+    yield
+    server.current_claims.reset(token)
+
+
+def test_entry_names_the_actor_and_what_changed(as_ann):
+    entry = _activity_entry("tasks", "update", "t1", {"status": "done", "password": "x"}, {"title": "Ship it", "project_id": "p1"})
+    assert (entry["actor"], entry["actor_name"], entry["type"]) == ("u-ann", "Ann", "tasks.complete")
+    assert (entry["title"], entry["project_id"]) == ("Ship it", "p1")
+    assert entry["fields"] == ["status"]
+    # A project is its own project; creates don't list fields
+    project = _activity_entry("projects", "create", "p2", {"name": "Launch", "description": "..."}, None)
+    assert (project["type"], project["title"], project["project_id"], project["fields"]) == ("projects.create", "Launch", "p2", [])
+
+
+def test_filter_hides_finance_from_everyone_else():
+    assert _activity_filter("u-ann", None, "tasks.complete", {"role": "Admin"}) == {"actor": "u-ann", "type": "tasks.complete"}
+    scoped, hidden = _activity_filter(None, "p1", "tasks", {"role": "Member"})["$and"]
+    assert scoped == {"project_id": "p1", "collection": "tasks"}
+    assert sorted(hidden["collection"]["$nin"]) == ["finance_transactions", "salary_records"]
+
+
+def test_entries_are_buffered_and_written_in_one_batch(monkeypatch, as_ann):
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    log = ActivityLog()
+    log.append("tasks", "create", "t1", {"title": "Ship it"})
+    log.append("personal_tasks", "create", "pt1", {"title": "Dentist"})
+    log.append("projects", "delete", "p1", previous={"name": "Launch"})
+    assert db.activity_log.docs == []
+    asyncio.run(log.flush())
+    assert [entry["type"] for entry in db.activity_log.docs] == ["tasks.create", "projects.delete"]
+    # An empty buffer writes nothing
+    asyncio.run(log.flush())
+    assert len(db.activity_log.docs) == 2
+
+
+def test_a_full_batch_wakes_the_writer(as_ann, monkeypatch):
+    monkeypatch.setattr(server, "ACTIVITY_BATCH_SIZE", 2)
+    log = ActivityLog()
+    log.append("tasks", "create", "t1")
+    assert not log._wakeup.is_set()
+    log.append("tasks", "create", "t2")
+    assert log._wakeup.is_set()
+
+
+def test_a_failed_write_drops_the_batch_instead_of_failing(monkeypatch):
+    db = FakeDatabase()
+
+    async def insert_many(docs, **kwargs):
+        raise PyMongoError("not primary")
+
+    db.activity_log.insert_many = insert_many
+    monkeypatch.setattr(server, "db", db)
+    log = ActivityLog()
+    log.append("tasks", "create", "t1")
+    asyncio.run(log.flush())
+    assert log._buffer == []
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import MAX_LEAVE_DAYS, _group_by_month, _leave_dates
+from tests.fakes import FakeDatabase
+
+
+def test_single_day_leave():
+    assert _leave_dates("2025-03-03", "2025-03-03") == ["2025-03-03"]
+
+
+def test_leave_across_a_month_and_leap_day():
+    assert _leave_dates("2024-02-28", "2024-03-01") == ["2024-02-28", "2024-02-29", "2024-03-01"]
+
+
+def test_datetime_bounds_use_their_date():
+    assert _leave_dates("2025-03-03T00:00:00+00:00", "2025-03-04T18:00") == ["2025-03-03", "2025-03-04"]
+
+
+def test_longest_allowed_leave():
+    first = date(2025, 1, 1)
+    last = first + timedelta(days=MAX_LEAVE_DAYS - 1)
+    assert len(_leave_dates(first.isoformat(), last.isoformat())) == MAX_LEAVE_DAYS
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2025-03-04", "2025-03-03"),  # ends before it starts
+    ("2025-01-01", (date(2025, 1, 1) + timedelta(days=MAX_LEAVE_DAYS)).isoformat()),  # one day too long
+    ("03/03/2025", "2025-03-04"),
+    ("2025-02-30", "2025-03-04"),
+])
+def test_invalid_leaves_are_rejected(start, end):
+    with pytest.raises(HTTPException) as error:
+        _leave_dates(start, end)
+    assert error.value.status_code == 400
+
+
+def test_group_by_month():
+    statuses = {day: "leave" for day in _leave_dates("2025-01-30", "2025-02-02")}
+    assert dict(_group_by_month(statuses)) == {
+        "2025-01": [("2025-01-30", "leave"), ("2025-01-31", "leave")],
+        "2025-02": [("2025-02-01", "leave"), ("2025-02-02", "leave")],
+    }
+
+
+def test_revoking_a_leave_removes_only_untouched_leave_days(monkeypatch):
+    db = FakeDatabase(attendance=[
+        {"id": "a1", "user_id": "u1", "date": "2025-03-03", "status": "leave", "check_in": None},
+        # Checked in after all, so the day is kept
+        {"id": "a2", "user_id": "u1", "date": "2025-03-04", "status": "present", "check_in": "09:00"},
+        {"id": "a3", "user_id": "u2", "date": "2025-03-03", "status": "leave", "check_in": None},
+        {"id": "a4", "user_id": "u1", "date": "2025-03-10", "status": "leave", "check_in": None},
+    ])
+    cleared = {}
+
+    async def set_availability(user_id, user_name, statuses):
+        cleared.update(statuses)
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "set_availability", set_availability)
+    leave = {"user_id": "u1", "user_name": "Ann", "start_date": "2025-03-03", "end_date": "2025-03-05"}
+    asyncio.run(server.revoke_leave(leave))
+    assert [record["id"] for record in db.attendance.docs] == ["a2", "a3", "a4"]
+    assert cleared == {"2025-03-03": None}
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import server
+from tests.fakes import FakeDatabase
+
+USER = {"id": "u1", "role": "Tech", "name": "Ann"}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase(users=[{**USER, "username": "ann", "is_active": True}])
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "session_revocations", server.SessionRevocations())
+    return db
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def issued_at(iat):
+    claims = {"sub": USER["id"], "role": USER["role"], "name": USER["name"], "iat": iat, "exp": iat + 3600}
+    return jwt.encode(claims, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+
+
+def test_authenticate_takes_the_header_only():
+    token = server.create_access_token(USER)
+    assert asyncio.run(server.authenticate(bearer(token)))["sub"] == "u1"
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.authenticate(None))
+    assert raised.value.status_code == 401
+    # Only the EventSource and calendar feed routes read the query string
+    assert asyncio.run(server.authenticate_query_token(None, token))["sub"] == "u1"
+
+
+def test_query_tokens_are_refused_outside_the_stream_routes():
+    token = server.create_access_token(USER)
+    http = TestClient(server.app)
+    assert http.get("/api/tasks", params={"access_token": token}).status_code == 401
+    assert http.get("/api/calendar/feed.ics").status_code == 401
+    assert http.get("/api/events", params={"access_token": "not-a-token"}).status_code == 401
+
+
+def test_bad_signatures_are_rejected():
+    forged = jwt.encode({"sub": "u1", "role": "Admin", "iat": 0, "exp": time.time() + 60}, "other-secret", algorithm="HS256")
+    with pytest.raises(HTTPException) as raised:
+        server.decode_access_token(forged)
+    assert raised.value.status_code == 401
+
+
+def test_revoking_rejects_tokens_issued_before_it(fake_db):
+    old_token = issued_at(int(time.time()) - 60)
+    assert server.decode_access_token(old_token)["sub"] == "u1"
+    asyncio.run(server.session_revocations.revoke("u1"))
+    with pytest.raises(HTTPException) as raised:
+        server.decode_access_token(old_token)
+    assert raised.value.detail == "Session revoked, please log in again"
+    # Logging in again issues a token the cutoff lets through
+    assert server.decode_access_token(server.create_access_token(USER))["sub"] == "u1"
+    # Other workers pick the cutoff up from the collection
+    other = server.SessionRevocations()
+    asyncio.run(other.refresh())
+    assert other.is_revoked(jwt.get_unverified_claims(old_token))
+
+
+def update(user_id, caller_role, **fields):
+    claims = {"sub": "someone", "role": caller_role}
+    return asyncio.run(server.update_user(user_id, server.UserUpdate(**fields), claims))
+
+
+def test_only_admins_change_roles(fake_db):
+    with pytest.raises(HTTPException) as raised:
+        update("u1", "Tech", role="Admin")
+    assert raised.value.status_code == 403
+    with pytest.raises(HTTPException):
+        update("u1", "Tech", is_active=False)
+    # Sending the unchanged role back with other edits is fine
+    update("u1", "Tech", role="Tech", name="Annie")
+    assert fake_db.users.docs[0]["name"] == "Annie"
+    assert fake_db.session_revocations.docs == []
+
+
+def test_a_role_change_revokes_the_users_sessions(fake_db):
+    update("u1", "Admin", role="Project Manager")
+    assert fake_db.users.docs[0]["role"] == "Project Manager"
+    assert [doc["user_id"] for doc in fake_db.session_revocations.docs] == ["u1"]
+
+
+def test_revocations_are_not_published_as_changes():
+    change = {"operationType": "update", "ns": {"coll": "session_revocations"}, "fullDocument": {"user_id": "u1"}}
+    assert server._event_from_change(change) is None
@@ -0,0 +1,137 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import FreeBusy, _merge_intervals, _working_windows
+from tests.fakes import FakeDatabase
+
+HOUR = 3600
+
+
+def brute_free_slots(intervals, user_ids, start, end, duration):
+    """Minute-resolution reference: free minutes grouped into runs"""
+    busy = set()
+    for user_id, busy_start, busy_end, _ in intervals:
+        if user_id in user_ids:
+            busy.update(range(int(busy_start) // 60, -(-int(busy_end) // 60)))
+    slots, run_start = [], None
+    for minute in range(start // 60, end // 60 + 1):
+        free = minute < end // 60 and minute not in busy
+        if free and run_start is None:
+            run_start = minute
+        elif not free and run_start is not None:
+            if (minute - run_start) * 60 >= duration:
+                slots.append((run_start * 60, minute * 60))
+            run_start = None
+    return slots
+
+
+@pytest.fixture
+def random_intervals():
+    rng = random.Random(3)
+    intervals = []
+    for i in range(400):
+        start = rng.randrange(0, 48 * 60) * 60
+        intervals.append((rng.choice("abcd"), start, start + rng.choice([15, 30, 60, 90, 240]) * 60, {"id": i}))
+    return intervals
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    assert _merge_intervals([(0, 10), (5, 20), (20, 25), (30, 40)]) == ([0, 30], [25, 40])
+
+
+def test_conflicts_match_brute_force(random_intervals):
+    free_busy = FreeBusy(random_intervals)
+    rng = random.Random(5)
+    for _ in range(300):
+        user_id = rng.choice("abcde")
+        start = rng.randrange(0, 48 * 60) * 60
+        end = start + rng.choice([15, 60, 180]) * 60
+        expected = [item for u, s, e, item in random_intervals if u == user_id and s < end and e > start]
+        assert sorted(item["id"] for item in free_busy.conflicts(user_id, start, end)) == sorted(item["id"] for item in expected)
+
+
+def test_long_interval_started_well_before_the_window_still_conflicts():
+    free_busy = FreeBusy([("a", 0, 10 * HOUR, "offsite"), ("a", 5 * HOUR, 5 * HOUR + 60, "call")])
+    assert free_busy.conflicts("a", 8 * HOUR, 9 * HOUR) == ["offsite"]
+    # Back-to-back is not a conflict
+    assert free_busy.conflicts("a", 10 * HOUR, 11 * HOUR) == []
+
+
+def test_busy_is_merged_and_clipped():
+    free_busy = FreeBusy([("a", 0, 2 * HOUR, 1), ("a", HOUR, 3 * HOUR, 2), ("a", 5 * HOUR, 6 * HOUR, 3)])
+    assert free_busy.busy("a", HOUR, 5.5 * HOUR) == [(HOUR, 3 * HOUR), (5 * HOUR, 5.5 * HOUR)]
+    assert free_busy.busy("nobody", 0, HOUR) == []
+
+
+@pytest.mark.parametrize("group", ["a", "ab", "abcd", "ae"])
+@pytest.mark.parametrize("duration", [15 * 60, HOUR])
+def test_free_slots_match_brute_force(random_intervals, group, duration):
+    free_busy = FreeBusy(random_intervals)
+    start, end = 6 * HOUR, 30 * HOUR
+    assert free_busy.free_slots(list(group), start, end, duration) == brute_free_slots(random_intervals, set(group), start, end, duration)
+
+
+def test_free_slots_limit():
+    free_busy = FreeBusy([("a", HOUR, 2 * HOUR, 1), ("a", 3 * HOUR, 4 * HOUR, 2)])
+    assert free_busy.free_slots(["a"], 0, 6 * HOUR, 30 * 60, limit=2) == [(0, HOUR), (2 * HOUR, 3 * HOUR)]
+
+
+def test_working_windows_skip_weekends_in_the_callers_zone():
+    # Friday 2025-03-07 00:00 UTC to Tuesday 00:00 UTC, working hours 9-17 at UTC+2
+    start = datetime(2025, 3, 7, tzinfo=timezone.utc).timestamp()
+    end = datetime(2025, 3, 11, tzinfo=timezone.utc).timestamp()
+    windows = _working_windows(start, end, 2 * HOUR, 9, 17, True)
+    as_utc = [(datetime.fromtimestamp(s, timezone.utc).isoformat(), datetime.fromtimestamp(e, timezone.utc).isoformat()) for s, e in windows]
+    assert as_utc == [
+        ("2025-03-07T07:00:00+00:00", "2025-03-07T15:00:00+00:00"),
+        ("2025-03-10T07:00:00+00:00", "2025-03-10T15:00:00+00:00"),
+    ]
+
+
+MEETING = {"title": "Review", "agenda": "", "start_time": "2025-03-03T10:00", "end_time": "2025-03-03T11:00", "organizer": "u1", "attendees": ["u2"]}
+
+
+@pytest.fixture
+def busy_u3(monkeypatch):
+    """u3 is busy 10:00-12:00 on 2025-03-03; records every conflict check"""
+    checks = []
+
+    async def find_conflicts(attendees, start_time, end_time, exclude_meeting_id=None):
+        checks.append((attendees, start_time, end_time, exclude_meeting_id))
+        overlaps = start_time < "2025-03-03T12:00" and end_time > "2025-03-03T10:00"
+        return {"u3": [{"id": "other"}]} if "u3" in attendees and overlaps else {}
+
+    db = FakeDatabase(meetings=[{"id": "m1", **MEETING}])
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "find_conflicts", find_conflicts)
+    db.checks = checks
+    return db
+
+
+def test_create_meeting_refuses_busy_attendees_by_default(busy_u3):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.create_meeting(server.MeetingCreate(**{**MEETING, "attendees": ["u2", "u3"]})))
+    assert raised.value.status_code == 409
+    assert len(busy_u3.meetings.docs) == 1
+    # The organizer can still book it on purpose
+    asyncio.run(server.create_meeting(server.MeetingCreate(**{**MEETING, "attendees": ["u2", "u3"]}), allow_conflicts=True))
+    assert len(busy_u3.meetings.docs) == 2
+
+
+def test_moving_a_meeting_or_adding_attendees_is_checked(busy_u3):
+    with pytest.raises(HTTPException):
+        asyncio.run(server.update_meeting("m1", {"attendees": ["u2", "u3"]}))
+    # The meeting's own slot is excluded, and unchanged fields come from the stored meeting
+    assert busy_u3.checks[-1] == (["u1", "u2", "u3"], "2025-03-03T10:00", "2025-03-03T11:00", "m1")
+    asyncio.run(server.update_meeting("m1", {"attendees": ["u2", "u3"], "start_time": "2025-03-03T12:00", "end_time": "2025-03-03T13:00"}))
+    assert busy_u3.meetings.docs[0]["attendees"] == ["u2", "u3"]
+
+
+def test_edits_that_keep_the_schedule_are_not_checked(busy_u3):
+    asyncio.run(server.update_meeting("m1", {"agenda": "Q2 numbers"}))
+    assert busy_u3.checks == []
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+
+import server
+from server import BulkUpdateItem, Task, TaskCreate
+from tests.fakes import FakeDatabase
+
+
+def task(title, **fields):
+    return {"project_id": "p1", "title": title, "assigned_to": "u1", **fields}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase(tasks=[
+        {"id": "t1", "title": "One", "assigned_to": "u1", "project_id": "p1"},
+        {"id": "t2", "title": "Two", "assigned_to": "u2", "project_id": "p1"},
+    ])
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def create(items):
+    return asyncio.run(server.bulk_create("tasks", Task, TaskCreate, items))
+
+
+def update(items):
+    return asyncio.run(server.bulk_update("tasks", [BulkUpdateItem(**item) for item in items], ("assigned_to", "project_id", "title")))
+
+
+def test_invalid_items_are_reported_by_position_and_the_rest_inserted(fake_db):
+    result = create([task("A"), {"title": "no project"}, task("C")])
+    assert result["inserted"] == 2
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert [doc["title"] for doc in fake_db.tasks.docs[2:]] == ["A", "C"]
+    assert result["ids"] == [doc["id"] for doc in fake_db.tasks.docs[2:]]
+
+
+def test_rejected_writes_map_back_to_request_positions(fake_db):
+    async def insert_many(docs, ordered=True):
+        assert not ordered
+        # The second valid document (request position 2) hits a unique index
+        fake_db.tasks.docs.extend(doc for i, doc in enumerate(docs) if i != 1)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]})
+
+    fake_db.tasks.insert_many = insert_many
+    result = create([task("A"), {}, task("C"), task("D")])
+    assert result["inserted"] == 2
+    assert [(error["index"], error["error"]) for error in result["errors"][1:]] == [(2, "duplicate key")]
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+
+
+@pytest.mark.parametrize("count, status", [(0, 400), (server.BULK_MAX_ITEMS + 1, 413)])
+def test_batch_size_is_bounded(fake_db, count, status):
+    with pytest.raises(HTTPException) as raised:
+        create([task(str(i)) for i in range(count)])
+    assert raised.value.status_code == status
+
+
+def test_update_reports_bad_items_and_writes_the_rest_once(fake_db):
+    batches = []
+
+    async def bulk_write(operations, ordered=True):
+        batches.append(len(operations))
+
+    fake_db.tasks.bulk_write = bulk_write
+    result = update([
+        {"id": "t1", "fields": {"title": "Uno"}},
+        {"id": "t1", "fields": {"title": "Again"}},
+        {"id": "missing", "fields": {"title": "x"}},
+        {"id": "t2", "fields": {"id": "t9"}},
+        {"id": "t2", "fields": {"assigned_to": "u3"}},
+    ])
+    assert batches == [2]
+    assert result["updated"] == 2
+    assert [(error["index"], error["error"]) for error in result["errors"]] == [
+        (1, "Duplicate id in batch"), (2, "Not found"), (3, "No updatable fields"),
+    ]
+
+
+def test_update_maps_write_errors_to_items(fake_db):
+    async def bulk_write(operations, ordered=True):
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation failed"}]})
+
+    fake_db.tasks.bulk_write = bulk_write
+    result = update([{"id": "t1", "fields": {"title": "Uno"}}, {"id": "t2", "fields": {"title": "Dos"}}])
+    assert result["updated"] == 1
+    assert result["errors"] == [{"index": 1, "id": "t2", "error": "validation failed"}]
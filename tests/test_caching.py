@@ -0,0 +1,65 @@
+import asyncio
+
+import server
+from server import TTLCache
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("k", 1)
+    now[0] += 9.9
+    assert cache.get("k") == 1
+    now[0] += 0.1
+    assert cache.get("k", "gone") == "gone"
+
+
+def test_a_full_cache_drops_its_oldest_entry():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)
+    cache.set("c", 4)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (None, 2, 4)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+        return results, await cache.get_or_load("k", loader)
+
+    results, again = asyncio.run(main())
+    assert len(loads) == 1
+    assert [value for value, _ in results] == ["value"] * 5
+    assert [hit for _, hit in results].count(False) == 1
+    assert again == ("value", True)
+
+
+def test_invalidating_during_a_load_keeps_its_result_out_of_the_cache():
+    cache = TTLCache(ttl=60)
+
+    async def main():
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def loader():
+            started.set()
+            await finish.wait()
+            return "stale"
+
+        load = asyncio.create_task(cache.get_or_load("k", loader))
+        await started.wait()
+        cache.invalidate("k")
+        finish.set()
+        return await load
+
+    assert asyncio.run(main()) == ("stale", False)
+    assert cache.get("k") is None
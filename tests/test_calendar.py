@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from server import _ics_line, _parse_window, _recurrence_end, expand_occurrences
+
+
+def event(**fields):
+    return {"id": "evt", "title": "Standup", "start_time": "2025-03-03T09:00", "end_time": "2025-03-03T09:30", **fields}
+
+
+def window(start, end):
+    return datetime.fromisoformat(start), datetime.fromisoformat(end)
+
+
+def test_single_event_is_its_own_occurrence():
+    single = event()
+    assert expand_occurrences(single, *window("2025-03-01T00:00", "2025-04-01T00:00")) == [single]
+
+
+def test_weekly_series_expands_only_within_the_month():
+    weekly = event(recurrence="FREQ=WEEKLY;BYDAY=MO")
+    occurrences = expand_occurrences(weekly, *window("2025-04-01T00:00", "2025-05-01T00:00"))
+    assert [o["start_time"] for o in occurrences] == ["2025-04-07T09:00", "2025-04-14T09:00", "2025-04-21T09:00", "2025-04-28T09:00"]
+    assert all(o["id"] == "evt" and o["recurrence_id"] == o["start_time"] for o in occurrences)
+    # datetime-local precision and the duration are kept
+    assert occurrences[0]["end_time"] == "2025-04-07T09:30"
+
+
+def test_occurrence_running_across_the_window_start_is_included():
+    weekly = event(recurrence="FREQ=WEEKLY;BYDAY=MO")
+    occurrences = expand_occurrences(weekly, *window("2025-03-10T09:15", "2025-03-10T12:00"))
+    assert [o["start_time"] for o in occurrences] == ["2025-03-10T09:00"]
+    # One ending exactly at the window start doesn't overlap it
+    assert expand_occurrences(weekly, *window("2025-03-10T09:30", "2025-03-10T12:00")) == []
+
+
+def test_aware_window_against_floating_event_times():
+    daily = event(recurrence="FREQ=DAILY")
+    start = datetime(2025, 3, 5, tzinfo=timezone.utc)
+    end = datetime(2025, 3, 7, tzinfo=timezone.utc)
+    assert [o["start_time"] for o in expand_occurrences(daily, start, end)] == ["2025-03-05T09:00", "2025-03-06T09:00"]
+
+
+def test_window_with_one_offset_reads_the_other_bound_as_utc():
+    assert _parse_window("2025-03-01T00:00", "2025-04-01T00:00Z") == (
+        datetime(2025, 3, 1, tzinfo=timezone.utc), datetime(2025, 4, 1, tzinfo=timezone.utc)
+    )
+    with pytest.raises(HTTPException):
+        _parse_window("2025-04-01T00:00+02:00", "2025-03-01T00:00")
+
+
+def test_bounded_series_stops_at_its_end():
+    bounded = event(recurrence="FREQ=WEEKLY;BYDAY=MO;COUNT=3")
+    assert _recurrence_end(bounded) == "2025-03-17T09:30"
+    assert [o["start_time"] for o in expand_occurrences(bounded, *window("2025-03-01T00:00", "2025-05-01T00:00"))] == [
+        "2025-03-03T09:00", "2025-03-10T09:00", "2025-03-17T09:00",
+    ]
+    assert expand_occurrences(bounded, *window("2025-03-18T00:00", "2025-04-01T00:00")) == []
+
+
+def test_recurrence_end_of_until_rule_keeps_offsets():
+    aware = event(start_time="2025-03-03T09:00:00+00:00", end_time="2025-03-03T10:00:00+00:00",
+                  recurrence="FREQ=DAILY;UNTIL=20250305T090000Z")
+    assert _recurrence_end(aware) == "2025-03-05T10:00:00+00:00"
+
+
+def test_open_ended_series_has_no_recurrence_end():
+    assert _recurrence_end(event(recurrence="FREQ=MONTHLY")) is None
+
+
+@pytest.mark.parametrize("rule", ["FREQ=SOMETIMES", "FREQ=DAILY;COUNT=20000"])
+def test_invalid_or_oversized_series_are_rejected(rule):
+    with pytest.raises(HTTPException) as error:
+        _recurrence_end(event(recurrence=rule))
+    assert error.value.status_code == 400
+
+
+def test_ics_lines_fold_without_splitting_characters():
+    folded = _ics_line("DESCRIPTION:" + "é" * 80)
+    lines = folded.split("\r\n")[:-1]
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert "".join(line[1:] if i else line for i, line in enumerate(lines)) == "DESCRIPTION:" + "é" * 80
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from server import CalendarSyncError, CalendarSyncWorker, LocalCalendarClient
+from tests.fakes import FakeDatabase
+
+EVENT = {"id": "e1", "title": "Offsite", "start_time": "2026-10-20T09:00:00+00:00", "end_time": "2026-10-20T17:00:00+00:00"}
+
+
+def at(seconds):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+def job(job_id, event_id="e1", op="upsert", **fields):
+    return {"id": job_id, "event_id": event_id, "op": op, "status": "pending", "attempts": 0, "next_attempt_at": at(-60), **fields}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase(calendar_events=[EVENT])
+    db.published = []
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "publish_change", lambda *args, **kwargs: db.published.append(args))
+    return db
+
+
+def worker(client=None, max_attempts=3):
+    return CalendarSyncWorker(client or LocalCalendarClient(), batch_size=10, rate=1000, max_attempts=max_attempts)
+
+
+def test_claims_only_due_jobs_and_expired_leases(fake_db):
+    fake_db.calendar_sync_jobs.docs[:] = [
+        job("due"),
+        job("later", next_attempt_at=at(60)),
+        job("held", status="running", locked_until=at(60)),
+        job("abandoned", status="running", locked_until=at(-60)),
+        job("failed", status="failed"),
+    ]
+    claimed = asyncio.run(worker()._claim())
+    assert sorted(j["id"] for j in claimed) == ["abandoned", "due"]
+    assert all(j["status"] == "running" and j["attempts"] == 1 for j in claimed)
+    assert len({j["claim"] for j in claimed}) == 1
+
+
+def test_upsert_creates_the_remote_event_and_records_its_id(fake_db):
+    client = LocalCalendarClient()
+    fake_db.calendar_sync_jobs.docs[:] = [job("j1")]
+    assert asyncio.run(worker(client).run_once()) == 1
+    google_event_id = fake_db.calendar_events.docs[0]["google_event_id"]
+    assert client.events[google_event_id]["summary"] == "Offsite"
+    assert fake_db.calendar_sync_jobs.docs == []
+    assert fake_db.published == [("calendar_events", "update", "e1", {"google_event_id": google_event_id})]
+
+
+class FailingClient(LocalCalendarClient):
+    def __init__(self, retryable):
+        super().__init__()
+        self.retryable = retryable
+
+    async def create_event(self, event):
+        raise CalendarSyncError("quota exceeded", retryable=self.retryable)
+
+
+def test_failures_back_off_until_attempts_run_out(fake_db):
+    sync = worker(FailingClient(retryable=True), max_attempts=2)
+    fake_db.calendar_sync_jobs.docs[:] = [job("j1")]
+    asyncio.run(sync.run_once())
+    (pending,) = fake_db.calendar_sync_jobs.docs
+    assert (pending["status"], pending["attempts"], pending["last_error"]) == ("pending", 1, "quota exceeded")
+    assert pending["next_attempt_at"] > at(0) and "claim" not in pending
+    pending["next_attempt_at"] = at(-1)
+    asyncio.run(sync.run_once())
+    assert fake_db.calendar_sync_jobs.docs[0]["status"] == "failed"
+
+
+def test_permanent_errors_are_not_retried(fake_db):
+    fake_db.calendar_sync_jobs.docs[:] = [job("j1")]
+    asyncio.run(worker(FailingClient(retryable=False)).run_once())
+    assert fake_db.calendar_sync_jobs.docs[0]["status"] == "failed"
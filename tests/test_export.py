@@ -0,0 +1,83 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+import server
+from server import FinanceTransaction, _export_query, cash_flow_analytics
+from tests.fakes import FakeCursor
+
+COLUMNS = list(FinanceTransaction.model_fields)
+
+
+def transaction(n):
+    return {"id": f"t{n}", "type": "expense", "category": "software", "amount": n * 1.5, "description": f"Item, {n}",
+            "date": f"2025-03-{n:02d}", "created_by": "u1", "created_at": "2025-03-01T00:00:00+00:00"}
+
+
+def collect(stream):
+    async def drain():
+        return [chunk async for chunk in stream]
+    return asyncio.run(drain())
+
+
+def test_salary_exports_widen_day_bounds_to_months():
+    assert _export_query("date", "2025-03-05", "2025-03-31") == {"date": {"$gte": "2025-03-05", "$lt": "2025-04-01"}}
+    assert _export_query("month", "2025-03-05", "2025-04-30") == {"month": {"$gte": "2025-03", "$lt": "2025-05"}}
+    assert _export_query("date", None, None) == {}
+
+
+def test_csv_is_streamed_in_chunks_and_round_trips(monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_CHUNK_SIZE", 2)
+    docs = [transaction(n) for n in range(1, 6)]
+    chunks = collect(server._csv_stream(FakeCursor(docs), COLUMNS))
+    # The header and two rows, then two rows, then the last row
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["description"] for row in rows] == [doc["description"] for doc in docs]
+    assert rows[0]["paid_to"] == "" and rows[4]["amount"] == "7.5"
+
+
+def test_parquet_row_groups_follow_the_cursor(monkeypatch):
+    # pyarrow is an optional dependency
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(server, "PARQUET_ROW_GROUP_SIZE", 2)
+    docs = [transaction(n) for n in range(1, 6)]
+    chunks = collect(server._parquet_stream(FakeCursor(docs), FinanceTransaction, COLUMNS))
+    assert len(chunks) == 3
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.schema.field("amount").type == "double"
+    assert table.column("id").to_pylist() == [doc["id"] for doc in docs]
+    assert table.column("paid_to").to_pylist() == [None] * 5
+
+
+def test_cash_flow_with_a_growing_balance_has_no_runway():
+    rollups = [
+        {"month": "2025-01", "type": "income", "total": 1000.0},
+        {"month": "2025-01", "type": "expense", "total": 200.0},
+        {"month": "2025-01", "type": "salary", "total": 300.0},
+        {"month": "2025-02", "type": "expense", "total": 100.0},
+        {"month": "2025-02", "type": "salary", "total": 300.0},
+        {"month": "2025-03", "type": "income", "total": 500.0},
+    ]
+    result = cash_flow_analytics(rollups, {"income": 2000.0, "expense": 500.0}, "2025-01", "2025-03", 2, 0)
+    assert result["opening_balance"] == 1500.0
+    assert [month["balance"] for month in result["months"]] == [2000.0, 1600.0, 2100.0]
+    assert [month["net_burn"] for month in result["months"]] == [-500.0, -50.0, -50.0]
+    assert (result["gross_burn"], result["runway_months"], result["forecast"]) == (200.0, None, [])
+
+
+def test_cash_flow_runway_and_forecast_while_burning():
+    rollups = [{"month": "2025-01", "type": "expense", "total": 300.0}, {"month": "2025-02", "type": "salary", "total": 300.0}]
+    result = cash_flow_analytics(rollups, {"income": 1000.0}, "2025-01", "2025-02", 2, 2)
+    assert (result["current_balance"], result["net_burn"], result["runway_months"]) == (400.0, 300.0, 1.3)
+    assert result["forecast"] == [{"month": "2025-03", "balance": 100.0}, {"month": "2025-04", "balance": -200.0}]
+
+
+@pytest.mark.parametrize("rollups", [[], [{"month": "2024-12", "type": "income", "total": 5.0}]])
+def test_months_without_rollups_are_zero(rollups):
+    result = cash_flow_analytics(rollups, {}, "2025-01", "2025-02", 3, 0)
+    assert [(m["month"], m["income"], m["net"]) for m in result["months"]] == [("2025-01", 0.0, 0.0), ("2025-02", 0.0, 0.0)]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+import server
+from server import _date_range_filter, _next_period, _parse_period
+from tests.fakes import FakeDatabase
+
+FACET = {
+    "totals": [{"_id": "income", "total": 900.0}, {"_id": "expense", "total": 250.0}, {"_id": "salary", "total": 400.0}],
+    "expense_by_category": [{"_id": "software", "total": 250.0}, {"_id": "marketing", "total": 0.0}],
+}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase(
+        finance_transactions=[{"id": f"t{n}", "date": f"2025-0{n}-15", "created_at": f"2025-0{n}-15T00:00"} for n in (1, 2, 3)],
+        salary_records=[{"id": "s1", "status": "pending"}, {"id": "s2", "status": "paid"}],
+    )
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def summary(start_date=None, end_date=None):
+    return asyncio.run(server.get_finance_summary(start_date, end_date))
+
+
+def test_period_bounds():
+    assert [_next_period(value) for value in ("2025-01", "2025-12", "2024-02-28", "2025-12-31")] == [
+        "2025-02", "2026-01", "2024-02-29", "2026-01-01",
+    ]
+    assert _date_range_filter("2025-01", "2025-03") == {"$gte": "2025-01", "$lt": "2025-04"}
+    with pytest.raises(HTTPException) as raised:
+        _parse_period("2025-13")
+    assert raised.value.status_code == 400
+
+
+def test_whole_months_are_answered_from_the_rollups(fake_db):
+    fake_db.finance_rollups.aggregated = [FACET]
+    result = summary("2025-02", "2025-03")
+    assert (result["total_income"], result["net_balance"], result["pending_salary_payments"]) == (900.0, 250.0, 1)
+    # Empty categories are left out
+    assert result["expense_by_category"] == {"software": 250.0}
+    assert [doc["id"] for doc in result["recent_transactions"]] == ["t3", "t2"]
+
+
+def test_day_ranges_aggregate_the_ledger(fake_db):
+    fake_db.finance_transactions.aggregated = [{**FACET, "recent_transactions": [{"id": "t2"}]}]
+    result = summary("2025-02-01", "2025-02-20")
+    assert result["total_salary"] == 400.0
+    assert result["recent_transactions"] == [{"id": "t2"}]
+
+
+def test_rollups_follow_transactions_in_both_directions(fake_db):
+    transactions = [{"date": "2025-03-04", "type": "expense", "category": "software", "amount": 20.0}]
+    asyncio.run(server.apply_finance_rollups(transactions, sign=-1))
+    assert fake_db.finance_rollups.bulk_writes == [[UpdateOne(
+        {"month": "2025-03", "type": "expense", "category": "software"}, {"$inc": {"total": -20.0, "count": -1}}, upsert=True
+    )]]
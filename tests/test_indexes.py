@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from pymongo import ASCENDING, IndexModel
+
+import server
+from tests.fakes import FakeDatabase
+
+DECLARED = {"things": [
+    IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    IndexModel([("owner", ASCENDING)], name="owner"),
+]}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "COLLECTION_INDEXES", DECLARED)
+    return db
+
+
+def test_builds_declared_indexes_and_registers_them(fake_db):
+    asyncio.run(server.ensure_indexes())
+    assert set(fake_db.things.indexes) == {"_id_", "id_unique", "owner"}
+    assert fake_db.index_registry.docs == [{"_id": "things", "names": ["id_unique", "owner"]}]
+
+
+def test_leaves_unknown_indexes_alone_but_drops_retired_ones(fake_db):
+    fake_db.things.indexes["by_hand"] = {"key": [("x", 1)], "v": 2}
+    fake_db.things.indexes["old_owner"] = {"key": [("owner", -1)], "v": 2}
+    fake_db.index_registry.docs.append({"_id": "things", "names": ["id_unique", "old_owner"]})
+    asyncio.run(server.ensure_indexes())
+    assert set(fake_db.things.indexes) == {"_id_", "id_unique", "owner", "by_hand"}
+
+
+def test_rebuilds_a_declared_index_whose_spec_changed(fake_db):
+    fake_db.things.indexes["id_unique"] = {"key": [("id", 1)], "v": 2}
+    asyncio.run(server.ensure_indexes())
+    assert fake_db.things.indexes["id_unique"]["unique"] is True
+
+
+def test_a_failed_index_fails_startup_after_building_the_rest(fake_db):
+    fake_db.things.failing_indexes.add("id_unique")
+    with pytest.raises(RuntimeError, match="things.id_unique"):
+        asyncio.run(server.ensure_indexes())
+    assert "owner" in fake_db.things.indexes
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from pymongo import DeleteOne, UpdateOne
+
+import server
+from server import KudosTransaction, _kudos_periods
+from tests.fakes import FakeDatabase
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def kudos(user_id, amount, created_at="2025-03-05T10:00:00+00:00", **fields):
+    return KudosTransaction(user_id=user_id, user_name=user_id.title(), amount=amount, reason="r", category="manual",
+                            given_by="u-org", created_at=created_at, **fields)
+
+
+def balance(user_id, amount, count, updated_at="2025-03-05T10:00:00+00:00"):
+    return UpdateOne(
+        {"user_id": user_id},
+        {"$inc": {"total_kudos": amount, "transactions_count": count}, "$set": {"user_name": user_id.title(), "updated_at": updated_at}},
+        upsert=True
+    )
+
+
+def test_totals_are_folded_per_user_before_writing(fake_db):
+    docs = [kudos("ann", 10).model_dump(), kudos("ann", -5).model_dump(), kudos("bo", 3).model_dump()]
+    asyncio.run(server.apply_kudos_totals(docs))
+    assert fake_db.kudos_balances.bulk_writes == [[balance("ann", 5, 2), balance("bo", 3, 1)]]
+
+
+def test_only_newly_written_sourced_kudos_are_counted(fake_db):
+    async def bulk_write(operations, ordered=True, session=None):
+        # The second transaction's source was already recorded
+        return SimpleNamespace(upserted_ids={0: "x"})
+
+    fake_db.kudos_transactions.bulk_write = bulk_write
+    applied = asyncio.run(server.record_kudos_many([
+        kudos("ann", -5, source="meeting_absence:m1:ann"),
+        kudos("bo", -5, source="meeting_absence:m1:bo"),
+        kudos("bo", 2),
+    ]))
+    assert [(doc["user_id"], doc["amount"]) for doc in applied] == [("ann", -5), ("bo", 2)]
+    assert fake_db.kudos_balances.bulk_writes == [[balance("ann", -5, 1), balance("bo", 2, 1)]]
+
+
+def test_reconcile_reports_and_fixes_drift(fake_db):
+    fake_db.kudos_transactions.aggregated = [
+        {"_id": "ann", "user_name": "Ann", "total_kudos": 10, "transactions_count": 2},
+        {"_id": "bo", "user_name": "Bo", "total_kudos": 4, "transactions_count": 1},
+    ]
+    fake_db.kudos_balances.docs[:] = [
+        {"user_id": "ann", "total_kudos": 10, "transactions_count": 2},
+        {"user_id": "cy", "total_kudos": 7, "transactions_count": 1},
+    ]
+    report = asyncio.run(server.reconcile_kudos_balances(fix=False))
+    assert report["drift"] == [
+        {"user_id": "cy", "balance": 7, "ledger": 0},
+        {"user_id": "bo", "balance": None, "ledger": 4},
+    ]
+    assert not report["fixed"] and fake_db.kudos_balances.bulk_writes == []
+    asyncio.run(server.reconcile_kudos_balances())
+    [operations] = fake_db.kudos_balances.bulk_writes
+    assert operations[0] == DeleteOne({"user_id": "cy"})
+    assert len(operations) == 2
+
+
+def leaderboard(window, caller, limit=3):
+    return asyncio.run(server.get_kudos_leaderboard(window=window, limit=limit, claims={"sub": caller}))
+
+
+def test_iso_weeks_can_belong_to_the_next_year():
+    assert _kudos_periods("2025-12-29T09:00:00+00:00") == ("2026-W01", "2025-12")
+    assert _kudos_periods("2025-02-14") == ("2025-W07", "2025-02")
+
+
+def test_ties_share_a_rank_and_callers_off_the_board_are_counted(fake_db):
+    fake_db.kudos_balances.docs[:] = [
+        {"user_id": user_id, "user_name": user_id.title(), "total_kudos": total}
+        for user_id, total in (("cy", 7), ("bo", 10), ("ann", 10), ("dee", 3), ("eve", 3))
+    ]
+    board = leaderboard("all", "eve")
+    assert [(entry["rank"], entry["user_id"]) for entry in board["entries"]] == [(1, "ann"), (1, "bo"), (3, "cy")]
+    assert board["me"] == {"user_id": "eve", "rank": 4, "total_kudos": 3}
+
+
+def test_windows_read_the_current_period_only(fake_db):
+    week, month = _kudos_periods(datetime.now(timezone.utc).isoformat())
+    fake_db.kudos_periods.docs[:] = [
+        {"period": week, "user_id": "ann", "user_name": "Ann", "total_kudos": 5},
+        {"period": month, "user_id": "bo", "user_name": "Bo", "total_kudos": 8},
+        {"period": "2020-W01", "user_id": "cy", "user_name": "Cy", "total_kudos": 50},
+    ]
+    board = leaderboard("week", "dee")
+    assert (board["period"], [entry["user_id"] for entry in board["entries"]]) == (week, ["ann"])
+    # No bucket means no kudos this week, ranked after everyone who has some
+    assert board["me"] == {"user_id": "dee", "rank": 2, "total_kudos": 0}
+    assert [entry["user_id"] for entry in leaderboard("month", "dee")["entries"]] == ["bo"]
+
+
+def test_period_reconcile_folds_days_into_weeks_and_months(fake_db):
+    fake_db.kudos_transactions.aggregated = [
+        {"_id": {"user_id": "ann", "day": "2025-03-03"}, "user_name": "Ann", "total_kudos": 4, "transactions_count": 2},
+        {"_id": {"user_id": "ann", "day": "2025-03-09"}, "user_name": "Ann", "total_kudos": 1, "transactions_count": 1},
+        {"_id": {"user_id": "ann", "day": "2025-03-10"}, "user_name": "Ann", "total_kudos": 2, "transactions_count": 1},
+    ]
+    fake_db.kudos_periods.docs[:] = [{"period": "2025-03", "user_id": "ann", "total_kudos": 7, "transactions_count": 4}]
+    report = asyncio.run(server.reconcile_kudos_periods(fix=False))
+    assert report["periods_checked"] == 3
+    assert [(entry["period"], entry["ledger"]) for entry in report["drift"]] == [("2025-W10", 5), ("2025-W11", 2)]
@@ -0,0 +1,61 @@
+import asyncio
+
+import server
+from server import _attendance_writes
+from tests.fakes import FakeDatabase
+
+MEETING = {"title": "Planning", "organizer": "u-org", "attendees": ["u1", "u2", "u1", "u-gone", "u3"]}
+NAMES = {"u1": "Ann", "u2": "Bo", "u3": "Cy"}
+
+
+def test_one_row_per_known_attendee():
+    records, _, _ = _attendance_writes("m1", MEETING, NAMES, {"u1"})
+    # The duplicate u1 is written once and the deleted user is skipped
+    assert [(r["meeting_id"], r["user_id"], r["user_name"], r["status"]) for r in records] == [
+        ("m1", "u1", "Ann", "present"),
+        ("m1", "u2", "Bo", "absent"),
+        ("m1", "u3", "Cy", "absent"),
+    ]
+
+
+def test_absentees_get_idempotent_penalties():
+    _, penalties, _ = _attendance_writes("m1", MEETING, NAMES, {"u1"})
+    assert [(p.user_id, p.amount, p.given_by) for p in penalties] == [("u2", -5, "u-org"), ("u3", -5, "u-org")]
+    # Recording again yields the same sources, which the kudos ledger writes only once
+    _, again, _ = _attendance_writes("m1", MEETING, NAMES, {"u1"})
+    assert [p.source for p in again] == [p.source for p in penalties] == ["meeting_absence:m1:u2", "meeting_absence:m1:u3"]
+
+
+def test_everyone_present_means_no_penalties():
+    records, penalties, _ = _attendance_writes("m1", MEETING, NAMES, {"u1", "u2", "u3"})
+    assert len(records) == 3 and penalties == []
+
+
+def test_present_attendees_have_earlier_penalties_revoked():
+    _, penalties, _ = _attendance_writes("m1", MEETING, NAMES, {"u1"})
+    # The correction marks u2 present, so the penalty written for u2 above is revoked
+    _, corrected, pardoned = _attendance_writes("m1", MEETING, NAMES, {"u1", "u2"})
+    assert [p.source for p in corrected] == ["meeting_absence:m1:u3"]
+    assert pardoned == ["meeting_absence:m1:u1", "meeting_absence:m1:u2"]
+    assert penalties[0].source in pardoned
+
+
+def test_revoking_a_penalty_reverses_it_once(monkeypatch):
+    db = FakeDatabase(kudos_transactions=[
+        {"id": "k1", "user_id": "u2", "user_name": "Bo", "amount": -5, "source": "meeting_absence:m1:u2", "created_at": "2026-09-01T10:00:00+00:00"},
+        {"id": "k2", "user_id": "u3", "user_name": "Cy", "amount": -5, "source": "meeting_absence:m1:u3", "created_at": "2026-09-01T10:00:00+00:00"},
+    ])
+    reversed_totals = []
+
+    async def apply_kudos_totals(docs, sign=1, session=None):
+        reversed_totals.append(([doc["id"] for doc in docs], sign))
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "apply_kudos_totals", apply_kudos_totals)
+    sources = ["meeting_absence:m1:u1", "meeting_absence:m1:u2"]
+    removed = asyncio.run(server.revoke_kudos_sources(sources))
+    assert [doc["id"] for doc in removed] == ["k1"]
+    assert [doc["id"] for doc in db.kudos_transactions.docs] == ["k2"]
+    # Revoking again finds nothing left to take back
+    assert asyncio.run(server.revoke_kudos_sources(sources)) == []
+    assert reversed_totals == [(["k1"], -1), ([], -1)]
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+from server import SORT_BY_CREATED, SORT_BY_CREATED_DESC, _keyset_filter, decode_cursor, encode_cursor
+
+OPERATORS = {"$gt": lambda a, b: a > b, "$lt": lambda a, b: a < b}
+
+
+def matches(doc, query):
+    """Evaluate the subset of Mongo filters _keyset_filter produces"""
+    if "$or" in query:
+        return any(matches(doc, clause) for clause in query["$or"])
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if not all(OPERATORS[op](doc[field], value) for op, value in condition.items()):
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+
+def sort_docs(docs, sort):
+    ordered = list(docs)
+    for field, direction in reversed(sort):
+        ordered.sort(key=lambda doc: doc[field], reverse=direction == DESCENDING)
+    return ordered
+
+
+def walk(docs, sort, limit):
+    """Page through `docs` the way paginate() does, following X-Next-Cursor"""
+    pages, after = [], None
+    while True:
+        remaining = docs if after is None else [doc for doc in docs if matches(doc, _keyset_filter(sort, decode_cursor(after, sort)))]
+        page = sort_docs(remaining, sort)[:limit + 1]
+        if len(page) > limit:
+            page = page[:limit]
+            after = encode_cursor(page[-1], sort)
+            pages.append(page)
+        else:
+            pages.append(page)
+            return pages
+
+
+@pytest.fixture
+def docs():
+    rng = random.Random(7)
+    # Few distinct timestamps, so most pages break inside a run of equal created_at values
+    return [{"id": f"doc-{i:03d}", "created_at": f"2025-01-0{rng.randint(1, 4)}T00:00:00", "platform": rng.choice("abc")} for i in range(97)]
+
+
+@pytest.mark.parametrize("sort", [SORT_BY_CREATED, SORT_BY_CREATED_DESC, [("platform", ASCENDING), ("created_at", DESCENDING), ("id", ASCENDING)]])
+@pytest.mark.parametrize("limit", [1, 10, 96, 97, 200])
+def test_pages_cover_every_document_once_in_order(docs, sort, limit):
+    pages = walk(docs, sort, limit)
+    assert [doc["id"] for page in pages for doc in page] == [doc["id"] for doc in sort_docs(docs, sort)]
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_cursor_round_trip():
+    doc = {"id": "x", "created_at": "2025-01-01T00:00:00+00:00", "other": 1}
+    assert decode_cursor(encode_cursor(doc, SORT_BY_CREATED), SORT_BY_CREATED) == ["2025-01-01T00:00:00+00:00", "x"]
+
+
+def test_keyset_filter_flips_comparison_for_descending_keys():
+    assert _keyset_filter([("date", DESCENDING), ("id", DESCENDING)], ["2025-01-02", "b"]) == {"$or": [
+        {"date": {"$lt": "2025-01-02"}},
+        {"date": "2025-01-02", "id": {"$lt": "b"}},
+    ]}
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", encode_cursor({"id": "x"}, [("id", ASCENDING)])])
+def test_malformed_cursor_is_rejected(cursor):
+    # Garbage, valid base64 of non-JSON, and a cursor for a different sort
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, SORT_BY_CREATED)
+    assert error.value.status_code == 400
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+
+import server
+from tests.fakes import FakeDatabase
+
+MONTH = "2026-09"
+
+
+def salary(record_id, user_id, status="pending", net_salary=1000.0):
+    return {"id": record_id, "user_id": user_id, "user_name": user_id.title(), "month": MONTH, "status": status, "net_salary": net_salary}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    rollups = []
+
+    async def no_transactions():
+        return False
+
+    async def apply_finance_rollups(transactions, sign=1):
+        rollups.extend(transactions)
+
+    async def previous_base_salaries(month):
+        return {"ann": 1000.0, "bo": 2000.0}
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "_previous_base_salaries", previous_base_salaries)
+    monkeypatch.setattr(server, "transactions_supported", no_transactions)
+    monkeypatch.setattr(server, "apply_finance_rollups", apply_finance_rollups)
+    db.rollups = rollups
+    return db
+
+
+def pay():
+    payment = server.PayrollPayRequest(payment_date="2026-10-01")
+    return asyncio.run(server.pay_payroll(month=MONTH, payment=payment, claims={"sub": "u-finance"}))
+
+
+def test_pay_books_each_pending_record_once(fake_db):
+    fake_db.salary_records.docs[:] = [salary("s1", "ann"), salary("s2", "bo", net_salary=500.0), salary("s3", "cy", status="paid")]
+    result = pay()
+    assert (result["paid"], result["total_paid"]) == (2, 1500.0)
+    assert sorted(t["salary_record_id"] for t in fake_db.finance_transactions.docs) == ["s1", "s2"]
+    assert {r["id"]: r["status"] for r in fake_db.salary_records.docs} == {"s1": "paid", "s2": "paid", "s3": "paid"}
+    assert len(fake_db.rollups) == 2
+    # Paying again finds nothing pending and books nothing
+    assert pay()["paid"] == 0
+    assert len(fake_db.finance_transactions.docs) == 2
+
+
+def test_pay_resumes_after_booking_without_marking_paid(fake_db):
+    fake_db.salary_records.docs[:] = [salary("s1", "ann"), salary("s2", "bo")]
+    fake_db.finance_transactions.docs.append({"id": "t1", "salary_record_id": "s1", "amount": 1000.0})
+    assert pay()["paid"] == 1
+    assert sorted(t["salary_record_id"] for t in fake_db.finance_transactions.docs) == ["s1", "s2"]
+    assert all(r["status"] == "paid" for r in fake_db.salary_records.docs)
+
+
+def bulk_write_error(*codes, upserted=()):
+    return BulkWriteError({
+        "writeErrors": [{"index": i, "code": code, "errmsg": "x"} for i, code in enumerate(codes)],
+        "upserted": list(upserted),
+    })
+
+
+@pytest.mark.parametrize("codes, status", [((11000, 11000), 409), ((11000, 121), None)])
+def test_pay_reports_only_duplicate_bookings_as_a_conflict(monkeypatch, codes, status):
+    async def run_in_transaction(operation):
+        raise bulk_write_error(*codes)
+
+    monkeypatch.setattr(server, "run_in_transaction", run_in_transaction)
+    if status:
+        with pytest.raises(HTTPException) as raised:
+            pay()
+        assert raised.value.status_code == status
+    else:
+        with pytest.raises(BulkWriteError):
+            pay()
+
+
+def run(fake_db, bulk_write):
+    fake_db.users.docs[:] = [
+        {"id": "ann", "name": "Ann"},
+        {"id": "bo", "name": "Bo"},
+        {"id": "cy", "name": "Cy"},
+        {"id": "dee", "name": "Dee", "is_active": False},
+    ]
+    fake_db.salary_records.bulk_write = bulk_write
+    return asyncio.run(server.run_payroll(month=MONTH, run=None))
+
+
+def test_rerun_keeps_records_a_concurrent_run_created(fake_db):
+    async def bulk_write(operations, ordered=True):
+        assert len(operations) == 2 and not ordered
+        raise bulk_write_error(11000, upserted=[{"index": 1, "_id": "x"}])
+
+    result = run(fake_db, bulk_write)
+    assert (result["created"], result["existing"], result["total_net_salary"]) == (1, 1, 2000.0)
+    # Users with no base salary anywhere are reported rather than paid nothing
+    assert result["skipped_user_ids"] == ["cy"]
+
+
+def test_run_surfaces_errors_other_than_duplicates(fake_db):
+    async def bulk_write(operations, ordered=True):
+        raise bulk_write_error(121)
+
+    with pytest.raises(BulkWriteError):
+        run(fake_db, bulk_write)
+
+
+def group(*records):
+    return {"_id": {"user_id": "ann", "month": MONTH}, "records": list(records)}
+
+
+def test_duplicates_keep_the_settled_record():
+    groups = [group(
+        {"id": "a", "status": "pending", "created_at": "2026-09-01"},
+        {"id": "b", "status": "paid", "created_at": "2026-09-02"},
+        {"id": "c", "status": "pending", "created_at": "2026-09-03"},
+    )]
+    assert server._salary_duplicate_plan(groups, set()) == (["a", "c"], [])
+    # A booked transaction settles a record that was never marked paid
+    groups = [group({"id": "a", "status": "pending", "created_at": "2026-09-01"}, {"id": "b", "status": "pending", "created_at": "2026-09-02"})]
+    assert server._salary_duplicate_plan(groups, {"b"}) == (["a"], [])
+    # Without a settled record the oldest stays
+    assert server._salary_duplicate_plan(groups, set()) == (["b"], [])
+
+
+def test_duplicates_settled_twice_are_left_for_a_person():
+    groups = [group({"id": "a", "status": "paid"}, {"id": "b", "status": "pending"})]
+    assert server._salary_duplicate_plan(groups, {"b"}) == ([], [{"user_id": "ann", "month": MONTH}])
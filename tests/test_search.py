@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import _search_sources, _snippet
+
+
+def test_types_narrow_the_searched_collections():
+    assert list(_search_sources("task,project")) == ["task", "project"]
+    assert _search_sources(None) is server.SEARCH_SOURCES
+    with pytest.raises(HTTPException) as raised:
+        _search_sources("task,bogus")
+    assert raised.value.status_code == 400 and "bogus" in raised.value.detail
+
+
+def test_snippet_centres_on_the_first_matching_term():
+    text = "x" * 300 + " budget review " + "y" * 300
+    snippet = _snippet(text, ["review", "budget"])
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "budget review" in snippet and len(snippet) <= server.SNIPPET_CHARS + 2
+    # Short text with no match is returned whole from the start
+    assert _snippet("Quarterly plan", ["budget"]) == "Quarterly plan"
+    assert _snippet(None, ["budget"]) is None
+
+
+def test_text_results_are_ranked_together_and_paged(monkeypatch):
+    scores = {"task": [0.9, 0.2], "project": [0.5], "research_note": [0.7], "content": []}
+    limits = []
+
+    async def text_search(kind, source, q, terms, limit):
+        limits.append(limit)
+        return [{"type": kind, "id": f"{kind}{i}", "score": score} for i, score in enumerate(scores[kind])]
+
+    monkeypatch.setattr(server, "_text_search", text_search)
+    page = asyncio.run(server.search(q="Budget review", types=None, mode="text", limit=2, offset=1))
+    assert [hit["id"] for hit in page["results"]] == ["research_note0", "project0"]
+    assert page["next_offset"] == 3
+    # Each collection is asked for enough hits to fill every page up to this one
+    assert limits == [3, 3, 3, 3]
+    last = asyncio.run(server.search(q="Budget review", types=None, mode="text", limit=2, offset=2))
+    assert last["next_offset"] is None
+
+
+def test_prefix_mode_reports_a_partial_result(monkeypatch):
+    async def prefix_search(kind, source, prefix, limit):
+        if kind == "project":
+            return [], True
+        return [{"type": kind, "id": kind, "title": f"{prefix} {kind}"}], False
+
+    monkeypatch.setattr(server, "_prefix_search", prefix_search)
+    result = asyncio.run(server.search(q=" Bud ", types="task,project,content", mode="prefix", limit=5, offset=0))
+    assert [hit["title"] for hit in result["results"]] == ["Bud content", "Bud task"]
+    assert result["partial"] is True
@@ -0,0 +1,88 @@
+import asyncio
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from tests.fakes import FakeDatabase
+
+request_ids = count()
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    entries = []
+
+    def capture(entry, command):
+        entries.append((entry, command))
+        return asyncio.sleep(0)
+
+    def run_coroutine_threadsafe(coroutine, loop):
+        coroutine.close()
+
+    monkeypatch.setattr(server, "record_slow_query", capture)
+    monkeypatch.setattr(server.asyncio, "run_coroutine_threadsafe", run_coroutine_threadsafe)
+    return entries
+
+
+@pytest.fixture
+def listener():
+    log = server.SlowQueryLog()
+    log.loop = SimpleNamespace(is_closed=lambda: False)
+    return log
+
+
+def command(listener, name, body, ms, reply):
+    request_id = next(request_ids)
+    listener.started(SimpleNamespace(command_name=name, command=body, request_id=request_id, database_name="team"))
+    listener.succeeded(SimpleNamespace(command_name=name, request_id=request_id, duration_micros=ms * 1000, reply=reply))
+
+
+def batch(cursor_id, size, first=False):
+    return {"cursor": {"id": cursor_id, "firstBatch" if first else "nextBatch": [{}] * size}}
+
+
+FIND = {"find": "attendance", "filter": {"date": {"$regex": "^2025-03"}}}
+
+
+def test_a_cursor_is_judged_on_its_getmores_together(listener, recorded):
+    command(listener, "find", FIND, 40, batch(7, 101, first=True))
+    command(listener, "getMore", {"getMore": 7, "collection": "attendance"}, 40, batch(7, 101))
+    assert recorded == []
+    command(listener, "getMore", {"getMore": 7, "collection": "attendance"}, 30, batch(0, 50))
+    [(entry, _)] = recorded
+    assert (entry["slow"], entry["duration_ms"], entry["docs_returned"]) == (True, 110, 252)
+
+
+def test_fast_queries_are_explained_once_per_shape(listener, recorded):
+    command(listener, "find", FIND, 1, batch(0, 3, first=True))
+    command(listener, "find", {**FIND, "filter": {"date": {"$regex": "^2025-04"}}}, 1, batch(0, 3, first=True))
+    [(entry, explained)] = recorded
+    assert entry["slow"] is False and explained is FIND
+
+
+def test_killing_a_cursor_finishes_it(listener, recorded):
+    command(listener, "aggregate", {"aggregate": "tasks", "pipeline": []}, 120, batch(9, 101, first=True))
+    assert recorded == []
+    command(listener, "killCursors", {"killCursors": "tasks", "cursors": [9]}, 1, {})
+    assert [entry["docs_returned"] for entry, _ in recorded] == [101]
+
+
+def explanation(examined, returned):
+    return {"executionStats": {"totalDocsExamined": examined, "nReturned": returned}, "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+
+
+@pytest.mark.parametrize("examined, kept", [(5000, True), (20, False)])
+def test_fast_queries_are_kept_only_when_they_examine_too_much(monkeypatch, examined, kept):
+    db = FakeDatabase()
+
+    class Database:
+        async def command(self, body):
+            return explanation(examined, 3)
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "client", {"team": Database()})
+    entry = {"database": "team", "collection": "attendance", "command": "find", "slow": False, "inefficient": False, "plan": None}
+    asyncio.run(server.record_slow_query(entry, FIND))
+    assert len(db.slow_queries.docs) == (1 if kept else 0)